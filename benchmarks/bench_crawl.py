@@ -0,0 +1,275 @@
+"""
+Benchmark the crawl against a local stand-in server (`benchmarks.server`), without network.
+
+Runs each stage on its own, then all of them end to end through a `Pipeline`:
+- listing: paging metadata with `iter_metadata`
+- text: fetching and parsing texts with `request_text`
+- write: streaming documents into an output sink
+- prepare: turning output files into parquet shards with `HuggingfacePusher`
+
+For every stage it reports documents/second, p50/p99 latency per item (a request,
+or a batch for write/prepare), CPU seconds and peak RSS of this process. The
+server runs in a separate process so that its work is not counted.
+
+    python -m benchmarks.bench_crawl
+    python -m benchmarks.bench_crawl --records 5000 --latency 0.05 --error-rate 0.01 --json bench.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlsplit
+
+from mevzuat_scraper.pipeline import Batch, Pipeline
+from mevzuat_scraper.pusher import HuggingfacePusher
+from mevzuat_scraper.scraper import Mevzuat
+from mevzuat_scraper.sink import open_sink
+
+from .server import FakeMevzuat
+
+
+def _serve(options, ready):
+    server = FakeMevzuat(**options)
+    ready.send(server.url)
+    server._server.serve_forever()
+
+
+@contextmanager
+def server_process(**options):
+    """Run `FakeMevzuat(**options)` in a child process, yielding its base URL."""
+    receive, send = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_serve, args=(options, send), daemon=True)
+    process.start()
+    try:
+        yield receive.recv()
+    finally:
+        process.terminate()
+        process.join()
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:  # not Linux: the lifetime peak is the best we have
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _cpu_seconds():
+    usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    return sum(u.ru_utime + u.ru_stime for u in usage)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class StageResult:
+    def __init__(self, name):
+        self.name = name
+        self.docs = 0
+        self.latencies = []
+        self.seconds = 0.0
+        self.cpu = 0.0
+        self.peak_rss = 0
+
+    def as_dict(self):
+        return {
+            "stage": self.name, "docs": self.docs, "seconds": self.seconds,
+            "docs_per_second": self.docs / self.seconds if self.seconds else None,
+            "p50": percentile(self.latencies, 0.5), "p99": percentile(self.latencies, 0.99),
+            "cpu_seconds": self.cpu, "peak_rss_mb": self.peak_rss / 1e6,
+        }
+
+
+@contextmanager
+def measure(name):
+    """Time a stage, sampling this process's RSS every 20 ms for its peak."""
+    result = StageResult(name)
+    stopped = threading.Event()
+    peak = [_rss_bytes()]
+
+    def sample():
+        while not stopped.wait(0.02):
+            peak[0] = max(peak[0], _rss_bytes())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    cpu, started = _cpu_seconds(), time.perf_counter()
+    try:
+        yield result
+    finally:
+        result.seconds = time.perf_counter() - started
+        result.cpu = _cpu_seconds() - cpu
+        stopped.set()
+        sampler.join()
+        result.peak_rss = max(peak[0], _rss_bytes())
+
+
+def record_latencies(session, results_by_endpoint):
+    """Collect the time to response headers of every request, per endpoint path."""
+    def hook(response, *args, **kwargs):
+        latencies = results_by_endpoint.get(urlsplit(response.url).path.lower())
+        if latencies is not None:
+            latencies.append(response.elapsed.total_seconds())
+    session.hooks["response"].append(hook)
+
+
+def build_mevzuat(url, args):
+    return Mevzuat(
+        post_url=f"{url}/Anasayfa/MevzuatDatatable",
+        text_url=f"{url}/anasayfa/MevzuatFihristDetayIframe?",
+        concurrency=args.concurrency,
+        parse_workers=args.parse_workers,
+        max_retries=args.max_retries,
+        backoff_factor=0.1,
+    )
+
+
+def batched(records, size):
+    for i in range(0, len(records), size):
+        yield records[i:i + size]
+
+
+def bench_stages(url, args, workdir):
+    results = []
+    pusher = HuggingfacePusher(HF_TOKEN="offline", cache_dir=os.path.join(workdir, "hf_prepare"))
+    with build_mevzuat(url, args) as mevzuat:
+        with measure("listing") as listing:
+            record_latencies(mevzuat.session, {"/anasayfa/mevzuatdatatable": listing.latencies})
+            records = [r for page in mevzuat.iter_metadata(mev_tur="Kanun", length=args.page_size) for r in page]
+            listing.docs = len(records)
+        results.append(listing)
+
+        documents = []
+        with measure("text") as text:
+            record_latencies(mevzuat.session, {"/anasayfa/mevzuatfihristdetayiframe": text.latencies})
+            for batch in batched(records, args.batch_size):
+                documents.extend(mevzuat.request_text(batch))
+            text.docs = len(documents)
+        results.append(text)
+
+    with measure("write") as write:
+        sink = open_sink(args.format, os.path.join(workdir, "stages"), "Kanun", max_docs=args.docs_per_file)
+        files = []
+        for batch in batched(documents, args.batch_size):
+            started = time.perf_counter()
+            files.extend(sink.write_many(batch))
+            write.latencies.append(time.perf_counter() - started)
+        files.extend(sink.close())
+        write.docs = len(documents)
+    results.append(write)
+    del documents
+
+    with measure("prepare") as prepare:
+        for sink_file in files:
+            started = time.perf_counter()
+            shard_path, _ = pusher._write_parquet(pusher.prepare_dataset(sink_file.path))
+            os.remove(shard_path)
+            prepare.latencies.append(time.perf_counter() - started)
+            prepare.docs += sink_file.documents
+    results.append(prepare)
+    return results
+
+
+def bench_end_to_end(url, args, workdir):
+    pusher = HuggingfacePusher(HF_TOKEN="offline", cache_dir=os.path.join(workdir, "hf_prepare"))
+    with build_mevzuat(url, args) as mevzuat, measure("end-to-end") as result:
+        record_latencies(mevzuat.session, {"/anasayfa/mevzuatfihristdetayiframe": result.latencies})
+        sink = open_sink(args.format, os.path.join(workdir, "e2e"), "Kanun", max_docs=args.docs_per_file)
+
+        def source():
+            records = []
+            for page in mevzuat.iter_metadata(mev_tur="Kanun", length=args.page_size):
+                records.extend(page)
+                while len(records) >= args.batch_size:
+                    yield Batch(0, "Kanun", records[:args.batch_size])
+                    records = records[args.batch_size:]
+            if records:
+                yield Batch(0, "Kanun", records)
+
+        def fetch(batch):
+            batch.documents = mevzuat.request_text(batch.records)
+            return batch
+
+        def save(batch):
+            result.docs += len(batch.documents)
+            finished = sink.write_many(batch.documents)
+            return finished[0] if finished else None
+
+        def prepare(sink_file):
+            shard_path, _ = pusher._write_parquet(pusher.prepare_dataset(sink_file.path))
+            os.remove(shard_path)
+
+        pipeline = Pipeline(source(), queue_size=2, name="bench")
+        pipeline.add_stage("fetch", fetch)
+        pipeline.add_stage("save", save, on_end=sink.close)
+        pipeline.add_stage("prepare", prepare)
+        pipeline.run()
+    return result
+
+
+def report(results):
+    print(f"{'stage':<11} {'docs':>7} {'seconds':>8} {'docs/s':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'CPU s':>7} {'peak RSS':>9}")
+    for result in results:
+        row = result.as_dict()
+        p50 = f"{row['p50'] * 1000:.1f}" if row["p50"] is not None else "-"
+        p99 = f"{row['p99'] * 1000:.1f}" if row["p99"] is not None else "-"
+        print(f"{row['stage']:<11} {row['docs']:>7} {row['seconds']:>8.2f} {row['docs_per_second'] or 0:>9.1f} "
+              f"{p50:>8} {p99:>8} {row['cpu_seconds']:>7.2f} {row['peak_rss_mb']:>7.0f}MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    server_options = parser.add_argument_group("server")
+    server_options.add_argument("--records", type=int, default=500, help="documents in the listing")
+    server_options.add_argument("--articles", type=int, default=200, help="articles per page (~1 KB each)")
+    server_options.add_argument("--latency", type=float, default=0.01, help="seconds added to every request")
+    server_options.add_argument("--jitter", type=float, default=0.01, help="up to this many extra seconds")
+    server_options.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 500")
+    server_options.add_argument("--rate-limit", type=float, default=None, help="requests/second before 429s")
+    server_options.add_argument("--max-concurrency", type=int, default=None, help="concurrent requests before 429s")
+    server_options.add_argument("--max-page-size", type=int, default=1000, help="largest listing page served")
+    server_options.add_argument("--server-url", default=None,
+                                help="benchmark an already running server instead of starting one")
+    crawl_options = parser.add_argument_group("crawl")
+    crawl_options.add_argument("--concurrency", type=int, default=16)
+    crawl_options.add_argument("--parse-workers", type=int, default=0)
+    crawl_options.add_argument("--max-retries", type=int, default=3)
+    crawl_options.add_argument("--page-size", type=int, default=None, help="listing page size, None probes it")
+    crawl_options.add_argument("--batch-size", type=int, default=100)
+    crawl_options.add_argument("--docs-per-file", type=int, default=250)
+    crawl_options.add_argument("--format", default="jsonl.gz")
+    parser.add_argument("--skip-stages", action="store_true", help="only run the end-to-end crawl")
+    parser.add_argument("--json", default=None, help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    options = dict(records=args.records, articles=args.articles, latency=args.latency, jitter=args.jitter,
+                   error_rate=args.error_rate, rate_limit=args.rate_limit,
+                   max_concurrency=args.max_concurrency, max_page_size=args.max_page_size)
+    workdir = tempfile.mkdtemp(prefix="bench_crawl_")
+    try:
+        with nullcontext(args.server_url) if args.server_url else server_process(**options) as url:
+            results = [] if args.skip_stages else bench_stages(url, args, workdir)
+            results.append(bench_end_to_end(url, args, workdir))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"options": vars(args), "results": [r.as_dict() for r in results]}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
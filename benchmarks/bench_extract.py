@@ -0,0 +1,62 @@
+"""
+Benchmark the `<body>` text extraction backends.
+
+Reports documents/second and MB/second per backend and checks every backend's
+output against the original BeautifulSoup extraction ("bs4").
+
+    python -m benchmarks.bench_extract                     # synthetic pages
+    python -m benchmarks.bench_extract saved_pages/*.html  # real pages
+"""
+import argparse
+import time
+
+from mevzuat_scraper.extract import EXTRACTORS, get_extractor
+
+from .corpus import legislation_html
+
+
+def load_pages(args):
+    if args.files:
+        pages = []
+        for path in args.files:
+            with open(path, "r", encoding="utf-8") as f:
+                pages.append(f.read())
+        return pages
+    return [legislation_html(articles=args.articles, seed=i) for i in range(args.docs)]
+
+
+def bench(extract, pages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        texts = [extract(page) for page in pages]
+        best = min(best, time.perf_counter() - start)
+    return best, texts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="HTML files to use instead of synthetic pages")
+    parser.add_argument("--docs", type=int, default=20, help="number of synthetic pages")
+    parser.add_argument("--articles", type=int, default=300, help="articles per synthetic page")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per backend, the best one is reported")
+    parser.add_argument("--backends", nargs="*", default=list(EXTRACTORS))
+    args = parser.parse_args(argv)
+
+    pages = load_pages(args)
+    megabytes = sum(len(p.encode("utf-8")) for p in pages) / 1e6
+    print(f"{len(pages)} pages, {megabytes:.1f} MB of HTML")
+
+    reference = None
+    print(f"{'backend':<8} {'docs/s':>10} {'MB/s':>8} {'speedup':>8} {'identical':>10}")
+    for name in ["bs4"] + [b for b in args.backends if b != "bs4"]:
+        seconds, texts = bench(get_extractor(name), pages, args.repeat)
+        if reference is None:
+            reference = (seconds, texts)
+        identical = sum(a == b for a, b in zip(texts, reference[1]))
+        print(f"{name:<8} {len(pages) / seconds:>10.1f} {megabytes / seconds:>8.2f} "
+              f"{reference[0] / seconds:>7.1f}x {identical:>5}/{len(pages)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Synthetic mevzuat.gov.tr pages for offline benchmarks.
+"""
+import random
+
+_WORDS = ("kanun madde fıkra bent hüküm yürürlük bakanlık cumhurbaşkanı karar yönetmelik "
+          "idare vergi ceza süre başvuru görev yetki İstanbul Ankara ığdır şartıyla "
+          "uygulanır değiştirilmiştir yürürlükten kaldırılmıştır").split()
+
+_HEAD = """<!DOCTYPE html>\r
+<html lang="tr">\r
+<head>\r
+<meta charset="utf-8">\r
+<title>Mevzuat Bilgi Sistemi</title>\r
+<style>p.MsoNormal {{ margin: 0cm; font-size: 9pt; }}</style>\r
+<script>var mevzuatNo = "{number}";</script>\r
+</head>\r
+<body>\r
+<div class="WordSection1">\r
+"""
+
+
+def _sentence(rng, words=12):
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def legislation_html(articles=200, seed=0, number=None):
+    """A legislation page shaped like `MevzuatFihristDetayIframe` output, ~1 KB per article."""
+    rng = random.Random(seed)
+    parts = [_HEAD.format(number=number or seed)]
+    parts.append('<p class="MsoNormal" align="center"><b>BİRİNCİ BÖLÜM<br>Amaç, Kapsam ve Tanımlar</b></p>\r\n')
+    for n in range(1, articles + 1):
+        parts.append(f'<p class="MsoNormal"><b><span style="font-size:9.0pt">{_sentence(rng, 3)}</span></b></p>\r\n')
+        parts.append(f'<p class="MsoNormal"><b>MADDE {n}&nbsp;–</b>&nbsp;(1) {_sentence(rng)}</p>\r\n')
+        for paragraph in range(2, rng.randint(2, 5)):
+            parts.append(f'<p class="MsoNormal">({paragraph}) {_sentence(rng, rng.randint(8, 30))}'
+                         f' <i>({rng.randint(1, 30)}/{rng.randint(1, 12)}/2019-7{rng.randint(100, 999)}/'
+                         f'{rng.randint(1, 60)} md.)</i></p>\r\n')
+        if n % 25 == 0:
+            parts.append('<table border="1"><tr><td>Sıra</td><td>Oran &amp; tutar</td></tr>'
+                         f'<tr><td>{n}</td><td>%{rng.randint(1, 99)}</td></tr></table>\r\n')
+        if n % 40 == 0:
+            parts.append('<!-- [if gte mso 9]><xml></xml><![endif] -->\r\n')
+    parts.append("</div>\r\n</body>\r\n</html>\r\n")
+    return "".join(parts)
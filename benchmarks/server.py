@@ -0,0 +1,215 @@
+"""
+Local stand-in for mevzuat.gov.tr, for benchmarks that must not touch the real site.
+
+Serves the three endpoints the scraper uses:
+- the home page, with an `antiforgerytoken` input and a session cookie
+- `POST /Anasayfa/MevzuatDatatable`, returning DataTables JSON with `recordsTotal`
+- `POST /anasayfa/MevzuatFihristDetayIframe?MevzuatNo=...`, returning a page from
+  `corpus.legislation_html`
+
+Latency, error rate, throttling (429 with `Retry-After`) and the largest page size
+are configurable.
+
+    python -m benchmarks.server --port 8000 --records 5000 --latency 0.05
+"""
+import argparse
+import functools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .corpus import legislation_html
+
+TOKEN = "benchmark-token"
+COOKIE = ".AspNetCore.Antiforgery=benchmark"
+
+
+class FakeMevzuat:
+    """
+    The stand-in server, running on a daemon thread while used as a context
+    manager. `url` is its base URL; pass `post_url`/`text_url` from it to `Mevzuat`.
+
+    Every request sleeps `latency` seconds (plus up to `jitter`), fails with a 500
+    at `error_rate`, and gets a 429 once more than `rate_limit` requests per second
+    or `max_concurrency` concurrent requests arrive. Listing pages larger than
+    `max_page_size` are silently capped, like the real site does.
+    """
+
+    def __init__(self, records=1000, articles=200, latency=0.0, jitter=0.0, error_rate=0.0,
+                 rate_limit=None, max_concurrency=None, max_page_size=1000, mev_tur="Kanun",
+                 host="127.0.0.1", port=0, seed=0):
+        self.records = records
+        self.articles = articles
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.max_concurrency = max_concurrency
+        self.max_page_size = max_page_size
+        self.mev_tur = mev_tur
+        self.stats = {"listing": 0, "text": 0, "home": 0, "errors": 0, "throttled": 0}
+        self._random = random.Random(seed)
+        self._in_flight = 0
+        self._tokens = float(rate_limit or 0)
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def post_url(self):
+        return f"{self.url}/Anasayfa/MevzuatDatatable"
+
+    @property
+    def text_url(self):
+        return f"{self.url}/anasayfa/MevzuatFihristDetayIframe?"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-mevzuat", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def listing(self, start, length):
+        length = min(length, self.max_page_size)
+        data = [
+            dict(
+                mevAdi=f"{self.mev_tur} {n}",
+                url=f"mevzuat?MevzuatNo={n}&MevzuatTur=1&MevzuatTertip=5",
+                mevzuatNo=str(n),
+                resmiGazeteTarihi=f"{1 + n % 28:02d}.{1 + n % 12:02d}.{1990 + n % 35}",
+                resmiGazeteSayisi=str(20000 + n),
+                mevzuatTurEnumString=self.mev_tur,
+            )
+            for n in range(start, min(start + length, self.records))
+        ]
+        return {"draw": 1, "recordsTotal": self.records, "recordsFiltered": self.records, "data": data}
+
+    @functools.lru_cache(maxsize=256)
+    def page(self, number):
+        return legislation_html(articles=self.articles, seed=number).encode("utf-8")
+
+    def _admit(self):
+        """Status to answer with before doing any work: None to serve the request."""
+        with self._lock:
+            if self.rate_limit:
+                now = time.monotonic()
+                self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled) * self.rate_limit)
+                self._refilled = now
+                if self._tokens < 1:
+                    self.stats["throttled"] += 1
+                    return 429
+                self._tokens -= 1
+            if self.max_concurrency and self._in_flight >= self.max_concurrency:
+                self.stats["throttled"] += 1
+                return 429
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return 500
+            self._in_flight += 1
+            delay = self.latency + (self._random.random() * self.jitter if self.jitter else 0.0)
+        time.sleep(delay)
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real site
+
+            def do_GET(self):
+                server.stats["home"] += 1
+                body = (f'<html><body><form><input name="antiforgerytoken" type="hidden" '
+                        f'value="{TOKEN}"></form></body></html>').encode("utf-8")
+                self._reply(200, body, "text/html; charset=utf-8", {"Set-Cookie": f"{COOKIE}; Path=/"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                status = server._admit()
+                if status is not None:
+                    headers = {"Retry-After": "1"} if status == 429 else {}
+                    self._reply(status, b"", "text/plain", headers)
+                    return
+                try:
+                    path = urlsplit(self.path)
+                    if path.path.lower() == "/anasayfa/mevzuatdatatable":
+                        server.stats["listing"] += 1
+                        payload = json.loads(raw)
+                        if payload["parameters"].get("antiforgerytoken") != TOKEN:
+                            self._reply(400, b"", "text/plain")
+                            return
+                        body = json.dumps(server.listing(payload["start"], payload["length"])).encode("utf-8")
+                        self._reply(200, body, "application/json; charset=utf-8")
+                    elif path.path.lower() == "/anasayfa/mevzuatfihristdetayiframe":
+                        server.stats["text"] += 1
+                        number = int(parse_qs(path.query).get("MevzuatNo", ["0"])[0])
+                        self._reply(200, server.page(number), "text/html; charset=utf-8")
+                    else:
+                        self._reply(404, b"", "text/plain")
+                finally:
+                    with server._lock:
+                        server._in_flight -= 1
+
+            def _reply(self, status, body, content_type, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--records", type=int, default=1000, help="records in the listing")
+    parser.add_argument("--articles", type=int, default=200, help="articles per legislation page (~1 KB each)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds, at random")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 500")
+    parser.add_argument("--rate-limit", type=float, default=None, help="requests/second before answering 429")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="concurrent requests before answering 429")
+    parser.add_argument("--max-page-size", type=int, default=1000, help="largest listing page served")
+    args = parser.parse_args(argv)
+
+    server = FakeMevzuat(
+        records=args.records, articles=args.articles, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, rate_limit=args.rate_limit, max_concurrency=args.max_concurrency,
+        max_page_size=args.max_page_size, port=args.port
+    )
+    print(f"Serving {args.records} records on {server.url} (Ctrl+C to stop)")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
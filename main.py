@@ -1,95 +1,378 @@
-from mevzuat_scraper.scraper import Mevzuat
-from mevzuat_scraper.pusher import HuggingfacePusher
+from mevzuat_scraper.scheduler import CrawlScheduler
+from mevzuat_scraper.pusher import BackgroundUploader, HuggingfacePusher
+from mevzuat_scraper.pipeline import Batch, Pipeline
+from mevzuat_scraper.cache import ResponseCache
+from mevzuat_scraper.index import DocumentIndex
+from mevzuat_scraper.dedup import Deduplicator
+from mevzuat_scraper.search import SearchIndex
+from mevzuat_scraper.segment import iter_article_records
+from mevzuat_scraper.chunking import Chunker, chunk_file
+from mevzuat_scraper.checkpoint import CheckpointStore, key_string
+from mevzuat_scraper.records import BlobStore, without_text
+from mevzuat_scraper.sink import open_sink
+from mevzuat_scraper.metrics import REGISTRY
 from config.config import Config
+from collections import deque
+import argparse
 import datetime
-import json
+import glob
 import os
 
-def main():
-    mevzuat = Mevzuat()
-    mev_tur = Config().mevzuat_turleri[0]  # Example: 'Kanun'
-
-    start = 0          # Starting index for pagination
-    length = 10       # Number of records to fetch
-    push_after = 100   # Push to HF after collecting this many records
 
+def batches(pages, mev_tur, batch_size, batch_count=0, skip_keys=()):
+    """
+    Regroup metadata pages into batches of `batch_size` records (the last one
+    may be smaller), numbered after `batch_count` and leaving out records in
+    `skip_keys`. Pages larger than `batch_size` are sliced. A batch's
+    `end_offset` is the end of the last page all of whose records are in it or
+    an earlier batch, so resuming from it never skips a record.
+    """
     result = []
-    metadata = mevzuat.request(mev_tur=mev_tur, start=start, length=length)
-    
+    end_offset = None
+    queued = emitted = 0
+    page_ends = deque()  # (records queued up to the end of a page, the page's end offset)
+
+    def take(count):
+        nonlocal result, end_offset, emitted, batch_count
+        records, result = result[:count], result[count:]
+        emitted += len(records)
+        while page_ends and page_ends[0][0] <= emitted:
+            end = page_ends.popleft()[1]
+            end_offset = end if end is not None else end_offset
+        batch_count += 1
+        return Batch(number=batch_count, mev_tur=mev_tur, records=records, end_offset=end_offset)
+
+    for metadata in pages:
+        records = [m for m in metadata if key_string(m) not in skip_keys]
+        result.extend(records)
+        queued += len(records)
+        page_ends.append((queued, getattr(metadata, 'end', None)))
+        while len(result) >= batch_size:
+            yield take(batch_size)
+
+    # Handle any remaining data
+    if result:
+        yield take(len(result))
+
+
+def fetch_texts(mevzuat, dedup=None):
+    def stage(batch):
+        records = dedup.before_fetch(batch.records) if dedup else batch.records
+        print(f"📄 Fetching full text for {len(records)} documents...")
+        batch.documents = mevzuat.request_text(records)
+        if dedup:
+            batch.documents = dedup.after_fetch(batch.documents)
+        return batch
+    return stage
+
+
+class BatchWriter:
+    """
+    Save stage: streams each batch into the sink and, whenever the sink finishes
+    an output file, records the documents in it as done (index and checkpoint)
+    and passes the file on for upload. Documents still in the open file are only
+    committed once it is finished, so a crash never skips unsaved work.
+
+    With `open_articles`, the article-level records of every document are written
+    as well, to a sink it opens with the number of the document file they go
+    into. That sink is closed together with the document file, so an article
+    file always covers the same documents as the document file of its number;
+    a document file without articles has none.
+    """
+
+    def __init__(self, mev_tur, sink, checkpoint, index=None, open_articles=None):
+        self.mev_tur = mev_tur
+        self.sink = sink
+        self.checkpoint = checkpoint
+        self.index = index
+        self.open_articles = open_articles
+        self._articles = None  # article sink of the open file
+        self._records = []     # metadata of the documents in the open file
+        self._last = None      # last batch written to the open file
+
+    def __call__(self, batch):
+        if self.open_articles is not None:
+            if self._articles is None:
+                self._articles = self.open_articles(self.sink.number)
+            self._articles.write_many(iter_article_records(batch.documents))
+        finished = self.sink.write_many(batch.documents)
+        self._records.extend(without_text(d) for d in batch.documents)
+        self._last = batch
+        batch.documents = []  # texts are on disk now
+        finished = self._commit(finished)
+        return finished[0] if finished else None
+
+    def finish(self):
+        return self._commit(self.sink.close())
+
+    def _commit(self, files):
+        for sink_file in files:
+            if self._articles is not None:
+                self._articles.close()
+                self._articles = None
+            if self.index is not None:
+                self.index.add(self._records)
+            self.checkpoint.record_file(
+                self.mev_tur, sink_file.number, sink_file.path, self._records,
+                batch_count=self._last.number, end_offset=self._last.end_offset
+            )
+            self._records = []
+        return files
+
+
+def upload_file(uploader, checkpoint, mev_tur):
+    def upload(number, path, documents=None):
+        # One shard per output file, named after it so re-uploads after a resume are no-ops.
+        # The file is passed by path and prepared out of core, never loaded whole
+        shard_name = os.path.basename(path).split('.')[0]
+
+        def done(future):
+            try:
+                print(f"🚀 Uploaded to HuggingFace: {future.result()}")
+                checkpoint.record_upload(mev_tur, number)
+            except Exception as e:
+                print(f"❌ Failed to upload to HuggingFace: {e}")
+
+        # Returns as soon as the shard is queued, the commit happens in the background
+        count = f"{documents} " if documents is not None else ""
+        future = uploader.submit(
+            {shard_name: path},
+            commit_message=f"Batch {number}: {count}{mev_tur} documents",
+            rows=documents
+        )
+        future.add_done_callback(done)
+    return upload
+
+
+def index_file(search_index):
+    """Stage adding each finished output file to the full-text index, then passing it on."""
+    def stage(sink_file):
+        search_index.add_file(sink_file.path)
+        return sink_file
+    return stage
+
+
+def export_chunks(chunker, directory, output_format, uploader=None):
+    """
+    Stage writing the chunks of each finished output file to `directory`, under
+    the same file name, and queueing them for upload; passes the file on.
+    """
+    def uploaded(future):
+        try:
+            print(f"🚀 Uploaded chunks to HuggingFace: {future.result()}")
+        except Exception as e:
+            print(f"❌ Failed to upload chunks to HuggingFace: {e}")
+
+    def stage(sink_file):
+        chunks = chunk_file(chunker, sink_file.path, directory, output_format)
+        if chunks and uploader:
+            shard_name = os.path.basename(chunks.path).split('.')[0]
+            future = uploader.submit(
+                {shard_name: chunks.path},
+                commit_message=f"Chunks of batch {sink_file.number}: {chunks.documents} chunks",
+                rows=chunks.documents
+            )
+            future.add_done_callback(uploaded)
+        return sink_file
+    return stage
+
+
+def track(pages, progress):
+    """Count listed records into a category's `CategoryProgress`."""
+    for page in pages:
+        progress.total = getattr(page, 'total', progress.total)
+        progress.listed += len(page)
+        yield page
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape mevzuat.gov.tr and push batches to the Hugging Face Hub")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue from the last checkpoint instead of starting at offset 0")
+    parser.add_argument("--checkpoint", default=None,
+                        help="checkpoint file (default: checkpoint.json in the output directory)")
+    parser.add_argument("--categories", nargs="+", default=None, metavar="MEV_TUR",
+                        help="categories to crawl (default: every category in config/config.py)")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="requests in flight over all categories")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="request starts per second over all categories")
+    parser.add_argument("--metrics-file", default=None,
+                        help="Prometheus text dump, rewritten during the run "
+                             "(default: metrics.prom in the output directory)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="also serve Prometheus metrics on this port at /metrics")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    out_dir = "out" if os.path.exists("out") else "."
+
+    cache_dir = ".cache/mevzuat"  # On-disk HTTP cache, set to None to disable
+    cache = ResponseCache(cache_dir) if cache_dir else None
+
+    parse_workers = os.cpu_count() or 0  # Processes extracting text from fetched pages, 0 parses in the fetch threads
+    categories = args.categories or Config().mevzuat_turleri
+
+    length = None      # Records per metadata page, None probes the largest the server accepts
+    batch_size = 100   # Fetch texts for this many records at a time
+    spill_texts = True  # Keep fetched texts in a memory-mapped blob store (out_dir/.blobs) until written,
+                        # so stages pass small handles and memory does not grow with batch_size
+    queue_size = 2     # Batches a stage may run ahead of the next one
+    output_format = "jsonl.gz"           # jsonl, jsonl.gz, jsonl.zst or parquet
+    max_docs_per_file = 1000             # Start a new output file (and upload) after this many documents
+    max_bytes_per_file = 256 * 1024 ** 2  # ... or after this many uncompressed bytes
+    incremental = True           # Only fetch documents missing from the local index
+    deduplicate = True           # Drop repeated listings and documents whose content did not change
+    stop_after_known_pages = 3   # Stop paging after this many fully indexed pages
+    build_search_index = True    # Add finished output files to the full-text index (search.sqlite)
+    segment_articles = True      # Also write article-level records (MADDE by MADDE) to out_dir/articles
+    export_chunks_split = True   # Also write token-budgeted chunks to out_dir/chunks (the "chunks" split)
+    chunk_tokenizer = None       # Hugging Face tokenizer name for chunking (needs transformers), None counts words
+    chunk_max_tokens = 512       # Tokens per chunk
+    chunk_overlap = 64           # Tokens shared by consecutive chunks
+
+    index = None
+    if incremental:
+        index = DocumentIndex(os.path.join(out_dir, "index.sqlite"))
+        print(f"🗂️  Incremental crawl against {len(index)} indexed documents")
+
+    # New and changed documents are also listed in changes.jsonl
+    dedup = Deduplicator(index, feed_path=os.path.join(out_dir, "changes.jsonl")) if deduplicate else None
+
+    search_index = SearchIndex(os.path.join(out_dir, "search.sqlite")) if build_search_index else None
+
+    chunker = Chunker(chunk_tokenizer, max_tokens=chunk_max_tokens, overlap=chunk_overlap) \
+        if export_chunks_split else None
+
+    blob_store = None
+    if spill_texts:
+        blob_dir = os.path.join(out_dir, ".blobs")
+        for stale in glob.glob(os.path.join(blob_dir, "*.blob")):  # left behind by a crash
+            os.remove(stale)
+        blob_store = BlobStore(blob_dir)
+
+    checkpoint = CheckpointStore(args.checkpoint or os.path.join(out_dir, "checkpoint.json"))
+
+    # Latencies, bytes, retries, errors and queue depths of every stage
+    metrics_dump = REGISTRY.write_every(args.metrics_file or os.path.join(out_dir, "metrics.prom"))
+    metrics_server = REGISTRY.serve(args.metrics_port) if args.metrics_port else None
+
     # Initialize HuggingFace pusher if token is available
-    hf_pusher = None
+    repo_id = "fikriokan/turkish-legislation"  # Every category is appended to this dataset as parquet shards
+    uploader = chunk_uploader = None
     if os.environ.get('HF_TOKEN'):
         try:
-            hf_pusher = HuggingfacePusher()
+            hf_pusher = HuggingfacePusher(manifest=os.path.join(out_dir, "hub_manifest.json"))
+            uploader = BackgroundUploader(hf_pusher, repo_id)
+            if chunker is not None:
+                chunk_uploader = BackgroundUploader(hf_pusher, repo_id, split_name="chunks")
             print("✓ HuggingFace pusher initialized")
         except Exception as e:
             print(f"⚠️  HuggingFace pusher failed to initialize: {e}")
     else:
         print("⚠️  HF_TOKEN not set - skipping HuggingFace upload")
-    
-    batch_count = 0
-    
-    while metadata is not None:
-        result.extend(metadata)
-        start += length
-        
-        # Get full text content for the collected metadata
-        if len(result) >= push_after:
-            print(f"📄 Fetching full text for {len(result)} documents...")
-            full_data = mevzuat.request_text(result)
-            
-            # Save to local file
-            filename = f"{mev_tur}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            filepath = f"out/{filename}" if os.path.exists("out") else filename
-            
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(full_data, f, ensure_ascii=False, indent=2)
-            print(f"💾 Saved {len(full_data)} documents to {filepath}")
-            
-            # Push to HuggingFace if available
-            if hf_pusher:
-                try:
-                    batch_count += 1
-                    repo_id = f"fikriokan/turkish-{mev_tur.lower()}-batch-{batch_count}"
-                    dataset_url = hf_pusher.push_data(
-                        data=full_data,
-                        repo_id=repo_id,
-                        commit_message=f"Batch {batch_count}: {len(full_data)} {mev_tur} documents"
-                    )
-                    print(f"🚀 Uploaded to HuggingFace: {dataset_url}")
-                except Exception as e:
-                    print(f"❌ Failed to upload to HuggingFace: {e}")
-            
-            # Reset for next batch
-            result = []
-        
-        # Get next batch of metadata
-        metadata = mevzuat.request(mev_tur=mev_tur, start=start, length=length)
-    
-    # Handle any remaining data
-    if result:
-        print(f"📄 Processing final batch of {len(result)} documents...")
-        full_data = mevzuat.request_text(result)
-        
-        filename = f"{mev_tur}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_final.json"
-        filepath = f"out/{filename}" if os.path.exists("out") else filename
-        
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(full_data, f, ensure_ascii=False, indent=2)
-        print(f"💾 Saved final {len(full_data)} documents to {filepath}")
-        
-        if hf_pusher:
-            try:
-                batch_count += 1
-                repo_id = f"your-username/turkish-{mev_tur.lower()}-final"
-                dataset_url = hf_pusher.push_data(
-                    data=full_data,
-                    repo_id=repo_id,
-                    commit_message=f"Final batch: {len(full_data)} {mev_tur} documents"
-                )
-                print(f"🚀 Uploaded final batch to HuggingFace: {dataset_url}")
-            except Exception as e:
-                print(f"❌ Failed to upload final batch to HuggingFace: {e}")
+
+    def crawl(mev_tur, mevzuat, progress):
+        start = 0  # Starting index for pagination
+        state = checkpoint.get(mev_tur)
+        if args.resume and state.complete:
+            print(f"✓ {mev_tur} already completed according to {checkpoint.path}")
+            return
+        if not args.resume:
+            checkpoint.reset(mev_tur)
+            state = checkpoint.get(mev_tur)
+        else:
+            start = state.offset
+            print(f"📌 Resuming {mev_tur} at offset {start} after {state.batch_count} batches")
+            # Output files the interrupted run never finished are refetched
+            for directory in (out_dir, os.path.join(out_dir, "articles"), os.path.join(out_dir, "chunks")):
+                for partial in glob.glob(os.path.join(directory, f"{mev_tur}_*.partial")):
+                    os.remove(partial)
+
+        # Finish uploads an interrupted run left behind
+        upload = upload_file(uploader, checkpoint, mev_tur) if uploader else None
+        if upload and args.resume:
+            for number, path in state.pending_uploads.items():
+                upload(number, path)
+
+        prefix = f"{mev_tur}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        sink = open_sink(
+            output_format, out_dir, prefix,
+            max_docs=max_docs_per_file, max_bytes=max_bytes_per_file,
+            first_number=state.next_file_number
+        )
+        # One article file per document file, numbered after it
+        def open_articles(number):
+            return open_sink(output_format, os.path.join(out_dir, "articles"), prefix, first_number=number)
+
+        writer = BatchWriter(
+            mev_tur, sink, checkpoint, index, open_articles=open_articles if segment_articles else None
+        )
+        fetch = fetch_texts(mevzuat, dedup)
+
+        def fetch_stage(batch):
+            batch = fetch(batch)
+            progress.documents += len(batch.documents)
+            return batch
+
+        def save_stage(batch):
+            sink_file = writer(batch)
+            progress.files += sink_file is not None
+            return sink_file
+
+        def finish_stage():
+            files = writer.finish()
+            progress.files += len(files)
+            return files
+
+        # Paging, text fetching, saving and uploading run concurrently,
+        # each stage handing work to the next through a bounded queue.
+        pages = track(mevzuat.iter_metadata(mev_tur=mev_tur, start=start, length=length), progress)
+        if index is not None:
+            pages = index.iter_unseen(pages, stop_after_known_pages=stop_after_known_pages)
+
+        pipeline = Pipeline(
+            batches(pages, mev_tur, batch_size, batch_count=state.batch_count, skip_keys=state.fetched),
+            queue_size=queue_size,
+            name=mev_tur
+        )
+        pipeline.add_stage("fetch", fetch_stage)
+        pipeline.add_stage("save", save_stage, on_end=finish_stage)
+        if search_index is not None:
+            pipeline.add_stage("search", index_file(search_index))
+        if chunker is not None:
+            pipeline.add_stage(
+                "chunks", export_chunks(chunker, os.path.join(out_dir, "chunks"), output_format, chunk_uploader)
+            )
+        if upload:
+            pipeline.add_stage("upload", lambda sink_file: upload(sink_file.number, sink_file.path, sink_file.documents))
+
+        pipeline.run()
+        checkpoint.mark_complete(mev_tur)
+
+    # Every category crawls concurrently, sharing one request budget fairly
+    scheduler = CrawlScheduler(
+        categories, crawl, concurrency=args.concurrency, rate_limit=args.rate_limit,
+        cache=cache, parse_workers=parse_workers, blob_store=blob_store
+    )
+    try:
+        scheduler.run()
+    finally:
+        if uploader:
+            print("⏳ Waiting for pending uploads...")
+            uploader.close()
+        if chunk_uploader:
+            chunk_uploader.close()
+        if blob_store:
+            blob_store.close()
+        metrics_dump.set()
+        if metrics_server:
+            metrics_server.shutdown()
+        REGISTRY.log_summary()
+    if scheduler.failed():
+        print(f"❌ Failed categories: {', '.join(scheduler.failed())} (rerun with --resume)")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,125 @@
+# Send Request
+import json
+import threading
+import time
+from html.parser import HTMLParser
+from typing import Optional
+
+import requests
+
+# Logging
+from loguru import logger
+
+# Responses the listing endpoint gives for a missing or expired antiforgery token. A 400
+# only counts with an empty/non-JSON body or one naming the token: the endpoint also
+# answers invalid requests (e.g. oversized pages) with a 400 and a JSON error
+AUTH_FAILURE_STATUSES = (401, 403)
+
+
+def is_auth_failure(error: Exception) -> bool:
+    """
+    Whether a failed listing request looks like a rejected token: a 401/403, a 400
+    whose body is not JSON or mentions the antiforgery token, or a page that is not
+    JSON (the site answers some rejections with HTML).
+    """
+    if isinstance(error, requests.HTTPError):
+        response = error.response
+        if response is None:
+            return False
+        if response.status_code == 400:
+            if "antiforgery" in response.text.lower():
+                return True
+            try:
+                response.json()
+            except ValueError:
+                return True
+            return False
+        return response.status_code in AUTH_FAILURE_STATUSES
+    return isinstance(error, json.JSONDecodeError)
+
+
+class _TokenInput(HTMLParser):
+    """Finds the value of the first `<input name="antiforgerytoken">`."""
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.value = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if self.value is None and tag == "input" and attrs.get("name") == self.name:
+            self.value = attrs.get("value")
+
+
+def parse_token(html: str, name: str = "antiforgerytoken") -> Optional[str]:
+    parser = _TokenInput(name)
+    parser.feed(html)
+    return parser.value or None
+
+
+class TokenManager:
+    """
+    Antiforgery token and cookies for the listing endpoint, shared by every worker
+    using the same session.
+
+    The token comes from a plain GET of the home page (`url`), which also puts the
+    site's cookies into `session`'s cookie jar. It is cached for `ttl` seconds;
+    concurrent callers wait for a single fetch. When a request is rejected, the
+    caller passes the token it used to `refresh`, so however many workers fail at
+    once, the token is fetched again only once, and failures that a new token
+    does not fix trigger at most one refresh per `min_refresh_interval` seconds.
+    If no token can be fetched, the static `fallback` the site used to accept is
+    used and retried after `min_refresh_interval` seconds.
+    """
+
+    def __init__(self, session: requests.Session, url: str = "https://www.mevzuat.gov.tr/",
+                 ttl: float = 1800, min_refresh_interval: float = 10, timeout=(10, 60),
+                 headers: Optional[dict] = None, fallback: str = "sa"):
+        self.session = session
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.headers = headers
+        self.fallback = fallback
+        self._token = None
+        self._refreshed_at = float("-inf")
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def token(self) -> str:
+        with self._lock:
+            if self._token is None or time.monotonic() >= self._expires_at:
+                self._fetch()
+            return self._token
+
+    def refresh(self, stale: Optional[str] = None) -> str:
+        """
+        Fetch a new token after `stale` was rejected. Returns the current token
+        instead if another worker already replaced `stale`, or if the last refresh
+        was less than `min_refresh_interval` seconds ago.
+        """
+        with self._lock:
+            now = time.monotonic()
+            due = now - self._refreshed_at >= self.min_refresh_interval
+            if self._token is None or (self._token == stale and due):
+                self._refreshed_at = now
+                self._fetch()
+            return self._token
+
+    def _fetch(self):
+        now = time.monotonic()
+        try:
+            response = self.session.get(self.url, headers=self.headers, timeout=self.timeout)
+            response.raise_for_status()
+            token = parse_token(response.text)
+        except requests.RequestException as e:
+            logger.warning(f"⚠️ Could not fetch an antiforgery token: {e}")
+            token = None
+        if token is None:
+            logger.warning(f"⚠️ No antiforgery token found, using {self.fallback!r}")
+            self._token, self._expires_at = self.fallback, now + self.min_refresh_interval
+            return
+        logger.info(f"🔑 Fetched antiforgery token ({len(self.session.cookies)} cookies)")
+        self._token, self._expires_at = token, now + self.ttl
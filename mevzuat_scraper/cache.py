@@ -0,0 +1,152 @@
+# Storage
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+# Logging
+from loguru import logger
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    url: str
+    text: str
+    stored_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def is_fresh(self, ttl):
+        return ttl is None or time.time() - self.stored_at < ttl
+
+    @property
+    def revalidation_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    On-disk HTTP response cache addressed by a hash of the request URL and payload.
+
+    Each entry is a pair of files under `directory/<key[:2]>/`: `<key>.body` with the
+    response text and `<key>.json` with its metadata. Entries older than `ttl`
+    seconds are stale (None: never stale); a stale entry that carried an ETag or
+    Last-Modified header can be revalidated with a conditional request instead of
+    being downloaded again. When the bodies exceed `max_bytes` in total, the least
+    recently used entries are evicted. Safe to share between threads.
+    """
+
+    def __init__(self, directory=".cache/mevzuat", ttl=7 * 24 * 3600, max_bytes=2 * 1024 ** 3):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = {}  # key -> (size, last access)
+        self._size = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def key(url, payload=None):
+        raw = json.dumps([url, payload], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except (OSError, ValueError):
+            return None
+        self._touch(key, meta_path)
+        return CacheEntry(key=key, text=text, **meta)
+
+    def put(self, key, url, text, etag=None, last_modified=None):
+        meta_path, body_path = self._paths(key)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        meta = dict(url=url, stored_at=time.time(), etag=etag, last_modified=last_modified)
+        # Body first: an entry only becomes visible once its metadata exists
+        self._write_atomic(body_path, text)
+        self._write_atomic(meta_path, json.dumps(meta, ensure_ascii=False))
+
+        size = os.path.getsize(body_path)
+        with self._lock:
+            old_size, _ = self._index.get(key, (0, 0))
+            self._index[key] = (size, time.time())
+            self._size += size - old_size
+            if self.max_bytes is not None and self._size > self.max_bytes:
+                self._evict()
+
+    def revalidated(self, entry):
+        """Mark a stale entry as fresh again after the server answered 304 Not Modified."""
+        self.put(entry.key, entry.url, entry.text, entry.etag, entry.last_modified)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key[:2], key)
+        return base + ".json", base + ".body"
+
+    @staticmethod
+    def _write_atomic(path, text):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def _touch(self, key, meta_path):
+        now = time.time()
+        try:
+            os.utime(meta_path, (now, now))  # persists recency across runs
+        except OSError:
+            pass
+        with self._lock:
+            if key in self._index:
+                self._index[key] = (self._index[key][0], now)
+
+    def _load_index(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                key = name[:-len(".json")]
+                meta_path, body_path = self._paths(key)
+                try:
+                    size = os.path.getsize(body_path)
+                    accessed = os.path.getmtime(meta_path)
+                except OSError:
+                    continue
+                self._index[key] = (size, accessed)
+                self._size += size
+        logger.info(f"🗄️ Response cache at {self.directory}: {len(self._index)} entries, {self._size} bytes")
+
+    def _evict(self):
+        # Caller holds the lock
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._size <= self.max_bytes:
+                break
+            self._remove(key)
+
+    def _remove(self, key):
+        # Caller holds the lock
+        size, _ = self._index.pop(key, (0, 0))
+        self._size -= size
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
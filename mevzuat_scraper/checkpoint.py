@@ -0,0 +1,130 @@
+# Storage
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Set
+
+# Logging
+from loguru import logger
+
+# Identity keys
+from .index import document_key
+
+
+def key_string(record: Dict) -> str:
+    return "|".join(document_key(record))
+
+
+@dataclass
+class CategoryCheckpoint:
+    """Crawl progress of one `mev_tur`."""
+    offset: int = 0                                   # pagination offset to resume from
+    batch_count: int = 0                              # batches written so far
+    fetched: Set[str] = field(default_factory=set)    # keys of documents already written
+    files: Dict[int, str] = field(default_factory=dict)  # output file number -> path
+    uploaded: Set[int] = field(default_factory=set)   # output file numbers pushed to the Hub
+    complete: bool = False
+
+    @property
+    def next_file_number(self) -> int:
+        return max(self.files, default=0) + 1
+
+    @property
+    def pending_uploads(self) -> Dict[int, str]:
+        return {n: path for n, path in sorted(self.files.items()) if n not in self.uploaded}
+
+    def to_json(self):
+        return dict(
+            offset=self.offset,
+            batch_count=self.batch_count,
+            fetched=sorted(self.fetched),
+            files={str(n): path for n, path in self.files.items()},
+            uploaded=sorted(self.uploaded),
+            complete=self.complete,
+        )
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            offset=data.get("offset", 0),
+            batch_count=data.get("batch_count", 0),
+            fetched=set(data.get("fetched", [])),
+            files={int(n): path for n, path in data.get("files", {}).items()},
+            uploaded=set(data.get("uploaded", [])),
+            complete=data.get("complete", False),
+        )
+
+
+class CheckpointStore:
+    """
+    Durable crawl state per `mev_tur`, kept in one JSON file.
+
+    Every update rewrites the file through a temporary file that is fsynced and
+    then renamed over the old one, so a crash leaves either the previous or the
+    new checkpoint on disk, never a torn one. Safe to share between threads.
+    """
+
+    def __init__(self, path: str = "checkpoint.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state: Dict[str, CategoryCheckpoint] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            self._state = {mev_tur: CategoryCheckpoint.from_json(data) for mev_tur, data in raw.items()}
+            logger.info(f"📌 Loaded checkpoint from {path}")
+
+    def get(self, mev_tur: str) -> CategoryCheckpoint:
+        with self._lock:
+            return self._state.setdefault(mev_tur, CategoryCheckpoint())
+
+    def reset(self, mev_tur: str):
+        with self._lock:
+            self._state[mev_tur] = CategoryCheckpoint()
+            self._save()
+
+    def record_file(self, mev_tur: str, number: int, path: str, documents: Iterable[Dict],
+                    batch_count: int, end_offset: Optional[int]):
+        """
+        Record a finished output file holding `documents`, which completes every
+        batch up to `batch_count` and every listing page before `end_offset`.
+        """
+        with self._lock:
+            state = self._state.setdefault(mev_tur, CategoryCheckpoint())
+            state.fetched.update(key_string(d) for d in documents)
+            state.files[number] = path
+            state.batch_count = max(state.batch_count, batch_count)
+            if end_offset is not None:
+                state.offset = max(state.offset, end_offset)
+            self._save()
+
+    def record_upload(self, mev_tur: str, number: int):
+        with self._lock:
+            self._state.setdefault(mev_tur, CategoryCheckpoint()).uploaded.add(number)
+            self._save()
+
+    def mark_complete(self, mev_tur: str):
+        with self._lock:
+            self._state.setdefault(mev_tur, CategoryCheckpoint()).complete = True
+            self._save()
+
+    def _save(self):
+        # Caller holds the lock
+        raw = {mev_tur: state.to_json() for mev_tur, state in self._state.items()}
+        raw_dir = os.path.dirname(os.path.abspath(self.path))
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(raw, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        # Persist the rename itself
+        try:
+            dir_fd = os.open(raw_dir, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
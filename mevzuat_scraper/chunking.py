@@ -0,0 +1,158 @@
+"""
+Split scraped documents into overlapping, token-budgeted chunks for training and retrieval.
+
+    python -m mevzuat_scraper.chunking out/Kanun_*.jsonl.gz --out-dir out/chunks
+    python -m mevzuat_scraper.chunking out/*.parquet --tokenizer dbmdz/bert-base-turkish-cased --max-tokens 256
+"""
+# Parsing
+import argparse
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Logging
+from loguru import logger
+
+# Identity keys and output files
+from .dedup import normalize_text
+from .index import KEY_FIELDS
+from .sink import SinkFile, open_sink, read_documents
+
+_WORD = re.compile(r"\w+|[^\w\s]")
+# "<prefix>-00001.jsonl.gz", as written by `Sink`
+_SINK_FILE = re.compile(r"^(?P<prefix>.+)-(?P<number>\d+)\.(?P<format>jsonl(?:\.gz|\.zst)?|parquet)$")
+
+Offsets = List[Tuple[int, int]]
+
+
+class RegexTokenizer:
+    """Dependency-free default: words and punctuation marks count as one token each."""
+    name = "regex"
+
+    def encode_batch(self, texts: Sequence[str]) -> List[Offsets]:
+        return [[m.span() for m in _WORD.finditer(text)] for text in texts]
+
+
+class HFTokenizer:
+    """
+    A Hugging Face fast tokenizer (`transformers` must be installed). Batches are
+    encoded in one call, which the Rust backend spreads over all cores.
+    """
+
+    def __init__(self, name_or_path: str):
+        try:
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError("HFTokenizer requires `transformers` (pip install transformers)") from e
+        self.name = name_or_path
+        self.tokenizer = AutoTokenizer.from_pretrained(name_or_path, use_fast=True)
+        if not self.tokenizer.is_fast:
+            raise ValueError(f"{name_or_path} has no fast tokenizer, which offsets require")
+        self.tokenizer.model_max_length = int(1e30)  # whole documents are encoded, then split
+
+    def encode_batch(self, texts: Sequence[str]) -> List[Offsets]:
+        encoded = self.tokenizer(list(texts), add_special_tokens=False, return_offsets_mapping=True)
+        return [[tuple(span) for span in offsets if span[1] > span[0]] for offsets in encoded["offset_mapping"]]
+
+
+def get_tokenizer(name: Optional[str] = None):
+    """`None`/`"regex"` for `RegexTokenizer`, anything else is loaded with `HFTokenizer`."""
+    if name is None or name == "regex":
+        return RegexTokenizer()
+    return HFTokenizer(name)
+
+
+class Chunker:
+    """
+    Splits documents into chunks of at most `max_tokens` tokens, each sharing
+    `overlap` tokens with the previous one. A chunk preferably ends at a line
+    break within its last quarter, so articles and paragraphs are not cut
+    mid-sentence when avoidable.
+
+    Texts are tokenized `batch_size` documents at a time. Chunk records carry the
+    document's key fields, title, URL and content hash, plus `chunk_index`,
+    `chunk_count`, `start`/`end` character offsets into the document text as it is
+    published (see `normalize_text`) and `n_tokens`.
+    """
+
+    def __init__(self, tokenizer=None, max_tokens: int = 512, overlap: int = 64, batch_size: int = 32):
+        if not 0 <= overlap < max_tokens:
+            raise ValueError("overlap must be at least 0 and smaller than max_tokens")
+        self.tokenizer = tokenizer if tokenizer is not None and not isinstance(tokenizer, str) \
+            else get_tokenizer(tokenizer)
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+        self.batch_size = batch_size
+
+    def spans(self, text: str, offsets: Offsets) -> List[Tuple[int, int, int]]:
+        """`(start char, end char, tokens)` of every chunk of `text`."""
+        spans, first, count = [], 0, len(offsets)
+        while first < count:
+            last = min(first + self.max_tokens, count)  # exclusive
+            if last < count:
+                for candidate in range(last - 1, first + self.max_tokens * 3 // 4, -1):
+                    if "\n" in text[offsets[candidate - 1][1]:offsets[candidate][0]]:
+                        last = candidate
+                        break
+            spans.append((offsets[first][0], offsets[last - 1][1], last - first))
+            if last == count:
+                break
+            first = max(last - self.overlap, first + 1)
+        return spans
+
+    def chunk_documents(self, documents: Iterable[Dict]) -> Iterator[Dict]:
+        batch = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= self.batch_size:
+                yield from self._chunk_batch(batch)
+                batch = []
+        if batch:
+            yield from self._chunk_batch(batch)
+
+    def _chunk_batch(self, documents: List[Dict]) -> Iterator[Dict]:
+        # The pusher cleans published texts the same way, so offsets index into those
+        texts = [normalize_text(document.get('text')) for document in documents]
+        for document, text, offsets in zip(documents, texts, self.tokenizer.encode_batch(texts)):
+            base = {name: document.get(name) for name in KEY_FIELDS}
+            base.update(title=document.get('title'), url=document.get('url'),
+                        content_hash=document.get('content_hash'))
+            spans = self.spans(text, offsets)
+            for index, (start, end, tokens) in enumerate(spans):
+                yield dict(base, chunk_index=index, chunk_count=len(spans), start=start, end=end,
+                           n_tokens=tokens, text=text[start:end])
+
+
+def chunk_file(chunker: Chunker, path: str, out_dir: str, output_format: Optional[str] = None) -> Optional[SinkFile]:
+    """
+    Chunk the documents of an output file into `out_dir`, under the same file
+    name (and by default the same format) as the input. `None` if no document
+    had any text.
+    """
+    match = _SINK_FILE.match(os.path.basename(path))
+    if match is None:
+        raise ValueError(f"{path} is not named like a sink output file (<prefix>-<number>.<format>)")
+    sink = open_sink(output_format or match["format"], out_dir, match["prefix"], first_number=int(match["number"]))
+    sink.write_many(chunker.chunk_documents(read_documents(path)))
+    finished = sink.close()
+    return finished[0] if finished else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="output files (JSONL/Parquet) to chunk")
+    parser.add_argument("--out-dir", default="chunks", help="directory for the chunk files (default: chunks)")
+    parser.add_argument("--tokenizer", default=None, help="Hugging Face tokenizer name or path (default: regex)")
+    parser.add_argument("--max-tokens", type=int, default=512)
+    parser.add_argument("--overlap", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=32, help="documents tokenized per call")
+    args = parser.parse_args(argv)
+
+    chunker = Chunker(args.tokenizer, max_tokens=args.max_tokens, overlap=args.overlap, batch_size=args.batch_size)
+    for path in args.files:
+        sink_file = chunk_file(chunker, path, args.out_dir)
+        logger.info(f"✂️ {path}: {sink_file.documents if sink_file else 0} chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Storage
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+# Logging
+from loguru import logger
+
+# Identity keys
+from .index import KEY_FIELDS, DocumentIndex, document_key
+from .records import without_text
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Text as it is published: line endings unified and surrounding whitespace removed."""
+    return (text or "").replace("\r\n", "\n").replace("\r", "\n").strip()
+
+
+def content_hash(document: Dict) -> str:
+    """sha256 of a document's key fields and normalized text."""
+    digest = hashlib.sha256()
+    for part in document_key(document):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    digest.update(normalize_text(document.get("text")).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class Deduplicator:
+    """
+    Drops duplicate documents around the text fetch and records what changed.
+
+    Before fetching, records whose key was seen recently in this run are dropped
+    (the listing can shift while it is paged, repeating entries from nearby pages).
+    Only the last `window` keys are remembered, so memory stays bounded on long runs.
+    After fetching, every document gets a `content_hash`; documents whose hash equals
+    the one the index stored on the last crawl are dropped, so unchanged documents
+    are neither written nor uploaded again. New and changed documents are appended
+    to a JSONL feed at `feed_path`.
+
+    Unchanged documents are added to the index right away: there is nothing to
+    persist for them, and it keeps their listing fingerprint current.
+    """
+
+    def __init__(self, index: Optional[DocumentIndex] = None, feed_path: Optional[str] = None,
+                 window: int = 100_000):
+        self.index = index
+        self.feed_path = feed_path
+        self.window = window
+        self.skipped_records = 0
+        self.dropped_documents = 0
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def before_fetch(self, records: List[Dict]) -> List[Dict]:
+        kept = []
+        with self._lock:
+            for record in records:
+                key = document_key(record)
+                if key in self._keys:
+                    continue
+                self._keys[key] = None
+                if len(self._keys) > self.window:
+                    self._keys.popitem(last=False)
+                kept.append(record)
+            skipped = len(records) - len(kept)
+            self.skipped_records += skipped
+        if skipped:
+            logger.info(f"♻️ Skipped {skipped} records listed twice")
+        return kept
+
+    def after_fetch(self, documents: Iterable[Dict]) -> List[Dict]:
+        kept, unchanged, changes = [], [], []
+        now = time.time()
+        for document in documents:
+            document['content_hash'] = content_hash(document)
+            previous = self.index.content_hash(document) if self.index is not None else None
+            if previous == document['content_hash']:
+                unchanged.append(without_text(document))
+                continue
+            kept.append(document)
+            changes.append(dict(
+                {field: document.get(field) for field in KEY_FIELDS},
+                status="changed" if previous else "new",
+                title=document.get('title'),
+                url=document.get('url'),
+                content_hash=document['content_hash'],
+                previous_hash=previous,
+                detected_at=now
+            ))
+
+        if unchanged:
+            self.index.add(unchanged)
+            with self._lock:
+                self.dropped_documents += len(unchanged)
+            logger.info(f"♻️ {len(unchanged)} documents unchanged since the last crawl")
+        self._write_feed(changes)
+        return kept
+
+    def _write_feed(self, changes):
+        if not changes or self.feed_path is None:
+            return
+        lines = "".join(json.dumps(change, ensure_ascii=False) + "\n" for change in changes)
+        with self._lock, open(self.feed_path, "a", encoding="utf-8") as feed:
+            feed.write(lines)
@@ -0,0 +1,507 @@
+"""
+Distributed crawls: a coordinator splits the crawl into tasks on a shared SQLite
+queue, and any number of workers, on one machine or several, lease and run them.
+
+    python -m mevzuat_scraper.distributed coordinate --queue crawl.sqlite --categories Kanun KHK
+    python -m mevzuat_scraper.distributed work --queue crawl.sqlite --out-dir out
+    python -m mevzuat_scraper.distributed status --queue crawl.sqlite
+"""
+# Concurrency
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+# Logging
+from loguru import logger
+
+# Scraping
+from .cache import ResponseCache
+from .checkpoint import key_string
+from .scraper import Mevzuat
+from .sink import open_sink
+
+_STATES = ("pending", "leased", "done", "failed")
+
+
+@dataclass
+class Task:
+    """
+    A leased unit of work. `listing` tasks page through `[cursor, end)` of a
+    category's listing and queue a `fetch` task per record; `fetch` tasks carry
+    one metadata record whose text is to be fetched.
+    """
+    task_id: int
+    kind: str
+    mev_tur: str
+    payload: Dict
+    attempts: int
+
+
+class WorkQueue:
+    """
+    Task queue in a SQLite file shared by the coordinator and the workers.
+
+    Workers `lease` tasks for `lease_seconds` and keep them alive with `renew`;
+    a task whose lease runs out is handed to the next worker asking for work, so
+    a crashed or stalled worker only delays its tasks. A worker that finds nothing
+    to lease steals the second half of the longest listing range still being
+    paged (`steal_listing`). Tasks failing `max_attempts` times end up `failed`.
+
+    Fetch tasks are keyed by the document key, so records listed twice (on
+    overlapping pages or after a re-plan) are only fetched once. The file must be
+    on a filesystem with working locks; across machines, that means a shared
+    volume that supports them, not a plain NFS mount.
+    """
+
+    def __init__(self, path: str = "crawl.sqlite", max_attempts: int = 5):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS tasks (
+                task_id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                mev_tur TEXT NOT NULL,
+                key TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_state ON tasks (kind, state, lease_until)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_worker ON tasks (worker, state)")
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction taking the database lock up front, so concurrent leases never interleave."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def add_listing(self, mev_tur: str, start: int, end: int, page_size: int) -> bool:
+        payload = dict(start=start, cursor=start, end=end, page_size=page_size)
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO tasks (kind, mev_tur, key, payload, updated_at) VALUES (?, ?, ?, ?, ?)",
+                ("listing", mev_tur, f"listing:{mev_tur}:{start}", json.dumps(payload), time.time())
+            )
+            return cursor.rowcount > 0
+
+    def add_fetches(self, mev_tur: str, records: Iterable[Dict]) -> int:
+        """Queue a fetch task per record not queued before; returns how many were new."""
+        now = time.time()
+        rows = [("fetch", mev_tur, f"fetch:{key_string(r)}", json.dumps(r, ensure_ascii=False), now)
+                for r in records]
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO tasks (kind, mev_tur, key, payload, updated_at) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            return conn.total_changes - before
+
+    def lease(self, worker: str, kind: str, limit: int = 1, lease_seconds: float = 300) -> List[Task]:
+        """Lease up to `limit` pending tasks of `kind`, or tasks whose lease expired."""
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT task_id, kind, mev_tur, payload, attempts FROM tasks WHERE kind=? "
+                "AND (state='pending' OR (state='leased' AND lease_until < ?)) ORDER BY task_id LIMIT ?",
+                (kind, now, limit)
+            ).fetchall()
+            tasks, exhausted = [], []
+            for task_id, kind, mev_tur, payload, attempts in rows:
+                if attempts >= self.max_attempts:
+                    exhausted.append(task_id)
+                else:
+                    tasks.append(Task(task_id, kind, mev_tur, json.loads(payload), attempts + 1))
+            if exhausted:
+                logger.warning(f"🪦 {len(exhausted)} {kind} tasks failed {self.max_attempts} times, giving up")
+                conn.executemany(
+                    "UPDATE tasks SET state='failed', worker=NULL, lease_until=NULL, "
+                    "error=COALESCE(error, 'lease expired'), updated_at=? WHERE task_id=?",
+                    [(now, task_id) for task_id in exhausted]
+                )
+            conn.executemany(
+                "UPDATE tasks SET state='leased', worker=?, lease_until=?, attempts=attempts+1, updated_at=? "
+                "WHERE task_id=?",
+                [(worker, now + lease_seconds, now, task.task_id) for task in tasks]
+            )
+        return tasks
+
+    def steal_listing(self, worker: str, lease_seconds: float = 300) -> Optional[Task]:
+        """
+        Split the listing task with the most pages left (at least two) and lease
+        its second half to `worker`. The owner learns its new end from `progress`.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            best = None
+            for task_id, mev_tur, payload in conn.execute(
+                    "SELECT task_id, mev_tur, payload FROM tasks "
+                    "WHERE kind='listing' AND state='leased' AND lease_until >= ? AND worker != ?",
+                    (now, worker)):
+                payload = json.loads(payload)
+                pages = -(-(payload['end'] - payload['cursor']) // payload['page_size'])
+                if pages >= 2 and (best is None or pages > best[0]):
+                    best = (pages, task_id, mev_tur, payload)
+            if best is None:
+                return None
+            pages, task_id, mev_tur, payload = best
+            # Never cut into the page the owner is fetching right now
+            middle = payload['cursor'] + (pages - pages // 2) * payload['page_size']
+            stolen = dict(start=middle, cursor=middle, end=payload['end'], page_size=payload['page_size'])
+            payload['end'] = middle
+            conn.execute("UPDATE tasks SET payload=?, updated_at=? WHERE task_id=?",
+                         (json.dumps(payload), now, task_id))
+            cursor = conn.execute(
+                "INSERT INTO tasks (kind, mev_tur, key, payload, state, worker, lease_until, attempts, updated_at) "
+                "VALUES ('listing', ?, ?, ?, 'leased', ?, ?, 1, ?)",
+                (mev_tur, f"listing:{mev_tur}:{middle}", json.dumps(stolen), worker, now + lease_seconds, now)
+            )
+        logger.info(f"🦝 {worker} took {mev_tur} listing [{middle}, {stolen['end']}) from task {task_id}")
+        return Task(cursor.lastrowid, "listing", mev_tur, stolen, 1)
+
+    def progress(self, worker: str, task: Task, cursor: int, lease_seconds: float = 300) -> Optional[int]:
+        """
+        Record that a listing task has been paged up to `cursor` and extend its
+        lease. Returns the task's current end, or None if `worker` lost the task.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT payload FROM tasks WHERE task_id=? AND worker=? AND state='leased'",
+                               (task.task_id, worker)).fetchone()
+            if row is None:
+                return None
+            payload = json.loads(row[0])
+            payload['cursor'] = cursor
+            conn.execute("UPDATE tasks SET payload=?, lease_until=?, updated_at=? WHERE task_id=?",
+                         (json.dumps(payload), now + lease_seconds, now, task.task_id))
+        task.payload = payload
+        return payload['end']
+
+    def renew(self, worker: str, lease_seconds: float = 300) -> int:
+        """Extend every lease `worker` holds; returns how many it still holds."""
+        now = time.time()
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE tasks SET lease_until=? WHERE worker=? AND state='leased'", (now + lease_seconds, worker)
+            ).rowcount
+
+    def complete(self, worker: str, task_ids: Iterable[int]) -> int:
+        """Mark tasks done; returns how many `worker` still held (the rest went to another worker)."""
+        return self._update(worker, task_ids, "UPDATE tasks SET state='done', lease_until=NULL, updated_at=? "
+                                              "WHERE task_id=? AND worker=? AND state='leased'")
+
+    def fail(self, worker: str, task_ids: Iterable[int], error: str) -> int:
+        """Give tasks back for a retry, or mark them failed after `max_attempts`."""
+        return self._update(
+            worker, task_ids,
+            "UPDATE tasks SET state=CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, worker=NULL, "
+            "lease_until=NULL, error=?, updated_at=? WHERE task_id=? AND worker=? AND state='leased'",
+            (self.max_attempts, error)
+        )
+
+    def release(self, worker: str) -> int:
+        """Return every task `worker` holds to the queue, e.g. on shutdown; listings keep their cursor."""
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE tasks SET state='pending', worker=NULL, lease_until=NULL, attempts=MAX(attempts-1, 0), "
+                "updated_at=? WHERE worker=? AND state='leased'", (time.time(), worker)
+            ).rowcount
+
+    def requeue_failed(self) -> int:
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE tasks SET state='pending', attempts=0, updated_at=? WHERE state='failed'", (time.time(),)
+            ).rowcount
+
+    def remaining(self) -> int:
+        """Tasks pending or leased."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Task counts per kind and state."""
+        counts = {}
+        with self._lock:
+            for kind, state, count in self._conn.execute(
+                    "SELECT kind, state, COUNT(*) FROM tasks GROUP BY kind, state"):
+                counts.setdefault(kind, dict.fromkeys(_STATES, 0))[state] = count
+        return counts
+
+    def workers(self) -> Dict[str, int]:
+        """Tasks currently leased per worker."""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT worker, COUNT(*) FROM tasks WHERE state='leased' GROUP BY worker").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _update(self, worker, task_ids, sql, params=()):
+        now = time.time()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(sql, [params + (now, task_id, worker) for task_id in task_ids])
+            return conn.total_changes - before
+
+
+def plan(queue: WorkQueue, mevzuat: Mevzuat, categories: Iterable[str], range_size: int = 5000) -> int:
+    """
+    Queue listing tasks covering every category in ranges of `range_size`
+    records, probing each category's page size and total first. Planning again
+    only adds ranges that are missing, so it is safe to rerun.
+    """
+    added = 0
+    for mev_tur in categories:
+        page_size, _, total = mevzuat.probe_page_size(mev_tur)
+        size = max(page_size, range_size // page_size * page_size)
+        for start in range(0, total, size):
+            added += queue.add_listing(mev_tur, start, min(start + size, total), page_size)
+        logger.info(f"🗺️ {mev_tur}: {total} records in {-(-total // size)} listing tasks of {size}")
+    return added
+
+
+class Worker:
+    """
+    Runs tasks from a `WorkQueue` until none are left.
+
+    Fetch tasks are leased `batch_size` at a time and their documents streamed
+    into this worker's own output files in `out_dir`
+    (`<mev_tur>_<worker_id>_<start time>-<number>.<format>`), so workers can share a directory
+    without ever writing to the same file. Like the single-process crawl, fetch
+    tasks are only marked done once the file holding their documents is
+    finished; until then their leases are renewed in the background, and if the
+    worker dies they expire and are fetched again by another worker. A document
+    can therefore appear twice when a worker stalls past its lease; its key
+    (and `content_hash`, if deduplicated downstream) identifies repeats.
+
+    With no fetch tasks available the worker pages a listing task, and with
+    none pending it steals half of another worker's listing range. Idle workers
+    finish their open files, so nothing stays uncommitted while they wait.
+    """
+
+    def __init__(self, queue: WorkQueue, mevzuat: Mevzuat, out_dir: str = "out",
+                 worker_id: Optional[str] = None, output_format: str = "jsonl.gz",
+                 batch_size: int = 100, max_docs_per_file: int = 1000,
+                 lease_seconds: float = 300, poll_interval: float = 5):
+        self.queue = queue
+        self.mevzuat = mevzuat
+        self.out_dir = out_dir
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.output_format = output_format
+        self.batch_size = batch_size
+        self.max_docs_per_file = max_docs_per_file
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.stats = dict(listing=0, fetched=0, failed=0, files=0)
+        self._started = time.strftime('%Y%m%d_%H%M%S')
+        self._sinks = {}
+        self._held = {}  # mev_tur -> task ids whose documents sit in the open file
+        self._stopped = threading.Event()
+
+    def run(self):
+        logger.info(f"👷 Worker {self.worker_id} started on {self.queue.path}")
+        renewer = threading.Thread(target=self._renew, name="lease-renewal", daemon=True)
+        renewer.start()
+        try:
+            while not self._stopped.is_set():
+                if self._fetch_batch() or self._page_listing():
+                    continue
+                self._flush()
+                if not self.queue.remaining():
+                    break
+                self._stopped.wait(self.poll_interval)  # others still paging or holding leases
+        finally:
+            self._flush()
+            self._stopped.set()
+            renewer.join()
+            released = self.queue.release(self.worker_id)
+            if released:
+                logger.info(f"↩️ Returned {released} unfinished tasks to the queue")
+        logger.info(f"🏁 Worker {self.worker_id} done: {self.stats}")
+        return self.stats
+
+    def stop(self):
+        self._stopped.set()
+
+    def _fetch_batch(self) -> bool:
+        tasks = self.queue.lease(self.worker_id, "fetch", limit=self.batch_size, lease_seconds=self.lease_seconds)
+        if not tasks:
+            return False
+        try:
+            documents = self.mevzuat.request_text([task.payload for task in tasks])
+        except Exception as e:
+            logger.error(f"🛑 Fetching {len(tasks)} texts failed: {e}")
+            self.stats['failed'] += self.queue.fail(self.worker_id, [t.task_id for t in tasks], str(e))
+            return True
+
+        fetched = {key_string(d) for d in documents}
+        failed = [t.task_id for t in tasks if key_string(t.payload) not in fetched]
+        if failed:
+            self.queue.fail(self.worker_id, failed, "text request failed")
+            self.stats['failed'] += len(failed)
+        by_category = {}
+        for task in tasks:
+            if task.task_id not in failed:
+                by_category.setdefault(task.mev_tur, []).append(task.task_id)
+        for mev_tur, task_ids in by_category.items():
+            keys = {key_string(t.payload) for t in tasks if t.task_id in task_ids}
+            self._write(mev_tur, [d for d in documents if key_string(d) in keys], task_ids)
+        self.stats['fetched'] += len(documents)
+        return True
+
+    def _page_listing(self) -> bool:
+        tasks = self.queue.lease(self.worker_id, "listing", lease_seconds=self.lease_seconds)
+        task = tasks[0] if tasks else self.queue.steal_listing(self.worker_id, lease_seconds=self.lease_seconds)
+        if task is None:
+            return False
+        cursor, end = task.payload['cursor'], task.payload['end']
+        try:
+            while end is not None and cursor < end:
+                length = min(task.payload['page_size'], end - cursor)
+                records, _ = self.mevzuat.request_page(task.mev_tur, cursor, length)
+                added = self.queue.add_fetches(task.mev_tur, records)
+                logger.info(f"📑 {task.mev_tur} [{cursor}, {cursor + length}): {added} new fetch tasks")
+                cursor += length
+                end = self.queue.progress(self.worker_id, task, cursor, lease_seconds=self.lease_seconds)
+        except Exception as e:
+            logger.error(f"🛑 Listing {task.mev_tur} at {cursor} failed: {e}")
+            self.queue.fail(self.worker_id, [task.task_id], str(e))
+            return True
+        if end is None:
+            logger.warning(f"⚠️ Lost listing task {task.task_id} to another worker")
+        else:
+            self.queue.complete(self.worker_id, [task.task_id])
+            self.stats['listing'] += 1
+        return True
+
+    def _write(self, mev_tur, documents, task_ids):
+        sink = self._sinks.get(mev_tur)
+        if sink is None:
+            sink = self._sinks[mev_tur] = open_sink(
+                self.output_format, self.out_dir, f"{mev_tur}_{self.worker_id}_{self._started}",
+                max_docs=self.max_docs_per_file
+            )
+        self._held.setdefault(mev_tur, []).extend(task_ids)
+        self._commit(mev_tur, sink.write_many(documents))
+
+    def _flush(self):
+        for mev_tur, sink in self._sinks.items():
+            self._commit(mev_tur, sink.close())
+
+    def _commit(self, mev_tur, files):
+        if not files:
+            return
+        held = self._held.pop(mev_tur, [])
+        done = self.queue.complete(self.worker_id, held)
+        self.stats['files'] += len(files)
+        if done < len(held):
+            logger.warning(f"⚠️ {len(held) - done} tasks in {files[-1].path} expired and went to another worker")
+
+    def _renew(self):
+        while not self._stopped.wait(self.lease_seconds / 3):
+            try:
+                self.queue.renew(self.worker_id, self.lease_seconds)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Could not renew leases: {e}")
+
+
+def report(queue: WorkQueue):
+    for kind, states in sorted(queue.counts().items()):
+        logger.info(f"📊 {kind}: " + ", ".join(f"{count} {state}" for state, count in states.items()))
+    for worker, count in sorted(queue.workers().items()):
+        logger.info(f"📊 {worker}: {count} tasks leased")
+
+
+def build_mevzuat(args) -> Mevzuat:
+    kwargs = dict(concurrency=args.concurrency, rate_limit=args.rate_limit,
+                  cache=ResponseCache(args.cache_dir) if args.cache_dir else None)
+    if args.post_url:
+        kwargs.update(post_url=args.post_url)
+    if args.text_url:
+        kwargs.update(text_url=args.text_url)
+    if getattr(args, "parse_workers", 0):
+        kwargs.update(parse_workers=args.parse_workers)
+    return Mevzuat(**kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queue", default="crawl.sqlite", help="shared queue file (default: crawl.sqlite)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    site = argparse.ArgumentParser(add_help=False)
+    site.add_argument("--concurrency", type=int, default=16, help="requests in flight from this process")
+    site.add_argument("--rate-limit", type=float, default=None, help="request starts per second from this process")
+    site.add_argument("--cache-dir", default=None, help="on-disk HTTP cache (default: none)")
+    site.add_argument("--post-url", default=None, help="listing endpoint, e.g. of benchmarks.server")
+    site.add_argument("--text-url", default=None, help="text endpoint, e.g. of benchmarks.server")
+
+    coordinate = commands.add_parser("coordinate", parents=[site], help="plan the crawl and watch it")
+    coordinate.add_argument("--categories", nargs="+", default=None, metavar="MEV_TUR",
+                            help="categories to crawl (default: every category in config/config.py)")
+    coordinate.add_argument("--range-size", type=int, default=5000, help="records per listing task")
+    coordinate.add_argument("--report-interval", type=float, default=30)
+    coordinate.add_argument("--no-wait", action="store_true", help="exit once the tasks are queued")
+
+    work = commands.add_parser("work", parents=[site], help="run tasks until the queue is drained")
+    work.add_argument("--out-dir", default="out", help="output directory, may be shared by workers")
+    work.add_argument("--worker-id", default=None, help="unique name (default: <hostname>-<pid>)")
+    work.add_argument("--format", default="jsonl.gz", help="jsonl, jsonl.gz, jsonl.zst or parquet")
+    work.add_argument("--batch-size", type=int, default=100, help="fetch tasks leased at a time")
+    work.add_argument("--docs-per-file", type=int, default=1000)
+    work.add_argument("--lease-seconds", type=float, default=300)
+    work.add_argument("--parse-workers", type=int, default=0)
+
+    commands.add_parser("status", help="show task counts and active workers")
+    commands.add_parser("requeue", help="retry failed tasks")
+    args = parser.parse_args(argv)
+
+    queue = WorkQueue(args.queue)
+    try:
+        if args.command == "coordinate":
+            from config.config import Config
+            with build_mevzuat(args) as mevzuat:
+                added = plan(queue, mevzuat, args.categories or Config().mevzuat_turleri, args.range_size)
+            logger.info(f"🗺️ Queued {added} listing tasks in {args.queue}")
+            while not args.no_wait and queue.remaining():
+                report(queue)
+                time.sleep(args.report_interval)
+            report(queue)
+        elif args.command == "work":
+            with build_mevzuat(args) as mevzuat:
+                worker = Worker(queue, mevzuat, args.out_dir, worker_id=args.worker_id,
+                                output_format=args.format, batch_size=args.batch_size,
+                                max_docs_per_file=args.docs_per_file, lease_seconds=args.lease_seconds)
+                worker.run()
+        elif args.command == "status":
+            report(queue)
+        elif args.command == "requeue":
+            logger.info(f"🔁 Requeued {queue.requeue_failed()} failed tasks")
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# Parsing
+from collections import Counter
+from html.parser import HTMLParser
+from types import SimpleNamespace
+
+import bs4
+from bs4 import BeautifulSoup
+from bs4.builder import HTMLParserTreeBuilder
+from bs4.builder._htmlparser import BeautifulSoupHTMLParser
+
+# Logging
+from loguru import logger
+
+# Optional fast backend
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = etree = None
+
+# Tag tables of the BeautifulSoup html.parser builder the stream backend mirrors
+_BUILDER = HTMLParserTreeBuilder()
+_EMPTY_ELEMENT_TAGS = frozenset(_BUILDER.empty_element_tags)
+_PRESERVE_WHITESPACE_TAGS = frozenset(_BUILDER.preserve_whitespace_tags)
+_STRING_CONTAINER_TAGS = frozenset(_BUILDER.string_containers)
+_ASCII_SPACES = frozenset(BeautifulSoup.ASCII_SPACES)
+
+# BeautifulSoup releases whose tree builder the stream backend has been checked against
+_STREAM_VERIFIED_BS4 = ("4.12.", "4.13.", "4.14.")
+
+# Kinds of string segments, as BeautifulSoup classifies them
+_TEXT, _CDATA, _OTHER = "text", "cdata", "other"
+
+
+def extract_bs4(html):
+    """Reference backend: `<body>` text exactly as `BeautifulSoup(html, 'html.parser')` returns it."""
+    body = BeautifulSoup(html, 'html.parser').find('body')
+    return body.get_text(strip=False) if body else None
+
+
+class _BodyTextParser(BeautifulSoupHTMLParser):
+    """
+    Streams the text of the first `<body>` out of `html.parser` events without
+    building a tree.
+
+    Character references are decoded by the inherited BeautifulSoup handlers;
+    every other event replays what BeautifulSoup's html.parser tree builder does:
+    the open-tag stack (implicitly closed void elements, end tags popping up to
+    the most recent matching start tag), splitting strings at tags, comments and
+    declarations, collapsing whitespace-only strings outside `<pre>`/`<textarea>`,
+    and `get_text()` skipping comments, doctypes and anything inside
+    `<script>`, `<style>`, `<template>`, `<rt>` and `<rp>`.
+    """
+
+    def __init__(self):
+        # Skip BeautifulSoupHTMLParser.__init__, it expects a real soup
+        HTMLParser.__init__(self, convert_charrefs=False)
+        self.soup = SimpleNamespace(original_encoding=None, contains_replacement_characters=False)
+        self.stack = []                 # names of open tags
+        self.open_counts = Counter()
+        self.preserve_stack = []        # stack positions of open <pre>/<textarea>
+        self.container_stack = []       # stack positions of open string containers
+        self.already_closed_empty_element = []
+        self.body_position = None       # stack position of the first <body>, while open
+        self.body_seen = False
+        self.current_data = []
+        self.parts = []
+
+    def text(self):
+        return "".join(self.parts) if self.body_seen else None
+
+    # Tree bookkeeping (BeautifulSoup.pushTag / popTag / _popToTag)
+    def _push(self, name):
+        position = len(self.stack)
+        self.stack.append(name)
+        self.open_counts[name] += 1
+        if name in _PRESERVE_WHITESPACE_TAGS:
+            self.preserve_stack.append(position)
+        if name in _STRING_CONTAINER_TAGS:
+            self.container_stack.append(position)
+        if name == "body" and not self.body_seen:
+            self.body_seen = True
+            self.body_position = position
+
+    def _pop(self):
+        position = len(self.stack) - 1
+        name = self.stack.pop()
+        self.open_counts[name] -= 1
+        if self.preserve_stack and self.preserve_stack[-1] == position:
+            self.preserve_stack.pop()
+        if self.container_stack and self.container_stack[-1] == position:
+            self.container_stack.pop()
+        if self.body_position == position:
+            self.body_position = None
+        return name
+
+    def _pop_to(self, name):
+        if not self.open_counts.get(name):
+            return
+        while self.stack:
+            if self._pop() == name:
+                break
+
+    # String segments (BeautifulSoup.endData)
+    def _end_data(self, kind=_TEXT):
+        if not self.current_data:
+            return
+        data = "".join(self.current_data)
+        self.current_data = []
+        if not self.preserve_stack and all(c in _ASCII_SPACES for c in data):
+            data = "\n" if "\n" in data else " "
+        if kind == _TEXT and self.container_stack:
+            kind = _OTHER
+        if kind != _OTHER and self.body_position is not None:
+            self.parts.append(data)
+
+    def close(self):
+        super().close()
+        self._end_data()
+
+    # html.parser callbacks (bs4.builder._htmlparser.BeautifulSoupHTMLParser)
+    def handle_startendtag(self, name, attrs):
+        self.handle_starttag(name, attrs, handle_empty_element=False)
+        self.handle_endtag(name)
+
+    def handle_starttag(self, name, attrs, handle_empty_element=True):
+        self._end_data()
+        self._push(name)
+        if handle_empty_element and name in _EMPTY_ELEMENT_TAGS:
+            self.handle_endtag(name, check_already_closed=False)
+            self.already_closed_empty_element.append(name)
+
+    def handle_endtag(self, name, check_already_closed=True):
+        if check_already_closed and name in self.already_closed_empty_element:
+            self.already_closed_empty_element.remove(name)
+        else:
+            self._end_data()
+            self._pop_to(name)
+
+    def handle_data(self, data):
+        self.current_data.append(data)
+
+    def handle_comment(self, data):
+        self._end_data()
+        self.handle_data(data)
+        self._end_data(_OTHER)
+
+    def handle_decl(self, data):
+        self._end_data()
+        self.handle_data(data[len("DOCTYPE "):])
+        self._end_data(_OTHER)
+
+    def unknown_decl(self, data):
+        kind = _OTHER
+        if data.upper().startswith("CDATA["):
+            kind = _CDATA
+            data = data[len("CDATA["):]
+        self._end_data()
+        self.handle_data(data)
+        self._end_data(kind)
+
+    def handle_pi(self, data):
+        self._end_data()
+        self.handle_data(data)
+        self._end_data(_OTHER)
+
+
+def extract_stream(html):
+    """Same output as `extract_bs4`, without building a BeautifulSoup tree."""
+    parser = _BodyTextParser()
+    parser.feed(html)
+    parser.close()
+    return parser.text()
+
+
+def extract_lxml(html):
+    """
+    Fastest backend, using libxml2's HTML parser. Not byte-identical to the
+    reference: libxml2 normalizes line endings, repairs markup differently and
+    resolves unknown entities its own way.
+    """
+    try:
+        root = lxml.html.document_fromstring(html)
+    except etree.ParserError:
+        return None
+    body = root.find('body')
+    if body is None:
+        return None
+    etree.strip_elements(body, etree.Comment, etree.ProcessingInstruction,
+                         'script', 'style', 'template', 'rt', 'rp', with_tail=False)
+    return "".join(body.itertext())
+
+
+EXTRACTORS = {
+    "bs4": extract_bs4,
+    "stream": extract_stream,
+    "lxml": extract_lxml,
+}
+
+
+def get_extractor(name="auto"):
+    """
+    Return a function mapping an HTML page to the text of its `<body>` (None if it
+    has no body). "auto" picks "stream", the fastest backend whose output is
+    identical to the original BeautifulSoup extraction, as long as the installed
+    BeautifulSoup is a release it was verified against. Unavailable backends fall
+    back to "bs4".
+    """
+    if name == "auto":
+        name = "stream" if bs4.__version__.startswith(_STREAM_VERIFIED_BS4) else "bs4"
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor '{name}', expected one of {', '.join(EXTRACTORS)} or 'auto'")
+    if name == "lxml" and lxml is None:
+        logger.warning("⚠️ lxml is not installed, falling back to the BeautifulSoup extractor")
+        name = "bs4"
+    return EXTRACTORS[name]
@@ -0,0 +1,104 @@
+# Concurrency
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+
+# Logging
+from loguru import logger
+from . import metrics
+from .records import DocumentRecord
+
+
+class HostRateLimiter:
+    """
+    Spaces out request starts per host so that no host receives more than
+    `rate` requests per second. A rate of None disables the cap.
+
+    Instances hold asyncio locks and must only be used inside a single event loop.
+    """
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self._next_slot = {}
+        self._locks = {}
+
+    async def wait(self, host):
+        if not self.rate:
+            return
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            slot = max(self._next_slot.get(host, now), now)
+            self._next_slot[host] = slot + 1.0 / self.rate
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class AsyncTextFetcher:
+    """
+    Fetches legislation texts for a batch of metadata records concurrently.
+
+    Blocking `Mevzuat._request_text` calls run on a thread pool, gated by an
+    asyncio semaphore (`concurrency`) and a per-host rate cap (`rate_limit`,
+    requests/second). If the `Mevzuat` has a parse pool, the threads only
+    download pages and text extraction runs in the pool's worker processes.
+    A downloaded page waits for a parse slot on its fetch thread, so the pool's
+    `max_in_flight` bounds the pages queued for parsing without limiting how
+    many downloads run before that.
+    Results keep the input order; failed documents are logged and left out,
+    exactly like the serial loop did. If the `Mevzuat` has a blob store, texts
+    are spilled to it and the results are `DocumentRecord` handles.
+    """
+
+    def __init__(self, mevzuat, concurrency=8, rate_limit=None):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.mevzuat = mevzuat
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+
+    async def fetch_all(self, metadata):
+        metadata = list(metadata)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = HostRateLimiter(self.rate_limit)
+        loop = asyncio.get_running_loop()
+        parse_pool = self.mevzuat.parse_pool
+        request = self.mevzuat._request_text if parse_pool is None else self.mevzuat._request_html
+
+        with ThreadPoolExecutor(max_workers=self.concurrency,
+                                thread_name_prefix="mevzuat-text") as executor:
+            async def fetch(i, m):
+                try:
+                    async with semaphore:
+                        await limiter.wait(urlsplit(self.mevzuat.text_url).netloc)
+                        url, page = await loop.run_in_executor(
+                            executor,
+                            partial(request, params=m['url_params'])
+                        )
+                    if parse_pool is None:
+                        text = page
+                    else:
+                        with metrics.PARSE_SECONDS.time():
+                            # Blocks a fetch thread, not the event loop, while the pool is full
+                            parsing = await loop.run_in_executor(executor, parse_pool.submit, page)
+                            text = await asyncio.wrap_future(parsing)
+                        text = self.mevzuat._check_text(text)
+                except Exception as e:
+                    metrics.ERRORS.inc(stage="text", type=type(e).__name__)
+                    logger.error(f"An error occured while requesting text:\n {e}")
+                    return None
+                metrics.DOCUMENTS.inc(stage="fetched")
+                logger.info(f" - ✅ Retrieved Text @ {i+1}, Text[:5] = {text[:5].strip()} ... ")
+                if self.mevzuat.blob_store is not None:
+                    return DocumentRecord.spill(self.mevzuat.blob_store, text, url=url, **m)
+                return dict(text=text, url=url, **m)
+
+            results = await asyncio.gather(*(fetch(i, m) for i, m in enumerate(metadata)))
+
+        return [r for r in results if r is not None]
+
+    def fetch(self, metadata):
+        return asyncio.run(self.fetch_all(metadata))
@@ -0,0 +1,134 @@
+# Storage
+import copy
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Logging
+from loguru import logger
+
+# Fields that identify one published version of a legislation document
+KEY_FIELDS = ('mevzuat_no', 'mvzuat_turu', 'resmi_g_tarih', 'resmi_g_sayisi')
+
+
+def document_key(record: Dict) -> Tuple[str, ...]:
+    """Identity key of a metadata record or scraped document."""
+    return tuple(str(record.get(field) or '') for field in KEY_FIELDS)
+
+
+def metadata_fingerprint(record: Dict) -> str:
+    """Hash of the listing fields that are not part of the key."""
+    raw = "\x1f".join(str(record.get(field) or '') for field in ('title', 'url_params'))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class DocumentIndex:
+    """
+    SQLite index of already-scraped documents, used for incremental crawls.
+
+    A metadata record is "new" when its key has never been stored, "changed" when
+    its key is known but its title or URL differ from the stored ones, and "known"
+    otherwise. Records are added once their documents are persisted, so a crash
+    between fetching and saving simply refetches them next time.
+
+    Records carrying a `content_hash` (see `mevzuat_scraper.dedup`) also store it,
+    which lets the next crawl tell whether a refetched document actually changed.
+    """
+
+    def __init__(self, path: str = "index.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS documents (
+                mevzuat_no TEXT NOT NULL,
+                mvzuat_turu TEXT NOT NULL,
+                resmi_g_tarih TEXT NOT NULL,
+                resmi_g_sayisi TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                content_hash TEXT,
+                PRIMARY KEY (mevzuat_no, mvzuat_turu, resmi_g_tarih, resmi_g_sayisi)
+            )"""
+        )
+        # Indexes created before content hashing lack the column
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+        if "content_hash" not in columns:
+            logger.info(f"🗂️ Adding content hashes to {path}")
+            self._conn.execute("ALTER TABLE documents ADD COLUMN content_hash TEXT")
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def __contains__(self, record):
+        return self.status(record) != "new"
+
+    def status(self, record: Dict) -> str:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint FROM documents WHERE mevzuat_no=? AND mvzuat_turu=? "
+                "AND resmi_g_tarih=? AND resmi_g_sayisi=?",
+                document_key(record)
+            ).fetchone()
+        if row is None:
+            return "new"
+        return "known" if row[0] == metadata_fingerprint(record) else "changed"
+
+    def content_hash(self, record: Dict) -> Optional[str]:
+        """Content hash stored for the record's key, None if unknown."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM documents WHERE mevzuat_no=? AND mvzuat_turu=? "
+                "AND resmi_g_tarih=? AND resmi_g_sayisi=?",
+                document_key(record)
+            ).fetchone()
+        return row[0] if row else None
+
+    def unseen(self, records: Iterable[Dict]) -> List[Dict]:
+        """Records that are new or changed since they were last stored."""
+        return [r for r in records if self.status(r) != "known"]
+
+    def add(self, records: Iterable[Dict]):
+        now = time.time()
+        rows = [document_key(r) + (metadata_fingerprint(r), now, r.get('content_hash')) for r in records]
+        with self._lock:
+            # A record without a content hash keeps the one stored before
+            self._conn.executemany(
+                "INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (mevzuat_no, mvzuat_turu, resmi_g_tarih, resmi_g_sayisi) DO UPDATE SET "
+                "fingerprint=excluded.fingerprint, updated_at=excluded.updated_at, "
+                "content_hash=COALESCE(excluded.content_hash, documents.content_hash)",
+                rows
+            )
+            self._conn.commit()
+
+    def iter_unseen(self, pages: Iterable[List[Dict]], stop_after_known_pages: int = 3) -> Iterator[List[Dict]]:
+        """
+        Filter metadata pages down to unseen records. Pages keep their type and
+        attributes (e.g. the offsets of a `MetadataPage`); fully known pages are dropped.
+
+        The listing is ordered newest first, so once `stop_after_known_pages`
+        consecutive pages contain nothing new, the rest of the corpus is assumed
+        to be known and paging stops. Pass None to always page to the end.
+        """
+        known_pages = 0
+        for page in pages:
+            fresh = self.unseen(page)
+            if fresh:
+                known_pages = 0
+                fresh_page = copy.copy(page)
+                fresh_page[:] = fresh
+                yield fresh_page
+                continue
+            known_pages += 1
+            if stop_after_known_pages is not None and known_pages >= stop_after_known_pages:
+                logger.info(f"⏹️ {known_pages} consecutive pages already indexed, stopping early")
+                return
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
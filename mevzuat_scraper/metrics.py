@@ -0,0 +1,331 @@
+# Concurrency
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+# Logging
+from loguru import logger
+
+# Seconds; wide enough for a cached page up to a slow Hub commit
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key, **extra) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra.items())
+        if not pairs:
+            return ""
+        escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{self._labels(key)} {_format(value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. requests or bytes."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._values.values())
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. a queue depth or requests in flight."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class _HistogramValue:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    """Distribution of observations, e.g. latencies, in cumulative buckets."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = _HistogramValue(self.buckets)
+            histogram.counts[bisect.bisect_left(self.buckets, value)] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def series(self) -> Dict[Tuple[str, ...], Tuple[int, float]]:
+        """`(count, sum)` of every label combination."""
+        with self._lock:
+            return {key: (h.count, h.sum) for key, h in self._values.items()}
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """
+        Estimate the q-quantile by linear interpolation inside its bucket, like
+        PromQL's `histogram_quantile`. None without observations.
+        """
+        with self._lock:
+            histogram = self._values.get(self._key(labels))
+            if histogram is None or histogram.count == 0:
+                return None
+            counts = list(histogram.counts)
+            total = histogram.count
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]  # beyond the largest bucket
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def _render_value(self, key, histogram):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), histogram.counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{self._labels(key, le=_format(bound))} {cumulative}")
+        lines.append(f"{self.name}_sum{self._labels(key)} {_format(histogram.sum)}")
+        lines.append(f"{self.name}_count{self._labels(key)} {histogram.count}")
+        return lines
+
+
+def _format(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Named metrics of one process, rendered in the Prometheus text format by
+    `render`, `write` (a dump file, e.g. for node_exporter's textfile collector)
+    or `serve` (an HTTP endpoint). Asking for an existing name returns the
+    metric registered first.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labelnames, buckets=buckets)
+
+    def _register(self, cls, name, help, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} is already registered as a {metric.kind}")
+            return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        return "\n".join(line for _, metric in metrics for line in metric.render()) + "\n"
+
+    def write(self, path: str):
+        """Write `render()` to `path`, replacing it atomically."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def write_every(self, path: str, interval: float = 15) -> threading.Event:
+        """Rewrite the dump file every `interval` seconds until the returned event is set."""
+        stopped = threading.Event()
+
+        def loop():
+            while not stopped.wait(interval):
+                self.write(path)
+            self.write(path)
+
+        threading.Thread(target=loop, name="metrics-dump", daemon=True).start()
+        return stopped
+
+    def serve(self, port: int = 9108, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve `/metrics` on a daemon thread; call `shutdown()` on the result to stop."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info(f"📈 Serving metrics on http://{host}:{server.server_port}/metrics")
+        return server
+
+    def summary(self) -> List[str]:
+        """
+        Human-readable end-of-run lines: count, rate, mean/p50/p99 of every
+        histogram series and the totals of every counter.
+        """
+        elapsed = max(time.time() - self.started, 1e-9)
+        lines = [f"run time {elapsed:.0f}s"]
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        for name, metric in metrics:
+            if isinstance(metric, Histogram):
+                for key, (count, total) in sorted(metric.series().items()):
+                    if not count:
+                        continue
+                    labels = dict(zip(metric.labelnames, key))
+                    p50, p99 = metric.quantile(0.5, **labels), metric.quantile(0.99, **labels)
+                    lines.append(
+                        f"{name}{metric._labels(key)}: {count} ({count / elapsed:.1f}/s), "
+                        f"mean {total / count:.3f}s, p50 {p50:.3f}s, p99 {p99:.3f}s"
+                    )
+            elif isinstance(metric, Counter):
+                with metric._lock:
+                    items = sorted(metric._values.items())
+                for key, value in items:
+                    lines.append(f"{name}{metric._labels(key)}: {_format(value)} ({value / elapsed:.1f}/s)")
+        return lines
+
+    def log_summary(self):
+        for line in self.summary():
+            logger.info(f"📈 {line}")
+
+
+# Process-wide registry the scraper, pipeline, sinks and pusher record into
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "mevzuat_request_seconds", "HTTP request latency, retries included", ["endpoint"])
+RESPONSES = REGISTRY.counter(
+    "mevzuat_responses_total", "HTTP responses by status code", ["endpoint", "status"])
+RESPONSE_BYTES = REGISTRY.counter(
+    "mevzuat_response_bytes_total", "Response body bytes downloaded", ["endpoint"])
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "mevzuat_requests_in_flight", "HTTP requests currently in flight", ["endpoint"])
+CACHE_HITS = REGISTRY.counter(
+    "mevzuat_cache_hits_total", "Responses served from the on-disk cache without a request", ["endpoint"])
+RETRIES = REGISTRY.counter(
+    "mevzuat_retries_total", "Retries scheduled by the HTTP session", ["reason"])
+ERRORS = REGISTRY.counter(
+    "mevzuat_errors_total", "Failures by stage and exception type", ["stage", "type"])
+DOCUMENTS = REGISTRY.counter(
+    "mevzuat_documents_total", "Documents passing each stage", ["stage"])
+PARSE_SECONDS = REGISTRY.histogram(
+    "mevzuat_parse_seconds", "HTML to text extraction time, queueing for a parse worker included")
+WRITE_SECONDS = REGISTRY.histogram(
+    "mevzuat_write_seconds", "Time to write one batch to the output sink", ["format"])
+WRITTEN_BYTES = REGISTRY.counter(
+    "mevzuat_written_bytes_total", "Uncompressed document bytes written to the output sink", ["format"])
+STAGE_SECONDS = REGISTRY.histogram(
+    "pipeline_stage_seconds", "Time a pipeline stage spends on one item", ["stage"])
+QUEUE_DEPTH = REGISTRY.gauge(
+    "pipeline_queue_depth", "Items waiting in front of a pipeline stage", ["pipeline", "stage"])
+PUSH_SECONDS = REGISTRY.histogram(
+    "hf_push_seconds", "Duration of a push to the Hugging Face Hub", ["method"])
+UPLOAD_BYTES = REGISTRY.counter(
+    "hf_upload_bytes_total", "Parquet bytes committed to the Hugging Face Hub")
+UPLOAD_QUEUE_DEPTH = REGISTRY.gauge(
+    "hf_upload_queue_depth", "Shards waiting for the background uploader")
+BLOB_STORE_BYTES = REGISTRY.gauge(
+    "mevzuat_blob_store_bytes", "Spilled text bytes still referenced by a document in flight")
+
+
+def endpoint_name(url: str) -> str:
+    """Low-cardinality endpoint label: the URL path without its query."""
+    return urlsplit(url).path.lower() or "/"
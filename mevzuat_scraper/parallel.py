@@ -0,0 +1,92 @@
+# Concurrency
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator
+
+# Parsing
+from .extract import get_extractor
+
+
+def ordered_map(submit: Callable, items: Iterable, max_in_flight: int) -> Iterator:
+    """
+    Yield `future.result()` for `submit(item)` over `items`, in input order, with
+    at most `max_in_flight` futures outstanding. Stopping the iteration early
+    cancels whatever has not started yet.
+    """
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(submit(item))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+# One extractor per worker process, looked up by backend name
+_worker_extractors = {}
+
+
+def _extract(backend, html):
+    extract = _worker_extractors.get(backend)
+    if extract is None:
+        extract = _worker_extractors[backend] = get_extractor(backend)
+    return extract(html)
+
+
+class ParsePool:
+    """
+    Extracts text from raw HTML bodies on a pool of worker processes, so parsing
+    runs on every core instead of on the threads doing network I/O.
+
+    `max_in_flight` bounds how many bodies are queued in the pool at once
+    (default: four per worker), which also bounds memory held by pending pages.
+    The bound holds across every caller sharing the pool: `submit` blocks until
+    a slot is free.
+    """
+
+    def __init__(self, extractor="auto", workers=None, max_in_flight=None):
+        self.extractor = extractor
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.workers * 4
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def executor(self):
+        # Fetch threads submit concurrently; only one of them may start the pool
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def submit(self, html):
+        self._slots.acquire()
+        try:
+            future = self.executor.submit(_extract, self.extractor, html)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def map(self, pages: Iterable[str]) -> Iterator:
+        return ordered_map(self.submit, pages, self.max_in_flight)
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
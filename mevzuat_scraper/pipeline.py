@@ -0,0 +1,120 @@
+# Concurrency
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, List, Optional
+
+# Logging
+from loguru import logger
+from . import metrics
+
+# End-of-stream marker passed down the queues
+_DONE = object()
+
+
+@dataclass
+class Batch:
+    """A unit of work flowing through the crawl pipeline."""
+    number: int
+    mev_tur: str
+    records: List[dict]
+    documents: List[dict] = field(default_factory=list)
+    end_offset: Optional[int] = None  # pagination offset right after this batch
+
+
+class Pipeline:
+    """
+    Producer/consumer pipeline: a source iterable followed by a chain of stages,
+    each running on its own thread and joined by bounded queues.
+
+    A stage is a callable taking one item and returning the item for the next
+    stage, or None to drop it. Because every stage runs concurrently, total wall
+    time approaches that of the slowest stage; `queue_size` bounds how far a fast
+    stage may run ahead of a slow one.
+
+    If any stage raises, the source stops producing, remaining items are drained
+    without being processed, and `run()` re-raises the first error.
+
+    Time spent per item and the depth of each stage's input queue are recorded
+    in `mevzuat_scraper.metrics`, labelled with `name`.
+    """
+
+    def __init__(self, source: Iterable, queue_size: int = 2, name: str = "pipeline"):
+        self.name = name
+        self.source = source
+        self.queue_size = queue_size
+        self.stages: List[tuple] = []
+        self._errors: List[BaseException] = []
+        self._failed = threading.Event()
+
+    def add_stage(self, name: str, fn: Callable[[Any], Any],
+                  on_end: Optional[Callable[[], Iterable]] = None) -> "Pipeline":
+        """
+        Append a stage. `on_end`, if given, is called once the stage's input is
+        exhausted and may return final items to pass on (e.g. buffered output).
+        """
+        self.stages.append((name, fn, on_end))
+        return self
+
+    def run(self):
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads = [threading.Thread(target=self._produce, args=(queues[0] if queues else None,),
+                                    name="pipeline-source", daemon=True)]
+        for i, (name, fn, on_end) in enumerate(self.stages):
+            out = queues[i + 1] if i + 1 < len(queues) else None
+            threads.append(threading.Thread(target=self._consume, args=(name, fn, on_end, queues[i], out),
+                                            name=f"pipeline-{name}", daemon=True))
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+    def _fail(self, name, error):
+        metrics.ERRORS.inc(stage=name, type=type(error).__name__)
+        logger.error(f"🛑 Pipeline stage '{name}' failed: {error}")
+        self._errors.append(error)
+        self._failed.set()
+
+    def _produce(self, out):
+        try:
+            for item in self.source:
+                if self._failed.is_set():
+                    break
+                if out is not None:
+                    out.put(item)
+        except Exception as e:
+            self._fail("source", e)
+        finally:
+            if out is not None:
+                out.put(_DONE)
+
+    def _consume(self, name, fn, on_end, inp, out):
+        while True:
+            item = inp.get()
+            metrics.QUEUE_DEPTH.set(inp.qsize(), pipeline=self.name, stage=name)
+            if item is _DONE:
+                break
+            if self._failed.is_set():
+                continue  # drain so upstream never blocks on a full queue
+            try:
+                with metrics.STAGE_SECONDS.time(stage=name):
+                    result = fn(item)
+            except Exception as e:
+                self._fail(name, e)
+                continue
+            if result is not None and out is not None:
+                out.put(result)
+
+        if on_end is not None and not self._failed.is_set():
+            try:
+                for result in on_end() or ():
+                    if out is not None:
+                        out.put(result)
+            except Exception as e:
+                self._fail(name, e)
+        if out is not None:
+            out.put(_DONE)
@@ -1,111 +1,430 @@
 from dotenv import load_dotenv
 import os
+import gzip
+import hashlib
+import io
+import tempfile
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import nullcontext
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as pa_ipc
+import pyarrow.parquet as pq
 from datasets import Dataset, DatasetDict
-from huggingface_hub import HfApi
+from datasets.table import InMemoryTable
+from huggingface_hub import HfApi, CommitOperationAdd, DatasetCard
+from huggingface_hub.utils import EntryNotFoundError
 import json
-from typing import List, Dict, Union, Optional
+from typing import List, Dict, Iterator, Union, Optional
 import logging
 
+from . import metrics
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 load_dotenv()
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Splits the Hub infers from `data/{split}-*` shard names; any other split has to be
+# declared in the `configs` of the dataset card
+DEFAULT_SPLITS = {"train", "test", "validation"}
+
+# Characters skipped before the next record: outside/inside a top-level JSON array
+_JSON_SKIP = {False: " \t\r\n", True: " \t\r\n,"}
+
+
+def _open_text(path: str):
+    """Open a text file for reading, decompressing .gz/.zst by extension."""
+    if path.endswith(".gz"):
+        return gzip.open(path, 'rt', encoding='utf-8-sig')
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError("Reading zstd files requires the 'zstandard' package")
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return io.TextIOWrapper(raw, encoding='utf-8-sig')
+    return open(path, 'r', encoding='utf-8-sig')
+
+
+def iter_json_records(path: str, read_size: int = 1 << 20) -> Iterator[Dict]:
+    """
+    Stream the records of a JSON array file or a JSONL file without loading it whole.
+
+    The file is read `read_size` characters at a time and records are decoded
+    incrementally, so memory use is bounded by the largest single record.
+
+    Args:
+        path: JSON or JSONL file, optionally .gz/.zst-compressed
+        read_size: Characters read per step
+
+    Yields:
+        Dict: One record at a time
+    """
+    decoder = json.JSONDecoder()
+    with _open_text(path) as f:
+        buffer, pos, eof = "", 0, False
+        array = None  # whether the file is a top-level JSON array, decided by its first character
+        while True:
+            skip = _JSON_SKIP[bool(array)]
+            while pos < len(buffer) and buffer[pos] in skip:
+                pos += 1
+            if pos == len(buffer):
+                if eof:
+                    if array:
+                        raise ValueError(f"Unterminated JSON array in {path}")
+                    return
+                buffer, pos = f.read(read_size), 0
+                eof = not buffer
+                continue
+
+            if array is None:
+                array = buffer[pos] == '['
+                pos += array
+                continue
+            if array and buffer[pos] == ']':
+                return
+
+            try:
+                record, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # The record continues past the buffer; read at least as much again
+                chunk = f.read(max(read_size, len(buffer) - pos))
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            yield record
+
+
+class ShardManifest:
+    """
+    Local record of the parquet shards already on the Hub: for every repository,
+    the path of each shard in the repo and the sha256 of its content. The JSON
+    file is replaced atomically after every change.
+    """
+
+    def __init__(self, path: str = "hub_manifest.json"):
+        """
+        Load the manifest, starting empty if the file does not exist.
+
+        Args:
+            path: Location of the manifest JSON file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.repos: Dict[str, Dict[str, str]] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.repos = json.load(f).get("repos", {})
+
+    def get(self, repo_id: str, path_in_repo: str) -> Optional[str]:
+        """Return the sha256 recorded for a shard, or None if it was never uploaded."""
+        with self._lock:
+            return self.repos.get(repo_id, {}).get(path_in_repo)
+
+    def splits(self, repo_id: str) -> set:
+        """Names of the splits that have shards in a repository."""
+        with self._lock:
+            return {os.path.basename(path).split("-", 1)[0] for path in self.repos.get(repo_id, {})}
+
+    def update(self, repo_id: str, shards: Dict[str, str]):
+        """
+        Record uploaded shards.
+
+        Args:
+            repo_id: Repository the shards were committed to
+            shards: Mapping of path in the repo to sha256 of the uploaded content
+        """
+        with self._lock:
+            self.repos.setdefault(repo_id, {}).update(shards)
+            self._save()
+
+    def replace(self, repo_id: str, shards: Dict[str, str]):
+        """Replace everything recorded for a repository."""
+        with self._lock:
+            self.repos[repo_id] = dict(shards)
+            self._save()
+
+    def _save(self):
+        # Caller holds the lock
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"repos": self.repos}, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
 class HuggingfacePusher:
     """
     A class to push tabular data to Hugging Face Hub as datasets.
     Specifically designed for Turkish legislation/law documents.
     """
 
-    def __init__(self, HF_TOKEN: Optional[str] = None):
+    def __init__(self, HF_TOKEN: Optional[str] = None, api: Optional[HfApi] = None,
+                 manifest: Union[ShardManifest, str, None] = None,
+                 cache_dir: str = ".cache/hf_prepare", chunk_size: int = 10000):
         """
         Initialize the HuggingfacePusher with authentication token.
         
         Args:
             HF_TOKEN: Hugging Face API token. If None, tries to get from environment.
+            api: Client used for shard commits (default: `HfApi(token=HF_TOKEN)`).
+                Any object with `create_repo`, `create_commit`, `list_repo_tree`
+                and `hf_hub_download` works, e.g. a local fake in tests.
+            manifest: `ShardManifest` or path to its file (default: hub_manifest.json)
+            cache_dir: Where prepared files (memory-mapped Arrow) and shards being
+                uploaded are written
+            chunk_size: Records cleaned at a time when preparing a file
         """
         self.token = HF_TOKEN or os.environ.get('HF_TOKEN')
-        if not self.token:
+        if not self.token and api is None:
             raise Exception("Please provide a Hugging Face token via HF_TOKEN parameter or environment variable")
         
-        self.api = HfApi(token=self.token)
+        self.api = api or HfApi(token=self.token)
+        if not isinstance(manifest, ShardManifest):
+            manifest = ShardManifest(manifest or "hub_manifest.json")
+        self.manifest = manifest
+        self.cache_dir = cache_dir
+        self.chunk_size = chunk_size
+        self._created_repos = set()
+        self._card_lock = threading.Lock()
         logger.info("HuggingfacePusher initialized successfully")
 
-    def prepare_dataset(self, data: Union[List[Dict], str, pd.DataFrame]) -> Dataset:
+    def prepare_dataset(self, data: Union[List[Dict], str, pd.DataFrame, pa.Table]) -> Dataset:
         """
         Prepare the data as a Hugging Face Dataset.
+
+        Everything is converted to a `pyarrow.Table` and cleaned with Arrow compute
+        kernels; the Dataset wraps the cleaned table without another copy, so no
+        pandas round trip is involved. Files are prepared out of core, see
+        `prepare_file`.
         
         Args:
-            data: Input data - can be a list of dictionaries, JSON file path, or pandas DataFrame
+            data: Input data - can be a list of dictionaries, a file path (JSON array,
+                JSONL optionally .gz/.zst-compressed, or Parquet), a pandas DataFrame,
+                a pyarrow Table or an already prepared Dataset (returned as is)
             
         Returns:
             Dataset: Hugging Face Dataset object
         """
-        # Handle different input types
+        if isinstance(data, Dataset):
+            # Already prepared
+            return data
+
         if isinstance(data, str):
-            # Assume it's a file path
-            logger.info(f"Loading data from file: {data}")
-            with open(data, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        
-        if isinstance(data, list):
-            # Convert list of dictionaries to pandas DataFrame
-            logger.info(f"Converting {len(data)} records to DataFrame")
-            df = pd.DataFrame(data)
-        elif isinstance(data, pd.DataFrame):
-            df = data
-        else:
-            raise ValueError("Data must be a list of dictionaries, file path, or pandas DataFrame")
+            return self.prepare_file(data)
+
+        table = self._to_table(data)
         
         # Clean and prepare the data
-        df = self._clean_dataframe(df)
+        table = self._clean_table(table)
         
-        # Convert to Hugging Face Dataset
-        dataset = Dataset.from_pandas(df)
+        # Wrap the Arrow table as a Hugging Face Dataset, sharing its buffers
+        dataset = Dataset(InMemoryTable(table))
         logger.info(f"Created dataset with {len(dataset)} rows and {len(dataset.column_names)} columns")
         
         return dataset
 
-    def _clean_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _to_table(self, data: Union[List[Dict], pd.DataFrame, pa.Table]) -> pa.Table:
+        """
+        Load the supported input types into a `pyarrow.Table`.
+
+        Args:
+            data: Input data, as for `prepare_dataset`
+
+        Returns:
+            pa.Table: The data, with all-null columns typed as strings
         """
-        Clean and prepare the DataFrame for Hugging Face upload.
+        if isinstance(data, list):
+            logger.info(f"Converting {len(data)} records to an Arrow table")
+            table = pa.Table.from_pylist(data)
+        elif isinstance(data, pd.DataFrame):
+            table = pa.Table.from_pandas(data, preserve_index=False)
+        elif isinstance(data, pa.Table):
+            table = data
+        else:
+            raise ValueError("Data must be a list of dictionaries, file path, pandas DataFrame or pyarrow Table")
+
+        return table.cast(self._string_nulls(table.schema))
+
+    @staticmethod
+    def _string_nulls(schema: pa.Schema) -> pa.Schema:
+        # Columns that are null everywhere are text fields left empty
+        return pa.schema([f.with_type(pa.string()) if pa.types.is_null(f.type) else f for f in schema])
+
+    def prepare_file(self, path: str) -> Dataset:
+        """
+        Prepare a JSON array, JSONL (optionally .gz/.zst-compressed) or Parquet file
+        that may be larger than memory.
+
+        Records are streamed from the file `chunk_size` at a time, cleaned chunk by
+        chunk and written to an Arrow file in `cache_dir`, then sorted in a second
+        pass over the memory-mapped result. The returned Dataset is memory-mapped
+        from that file, so memory use stays bounded by the chunk size. The prepared
+        file is reused until the input's size or modification time changes; the
+        push methods delete it once the input is on the Hub, so `cache_dir` only
+        holds files still waiting to be pushed (or retried).
+
+        Args:
+            path: Input file
+
+        Returns:
+            Dataset: Memory-mapped Hugging Face Dataset
+        """
+        prepared = self._prepared_path(path)
+        if os.path.exists(prepared):
+            logger.info(f"Using prepared file {prepared} for {path}")
+        else:
+            logger.info(f"Preparing {path} in chunks of {self.chunk_size} records")
+            os.makedirs(self.cache_dir, exist_ok=True)
+            unsorted = f"{prepared}.unsorted"
+            try:
+                self._write_cleaned_chunks(path, unsorted)
+                self._write_sorted(unsorted, f"{prepared}.tmp")
+                os.replace(f"{prepared}.tmp", prepared)
+            finally:
+                for leftover in (unsorted, f"{prepared}.tmp"):
+                    if os.path.exists(leftover):
+                        os.remove(leftover)
+
+        dataset = Dataset.from_file(prepared)
+        logger.info(f"Created dataset with {len(dataset)} rows and {len(dataset.column_names)} columns")
+        return dataset
+
+    def _prepared_path(self, path: str) -> str:
+        stat = os.stat(path)
+        key = hashlib.sha1(f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.arrow")
+
+    def _discard_prepared(self, *inputs):
+        """Delete the prepared files of inputs that were file paths, once they are pushed."""
+        for data in inputs:
+            if not isinstance(data, str):
+                continue
+            try:
+                os.remove(self._prepared_path(data))
+            except OSError:
+                pass
+
+    def _iter_file_chunks(self, path: str) -> Iterator[pa.Table]:
+        if path.endswith(".parquet"):
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=self.chunk_size):
+                yield pa.Table.from_batches([batch])
+            return
+
+        # The first chunk's inferred schema is kept for the rest of the file
+        schema = None
+        chunk = []
+        for record in iter_json_records(path):
+            chunk.append(record)
+            if len(chunk) == self.chunk_size:
+                table = pa.Table.from_pylist(chunk, schema=schema)
+                schema = schema or self._string_nulls(table.schema)
+                yield table.cast(schema)
+                chunk = []
+        if chunk:
+            table = pa.Table.from_pylist(chunk, schema=schema)
+            yield table.cast(schema or self._string_nulls(table.schema))
+
+    def _write_cleaned_chunks(self, path: str, out_path: str):
+        writer = schema = None
+        with open(out_path, 'wb') as sink:
+            for table in self._iter_file_chunks(path):
+                table = self._clean_table(table, sort=False)
+                if writer is None:
+                    schema = table.schema
+                    writer = pa_ipc.new_stream(sink, schema)
+                writer.write_table(table.cast(schema))
+            if writer is None:
+                raise ValueError(f"No records found in {path}")
+            writer.close()
+
+    def _write_sorted(self, in_path: str, out_path: str):
+        """
+        Sort the memory-mapped cleaned chunks by mevzuat_no. Only the key column is
+        sorted as a whole; each output chunk is gathered from the record batches it
+        draws rows from, so the other columns are never materialized beyond
+        `chunk_size` rows.
+        """
+        with pa.memory_map(in_path) as source:
+            reader = pa_ipc.open_stream(source)
+            batches = list(reader)  # zero-copy views into the mapped file
+            with open(out_path, 'wb') as sink, pa_ipc.new_stream(sink, reader.schema) as writer:
+                if 'mevzuat_no' not in reader.schema.names:
+                    for batch in batches:
+                        writer.write_batch(batch)
+                    return
+                keys = pa.chunked_array([batch.column('mevzuat_no') for batch in batches])
+                order = pc.sort_indices(keys).to_numpy().astype(np.int64)
+                starts = np.cumsum([0] + [batch.num_rows for batch in batches])
+                for offset in range(0, len(order), self.chunk_size):
+                    rows = order[offset:offset + self.chunk_size]
+                    owners = np.searchsorted(starts, rows, side='right') - 1
+                    pieces, positions = [], []
+                    for owner in np.unique(owners):
+                        picked = np.flatnonzero(owners == owner)
+                        pieces.append(batches[owner].take(pa.array(rows[picked] - starts[owner])))
+                        positions.append(picked)
+                    # Pieces come grouped by batch; put the rows back in sorted order
+                    chunk = pa.Table.from_batches(pieces, reader.schema)
+                    writer.write_table(chunk.take(pa.array(np.argsort(np.concatenate(positions)))))
+
+    def _clean_table(self, table: pa.Table, sort: bool = True) -> pa.Table:
+        """
+        Clean and prepare the table for Hugging Face upload.
         
         Args:
-            df: Input DataFrame
+            table: Input table
+            sort: Sort the rows by mevzuat_no
             
         Returns:
-            pd.DataFrame: Cleaned DataFrame
+            pa.Table: Cleaned table
         """
         # Remove any completely empty rows
-        df = df.dropna(how='all')
-        
-        # Fill NaN values with empty strings for text columns
+        if table.num_columns:
+            empty = pc.is_null(table.column(0))
+            for column in table.columns[1:]:
+                empty = pc.and_(empty, pc.is_null(column))
+            table = table.filter(pc.invert(empty))
+
+        def replace(table, name, column):
+            return table.set_column(table.schema.get_field_index(name), name, column)
+
+        # Fill missing values with empty strings for text columns
         text_columns = ['text', 'title', 'url', 'url_params', 'mvzuat_turu']
         for col in text_columns:
-            if col in df.columns:
-                df[col] = df[col].fillna('')
-        
-        # Clean text data - remove excessive whitespace and normalize
-        if 'text' in df.columns:
-            df['text'] = df['text'].str.replace(r'\r\n', '\n', regex=True)
-            df['text'] = df['text'].str.replace(r'\r', '\n', regex=True)
-            df['text'] = df['text'].str.strip()
+            if col in table.column_names:
+                table = replace(table, col, pc.fill_null(table.column(col).cast(pa.string()), ''))
         
-        if 'title' in df.columns:
-            df['title'] = df['title'].str.strip()
+        # Clean text data - normalize line endings and strip surrounding whitespace
+        if 'text' in table.column_names:
+            text = pc.replace_substring(table.column('text'), '\r\n', '\n')
+            text = pc.replace_substring(text, '\r', '\n')
+            table = replace(table, 'text', pc.utf8_trim_whitespace(text))
         
-        # Ensure mevzuat_no is string type
-        if 'mevzuat_no' in df.columns:
-            df['mevzuat_no'] = df['mevzuat_no'].astype(str)
+        if 'title' in table.column_names:
+            table = replace(table, 'title', pc.utf8_trim_whitespace(table.column('title')))
         
-        # Sort by mevzuat_no if available
-        if 'mevzuat_no' in df.columns:
-            df = df.sort_values('mevzuat_no')
+        # Ensure mevzuat_no is string type and sort by it if available
+        if 'mevzuat_no' in table.column_names:
+            table = replace(table, 'mevzuat_no', table.column('mevzuat_no').cast(pa.string()))
+            if sort:
+                table = table.sort_by('mevzuat_no')
         
-        logger.info("DataFrame cleaned and prepared")
-        return df
+        logger.info("Table cleaned and prepared")
+        return table
 
     def push_data(self, 
                   data: Union[List[Dict], str, pd.DataFrame], 
@@ -143,15 +462,18 @@ class HuggingfacePusher:
             logger.info(f"Pushing dataset to {repo_id}")
             
             # Push to hub
-            dataset_dict.push_to_hub(
-                repo_id=repo_id,
-                private=private,
-                token=self.token,
-                commit_message=commit_message
-            )
+            with metrics.PUSH_SECONDS.time(method="push_data"):
+                dataset_dict.push_to_hub(
+                    repo_id=repo_id,
+                    private=private,
+                    token=self.token,
+                    commit_message=commit_message
+                )
             
             dataset_url = f"https://huggingface.co/datasets/{repo_id}"
             logger.info(f"Dataset successfully pushed to: {dataset_url}")
+            del dataset, dataset_dict
+            self._discard_prepared(data)
             
             return dataset_url
             
@@ -159,13 +481,160 @@ class HuggingfacePusher:
             logger.error(f"Error pushing data to Hugging Face: {str(e)}")
             raise
     
+    def push_shards(self,
+                    shards: Dict[str, Union[List[Dict], str, pd.DataFrame]],
+                    repo_id: str,
+                    split_name: str = "train",
+                    private: bool = False,
+                    commit_message: Optional[str] = None) -> str:
+        """
+        Append data to a dataset repository as parquet shards, committing only
+        the shards that are new or whose content changed.
+
+        Each shard is written to `data/{split_name}-{name}.parquet`, which the Hub
+        loads as part of `split_name`; existing shards are never rewritten unless
+        pushed again under the same name with different content. What is already
+        on the Hub is looked up in the local manifest, so upload time and
+        bandwidth scale with the new data rather than the whole split.
+
+        The Hub only infers the train/test/validation splits from shard names. The
+        first push of a split is committed together with a dataset card declaring
+        every split in its `configs`, whenever any of them is not one of those.
+
+        Args:
+            shards: Mapping of shard name to its data (anything `prepare_dataset` accepts)
+            repo_id: Repository ID on Hugging Face Hub
+            split_name: Split the shards belong to (default: "train")
+            private: Whether to create a private repository if it does not exist
+            commit_message: Custom commit message
+
+        Returns:
+            str: URL to the dataset
+        """
+        dataset_url = f"https://huggingface.co/datasets/{repo_id}"
+        temp_files = []
+        try:
+            operations = []
+            uploaded = {}
+            rows = 0
+            for name, data in shards.items():
+                path_in_repo = f"data/{split_name}-{name}.parquet"
+                dataset = self.prepare_dataset(data)
+                shard_path, digest = self._write_parquet(dataset)
+                if self.manifest.get(repo_id, path_in_repo) == digest:
+                    logger.info(f"Shard {path_in_repo} is unchanged, skipping")
+                    os.remove(shard_path)
+                    continue
+                temp_files.append(shard_path)
+                operations.append(CommitOperationAdd(path_in_repo=path_in_repo, path_or_fileobj=shard_path))
+                uploaded[path_in_repo] = digest
+                rows += len(dataset)
+
+            dataset = None  # only the shard files are needed from here on
+            if not operations:
+                logger.info(f"Nothing new to push to {repo_id}")
+                self._discard_prepared(*shards.values())
+                return dataset_url
+
+            if repo_id not in self._created_repos:
+                self.api.create_repo(repo_id, repo_type="dataset", private=private, exist_ok=True)
+                self._created_repos.add(repo_id)
+
+            commit_message = commit_message or f"Add {len(operations)} shard(s) with {rows} documents"
+            logger.info(f"Committing {len(operations)} shard(s) with {rows} rows to {repo_id}")
+            # The card lists every split, so first pushes of splits are serialized
+            # to keep concurrent uploaders from overwriting each other's card
+            new_split = split_name not in self.manifest.splits(repo_id)
+            with self._card_lock if new_split else nullcontext():
+                splits = self.manifest.splits(repo_id) | {split_name}
+                if new_split and not splits <= DEFAULT_SPLITS:
+                    operations.append(self._card_operation(repo_id, splits))
+                with metrics.PUSH_SECONDS.time(method="push_shards"):
+                    self.api.create_commit(
+                        repo_id=repo_id,
+                        repo_type="dataset",
+                        operations=operations,
+                        commit_message=commit_message
+                    )
+                metrics.UPLOAD_BYTES.inc(sum(os.path.getsize(path) for path in temp_files))
+                self.manifest.update(repo_id, uploaded)
+            self._discard_prepared(*shards.values())
+            logger.info(f"Shards successfully pushed to: {dataset_url}")
+
+            return dataset_url
+
+        except Exception as e:
+            logger.error(f"Error pushing shards to Hugging Face: {str(e)}")
+            raise
+
+        finally:
+            for shard_path in temp_files:
+                os.remove(shard_path)
+
+    def _card_operation(self, repo_id: str, splits: set) -> CommitOperationAdd:
+        """
+        Add/replace README.md with the repository's dataset card (or a new one), its
+        default config listing `data/{split}-*.parquet` for each of `splits`.
+        """
+        try:
+            with open(self.api.hf_hub_download(repo_id, "README.md", repo_type="dataset"), encoding="utf-8") as f:
+                card = DatasetCard(f.read())
+        except EntryNotFoundError:
+            card = DatasetCard("")
+        configs = list(card.data.get("configs") or [])
+        default = next((c for c in configs if c.get("config_name", "default") == "default"), None)
+        if default is None:
+            default = {"config_name": "default"}
+            configs.insert(0, default)
+        default["data_files"] = [
+            {"split": split, "path": f"data/{split}-*.parquet"}
+            for split in sorted(splits, key=lambda split: (split not in DEFAULT_SPLITS, split))
+        ]
+        card.data.configs = configs
+        logger.info(f"Declaring splits {sorted(splits)} in the dataset card of {repo_id}")
+        return CommitOperationAdd(path_in_repo="README.md", path_or_fileobj=str(card).encode("utf-8"))
+
+    def _write_parquet(self, dataset: Dataset) -> tuple:
+        """Write a dataset to a temporary parquet file in `cache_dir`, returning its path and sha256."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=".parquet", dir=self.cache_dir)
+        os.close(fd)
+        dataset.to_parquet(path)
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return path, digest.hexdigest()
+
+    def sync_manifest(self, repo_id: str) -> int:
+        """
+        Rebuild the manifest entries of a repository from the parquet shards on
+        the Hub, e.g. after the local manifest was lost.
+
+        Args:
+            repo_id: Repository ID
+
+        Returns:
+            int: Number of shards found
+        """
+        shards = {}
+        for entry in self.api.list_repo_tree(repo_id, path_in_repo="data", repo_type="dataset", recursive=True):
+            lfs = getattr(entry, "lfs", None)
+            if entry.path.endswith(".parquet") and lfs is not None:
+                shards[entry.path] = lfs.sha256
+        self.manifest.replace(repo_id, shards)
+        logger.info(f"Manifest synced with {len(shards)} shard(s) on {repo_id}")
+        return len(shards)
+
     def update_dataset(self, 
                       data: Union[List[Dict], str, pd.DataFrame],
                       repo_id: str,
                       split_name: str = "train",
                       commit_message: Optional[str] = None) -> str:
         """
-        Update an existing dataset with new data.
+        Update an existing dataset with new data, appended as a new parquet
+        shard instead of re-uploading the split. The shard is named after a
+        hash of the data, so pushing the same data twice commits nothing.
         
         Args:
             data: New data to add/update
@@ -176,13 +645,19 @@ class HuggingfacePusher:
         Returns:
             str: URL to the updated dataset
         """
-        return self.push_data(
-            data=data,
+        dataset = self.prepare_dataset(data)
+        shard_path, digest = self._write_parquet(dataset)
+        os.remove(shard_path)
+        name = digest[:16]
+        dataset_url = self.push_shards(
+            shards={name: dataset},
             repo_id=repo_id,
             split_name=split_name,
-            private=False,  # Existing repo privacy will be maintained
             commit_message=commit_message or f"Update dataset with new data"
         )
+        del dataset
+        self._discard_prepared(data)
+        return dataset_url
     
     def push_multiple_splits(self,
                            data_dict: Dict[str, Union[List[Dict], str, pd.DataFrame]],
@@ -253,4 +728,182 @@ class HuggingfacePusher:
             }
         except Exception as e:
             logger.error(f"Error getting dataset info: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+
+class BackgroundUploader:
+    """
+    Non-blocking uploads through `HuggingfacePusher.push_shards`.
+
+    `submit` puts shards on a bounded queue and returns a `Future` right away; a
+    worker thread commits them, retrying failed commits with exponential backoff.
+    Small batches waiting in the queue are merged into a single commit (up to
+    `max_merge_batches` batches and `max_merge_rows` rows). When the queue is full
+    `submit` blocks, so a slow Hub applies backpressure instead of buffering
+    without bound.
+    """
+
+    def __init__(self,
+                 pusher: HuggingfacePusher,
+                 repo_id: str,
+                 split_name: str = "train",
+                 max_pending: int = 8,
+                 max_merge_batches: int = 8,
+                 max_merge_rows: int = 5000,
+                 max_retries: int = 5,
+                 backoff_factor: float = 2.0,
+                 backoff_max: float = 300):
+        """
+        Start the upload worker.
+
+        Args:
+            pusher: Pusher doing the commits
+            repo_id: Repository every batch is appended to
+            split_name: Split the shards belong to
+            max_pending: Batches that may wait in the queue before `submit` blocks
+            max_merge_batches: Most batches merged into one commit
+            max_merge_rows: Batches are only merged while their rows add up to at most this
+            max_retries: Retries of a failed commit before its futures fail
+            backoff_factor: Delay before the first retry in seconds, doubled every retry
+            backoff_max: Upper bound on the delay between retries
+        """
+        self.pusher = pusher
+        self.repo_id = repo_id
+        self.split_name = split_name
+        self.max_merge_batches = max_merge_batches
+        self.max_merge_rows = max_merge_rows
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._carry = None  # batch taken from the queue that did not fit into the last commit
+        self._closed = False
+        self._stopping = False
+        self._worker = threading.Thread(target=self._run, name="hf-uploader", daemon=True)
+        self._worker.start()
+
+    def submit(self,
+               shards: Dict[str, Union[List[Dict], str, pd.DataFrame, Dataset]],
+               commit_message: Optional[str] = None,
+               rows: Optional[int] = None) -> Future:
+        """
+        Queue shards for upload, blocking only while the queue is full.
+
+        Pass output files by path rather than loaded: they are prepared out of
+        core when committed, so queued batches hold no documents in memory.
+
+        Args:
+            shards: Mapping of shard name to its data, as for `push_shards`
+            commit_message: Commit message used if the batch is committed on its own
+            rows: Total rows of the shards, if known; lets batches of files other
+                than Parquet (whose footer has the count) be merged
+
+        Returns:
+            Future: Resolves to the dataset URL once the shards are on the Hub
+        """
+        if self._closed:
+            raise RuntimeError("BackgroundUploader is closed")
+        future = Future()
+        self._queue.put((shards, commit_message, future, self._rows(shards) if rows is None else rows))
+        metrics.UPLOAD_QUEUE_DEPTH.set(self._queue.qsize())
+        return future
+
+    def close(self, wait: bool = True):
+        """
+        Stop accepting batches and let the worker upload what is queued.
+
+        Args:
+            wait: Block until every queued batch is uploaded or has failed
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+        if wait:
+            self._worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        while True:
+            batches = self._next_commit()
+            if not batches:
+                return
+            futures = [future for _, _, future, _ in batches if future.set_running_or_notify_cancel()]
+            if not futures:
+                continue
+            shards = {}
+            for batch_shards, _, _, _ in batches:
+                shards.update(batch_shards)
+            messages = [message for _, message, _, _ in batches if message]
+            if len(batches) == 1 and messages:
+                commit_message = messages[0]
+            else:
+                commit_message = f"Add {len(batches)} batches ({len(shards)} shards)"
+            try:
+                dataset_url = self._push(shards, commit_message)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future in futures:
+                    future.set_result(dataset_url)
+
+    def _next_commit(self) -> List[tuple]:
+        # Blocks for the first batch, then merges whatever small batches are already waiting
+        if self._stopping:
+            return []
+        item = self._carry or self._queue.get()
+        self._carry = None
+        metrics.UPLOAD_QUEUE_DEPTH.set(self._queue.qsize())
+        if item is None:
+            return []
+        batches = [item]
+        rows = item[3]
+        while rows is not None and len(batches) < self.max_merge_batches:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopping = True  # Stop once this commit is done
+                break
+            item_rows = item[3]
+            if item_rows is None or rows + item_rows > self.max_merge_rows:
+                self._carry = item
+                break
+            batches.append(item)
+            rows += item_rows
+        return batches
+
+    @staticmethod
+    def _rows(shards) -> Optional[int]:
+        # None when the size is unknown (JSON files), such batches are committed alone
+        rows = 0
+        for data in shards.values():
+            if isinstance(data, str):
+                if not data.endswith(".parquet"):
+                    return None
+                rows += pq.ParquetFile(data).metadata.num_rows
+            else:
+                rows += len(data)
+        return rows
+
+    def _push(self, shards, commit_message) -> str:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.pusher.push_shards(
+                    shards=shards,
+                    repo_id=self.repo_id,
+                    split_name=self.split_name,
+                    commit_message=commit_message
+                )
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = min(self.backoff_factor * 2 ** attempt, self.backoff_max)
+                logger.warning(f"Upload to {self.repo_id} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
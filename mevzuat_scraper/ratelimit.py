@@ -0,0 +1,186 @@
+# Concurrency
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+# Logging
+from loguru import logger
+
+# Responses telling us to slow down
+THROTTLE_STATUSES = (429, 503)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, holding at most `burst`.
+    A rate of None means unlimited. `pause` blocks every caller until a deadline,
+    e.g. for a server's `Retry-After`.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                elif not self.rate:
+                    return
+                else:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class EndpointLimiter:
+    """
+    Limits for one endpoint: a token bucket capping the request rate at
+    `max_rate` (None: no cap) and a concurrency window adjusted AIMD-style.
+
+    Every successful response at a normal latency grows the window by 1/window,
+    about one extra request in flight per round trip. A 429/503, or a smoothed
+    latency above `latency_factor` times the lowest one seen, halves it, at most
+    once per `cooldown` seconds so that one burst of errors counts once. Since the
+    request rate is the window over the latency, this also slows down servers
+    that limit requests per second. A `Retry-After` on a 429/503 additionally
+    pauses the bucket.
+    """
+
+    def __init__(self, name: str, initial_concurrency: float = 4, min_concurrency: float = 1,
+                 max_concurrency: float = 64, max_rate: Optional[float] = None,
+                 latency_factor: float = 3.0, cooldown: float = 5.0):
+        self.name = name
+        self.limit = float(initial_concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.bucket = TokenBucket(max_rate, burst=max(1.0, initial_concurrency))
+        self.in_flight = 0
+        self.base_latency = None
+        self._smoothed_latency = None
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+        try:
+            self.bucket.acquire()
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def on_response(self, status: int, latency: float, retry_after: Optional[float] = None):
+        if status in THROTTLE_STATUSES:
+            if retry_after:
+                self.bucket.pause(retry_after)
+            self._decrease(f"status {status}")
+            return
+        if status >= 400:
+            return
+        with self._cond:
+            alpha = 0.2
+            self._smoothed_latency = latency if self._smoothed_latency is None else \
+                (1 - alpha) * self._smoothed_latency + alpha * latency
+            if self.base_latency is None or self._smoothed_latency < self.base_latency:
+                self.base_latency = self._smoothed_latency
+            slow = self._smoothed_latency > self.latency_factor * self.base_latency
+        if slow:
+            self._decrease(f"latency {self._smoothed_latency:.2f}s")
+        else:
+            self._increase()
+
+    def _increase(self):
+        with self._cond:
+            self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def _decrease(self, reason):
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self.limit = max(self.min_concurrency, self.limit / 2)
+            # Samples taken under congestion would inflate the latency baseline
+            self._smoothed_latency = self.base_latency
+        logger.warning(f"🐢 Backing off {self.name} ({reason}): {int(self.limit)} requests in flight")
+
+
+class PolitenessController:
+    """
+    One `EndpointLimiter` per endpoint (URL path, case-insensitive), shared by
+    every request path and thread that talks to the site. `max_rates` sets the
+    token bucket rate of individual endpoints, e.g.
+    `{"/anasayfa/mevzuatdatatable": 2}`; other keyword arguments go to every
+    `EndpointLimiter`.
+
+    `request(url)` wraps a single request; `on_retry` feeds the retries urllib3
+    performs internally back into the limiter (see `session.build_session`).
+    """
+
+    def __init__(self, max_rates: Optional[Dict[str, float]] = None, **limiter_kwargs):
+        self.max_rates = {path.lower(): rate for path, rate in (max_rates or {}).items()}
+        self.limiter_kwargs = limiter_kwargs
+        self.endpoints: Dict[str, EndpointLimiter] = {}
+        self._lock = threading.Lock()
+
+    def endpoint(self, url: str) -> EndpointLimiter:
+        name = urlsplit(url).path.lower()
+        with self._lock:
+            if name not in self.endpoints:
+                kwargs = dict(self.limiter_kwargs)
+                if name in self.max_rates:
+                    kwargs["max_rate"] = self.max_rates[name]
+                self.endpoints[name] = EndpointLimiter(name, **kwargs)
+            return self.endpoints[name]
+
+    @contextmanager
+    def request(self, url: str):
+        """
+        Wait for a slot on the URL's endpoint and yield a callback taking the
+        response, which records its status and latency.
+        """
+        limiter = self.endpoint(url)
+        with limiter.slot():
+            started = time.monotonic()
+
+            def observe(response):
+                limiter.on_response(response.status_code, time.monotonic() - started,
+                                    _retry_after(response.headers.get("Retry-After")))
+
+            yield observe
+
+    def on_retry(self, url: str, status: Optional[int], retry_after: Optional[float] = None):
+        if status in THROTTLE_STATUSES:
+            self.endpoint(url).on_response(status, 0.0, retry_after)
+
+
+def _retry_after(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None  # HTTP-date form; urllib3 already honours it for the retrying request
@@ -0,0 +1,250 @@
+# Storage
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, Optional
+
+# Logging
+from loguru import logger
+from . import metrics
+
+# Metadata of a fetched document, in the order documents have always been written
+METADATA_FIELDS = ('url', 'title', 'url_params', 'mevzuat_no', 'resmi_g_tarih', 'resmi_g_sayisi',
+                   'mvzuat_turu', 'content_hash')
+_UNSET = object()
+
+
+class _Segment:
+    __slots__ = ('path', 'fd', 'size', 'live', 'map')
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        self.size = 0   # bytes written
+        self.live = 0   # bytes still referenced by a `Blob`
+        self.map = None
+
+
+class Blob:
+    """Handle to one text in a `BlobStore`. Its space is released once the handle is garbage-collected."""
+    __slots__ = ('store', 'segment', 'offset', 'length')
+
+    def __init__(self, store, segment, offset, length):
+        self.store = store
+        self.segment = segment
+        self.offset = offset
+        self.length = length
+
+    def read(self) -> str:
+        return self.store.read(self)
+
+    def __del__(self):
+        try:
+            self.store._release(self.segment, self.length)
+        except Exception:  # interpreter shutdown
+            pass
+
+
+class BlobStore:
+    """
+    Append-only, memory-mapped spill area for document texts.
+
+    `put` appends a text to the active segment file and returns a `Blob`; `read`
+    maps the segment and decodes the text again. Segments are started every
+    `segment_size` bytes and deleted once no `Blob` points into them any more, so
+    disk use follows the texts still in flight rather than everything fetched.
+    Without a `directory` a temporary one is used and removed by `close`.
+    Thread-safe; share one store between categories.
+    """
+
+    def __init__(self, directory: Optional[str] = None, segment_size: int = 256 * 1024 ** 2):
+        self._owns_directory = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix="mevzuat-blobs-")
+        os.makedirs(self.directory, exist_ok=True)
+        self.segment_size = segment_size
+        self.live_bytes = 0
+        self._segments = []
+        self._active = None
+        self._next_number = 0
+        self._closed = False
+        # Reentrant: a `Blob` may be collected while the lock is held by its own thread
+        self._lock = threading.RLock()
+
+    def put(self, text: str) -> Blob:
+        data = text.encode('utf-8')
+        with self._lock:
+            if self._closed:
+                raise ValueError("BlobStore is closed")
+            segment = self._active
+            if segment is None or (segment.size and segment.size + len(data) > self.segment_size):
+                segment = self._rotate()
+            offset = segment.size
+            view = memoryview(data)
+            while view:
+                view = view[os.write(segment.fd, view):]
+            segment.size += len(data)
+            segment.live += len(data)
+            self.live_bytes += len(data)
+            metrics.BLOB_STORE_BYTES.set(self.live_bytes)
+            return Blob(self, segment, offset, len(data))
+
+    def read(self, blob: Blob) -> str:
+        if not blob.length:
+            return ""
+        with self._lock:
+            if self._closed:
+                raise ValueError("BlobStore is closed")
+            segment = blob.segment
+            end = blob.offset + blob.length
+            if segment.map is None or len(segment.map) < end:
+                # The active segment grew since it was mapped
+                if segment.map is not None:
+                    segment.map.close()
+                segment.map = mmap.mmap(segment.fd, segment.size, access=mmap.ACCESS_READ)
+            data = segment.map[blob.offset:end]
+        return data.decode('utf-8')
+
+    @property
+    def disk_bytes(self) -> int:
+        with self._lock:
+            return sum(segment.size for segment in self._segments)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for segment in list(self._segments):
+                self._drop(segment)
+            self._active = None
+        if self._owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _rotate(self):
+        previous = self._active
+        self._active = _Segment(os.path.join(self.directory, f"{os.getpid()}-{self._next_number:05d}.blob"))
+        self._next_number += 1
+        self._segments.append(self._active)
+        if previous is not None and not previous.live:
+            self._drop(previous)
+        return self._active
+
+    def _release(self, segment, length):
+        with self._lock:
+            if self._closed:
+                return
+            segment.live -= length
+            self.live_bytes -= length
+            metrics.BLOB_STORE_BYTES.set(self.live_bytes)
+            if not segment.live and segment is not self._active:
+                self._drop(segment)
+
+    def _drop(self, segment):
+        if segment.map is not None:
+            segment.map.close()
+        os.close(segment.fd)
+        try:
+            os.remove(segment.path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not remove blob segment {segment.path}: {e}")
+        self._segments.remove(segment)
+
+
+class DocumentRecord(MutableMapping):
+    """
+    A fetched document with slotted metadata and a lazily loaded text.
+
+    Behaves like the document dicts used everywhere else (`record['text']`,
+    `record.get('title')`, `dict(record)`), but holds no per-instance dict and,
+    when created with `spill`, keeps only a `Blob` handle to its text: the text
+    is read back from the `BlobStore` on each access and never cached. Keys
+    outside `METADATA_FIELDS` are kept in a small overflow dict.
+    """
+    __slots__ = ('_text', '_extra') + METADATA_FIELDS
+
+    def __init__(self, text=_UNSET, **fields):
+        self._text = text
+        for name in METADATA_FIELDS:
+            setattr(self, name, fields.pop(name, _UNSET))
+        self._extra = fields or None
+
+    @classmethod
+    def spill(cls, store: Optional[BlobStore], text: str, **fields) -> "DocumentRecord":
+        """A record whose text lives in `store` (kept in memory if `store` is None)."""
+        return cls(store.put(text) if store is not None else text, **fields)
+
+    @property
+    def text(self) -> Optional[str]:
+        if isinstance(self._text, Blob):
+            return self._text.read()
+        return None if self._text is _UNSET else self._text
+
+    @property
+    def text_bytes(self) -> int:
+        """Size of the text in UTF-8, without loading a spilled one."""
+        if isinstance(self._text, Blob):
+            return self._text.length
+        return 0 if self._text is _UNSET or self._text is None else len(self._text.encode('utf-8'))
+
+    def __getitem__(self, key):
+        if key == 'text':
+            if self._text is _UNSET:
+                raise KeyError(key)
+            return self.text
+        if key in METADATA_FIELDS:
+            value = getattr(self, key)
+            if value is _UNSET:
+                raise KeyError(key)
+            return value
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == 'text':
+            self._text = value
+        elif key in METADATA_FIELDS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        self[key]  # KeyError if missing
+        if key == 'text':
+            self._text = _UNSET
+        elif key in METADATA_FIELDS:
+            setattr(self, key, _UNSET)
+        else:
+            del self._extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        if self._text is not _UNSET:
+            yield 'text'
+        for name in METADATA_FIELDS:
+            if getattr(self, name) is not _UNSET:
+                yield name
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={self[k]!r}" for k in self if k != 'text')
+        return f"DocumentRecord({fields}, text_bytes={self.text_bytes})"
+
+
+def without_text(document) -> Dict:
+    """A document's (dict or `DocumentRecord`) other fields, without loading its text."""
+    return {k: document[k] for k in document if k != 'text'}
@@ -0,0 +1,220 @@
+# Concurrency
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urljoin
+
+# Logging
+from loguru import logger
+
+# Scraping
+from .auth import TokenManager
+from .parallel import ParsePool
+from .ratelimit import PolitenessController
+from .scraper import POST_URL, USER_AGENT, Mevzuat
+from .session import build_session
+
+
+class FairSemaphore:
+    """
+    Counting semaphore shared by several categories. When a slot frees up it goes
+    to the waiting category currently holding the fewest slots, so every active
+    category gets an equal share, and categories that have finished or are idle
+    leave their share to the others.
+    """
+
+    def __init__(self, slots: int):
+        if slots < 1:
+            raise ValueError("slots must be at least 1")
+        self.slots = slots
+        self._free = slots
+        self._in_use = Counter()
+        self._waiting = Counter()
+        self._cond = threading.Condition()
+
+    def acquire(self, key):
+        with self._cond:
+            self._waiting[key] += 1
+            try:
+                while not (self._free > 0 and self._is_next(key)):
+                    self._cond.wait()
+            finally:
+                self._waiting[key] -= 1
+            self._free -= 1
+            self._in_use[key] += 1
+
+    def release(self, key):
+        with self._cond:
+            self._in_use[key] -= 1
+            self._free += 1
+            self._cond.notify_all()
+
+    def in_use(self, key) -> int:
+        return self._in_use[key]
+
+    def _is_next(self, key):
+        fewest = min(self._in_use[k] for k, n in self._waiting.items() if n)
+        return self._in_use[key] == fewest
+
+
+class RateGate:
+    """Spaces out request starts across threads to at most `rate` per second (None: no cap)."""
+
+    def __init__(self, rate: Optional[float] = None):
+        self.rate = rate
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class CrawlBudget:
+    """
+    Global request budget: at most `concurrency` requests in flight and
+    `rate_limit` request starts per second over all categories, shared fairly.
+    """
+
+    def __init__(self, concurrency: int = 16, rate_limit: Optional[float] = None):
+        self.concurrency = concurrency
+        self.slots = FairSemaphore(concurrency)
+        self.gate = RateGate(rate_limit)
+
+    @contextmanager
+    def request(self, category):
+        self.slots.acquire(category)
+        try:
+            self.gate.wait()
+            yield
+        finally:
+            self.slots.release(category)
+
+    def throttle(self, category) -> Callable:
+        """Zero-argument context manager factory for `Mevzuat(throttle=...)`."""
+        return partial(self.request, category)
+
+
+@dataclass
+class CategoryProgress:
+    """Live counters of one category's crawl, updated by the crawl function."""
+    name: str
+    state: str = "pending"        # pending, running, done or failed
+    total: Optional[int] = None   # records the listing reports
+    listed: int = 0               # metadata records paged through
+    documents: int = 0            # texts fetched
+    files: int = 0                # output files finished
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def summary(self) -> str:
+        total = f"/{self.total}" if self.total is not None else ""
+        line = (f"{self.name}: {self.state}, listed {self.listed}{total}, "
+                f"{self.documents} documents, {self.files} files, {self.elapsed:.0f}s")
+        return line + (f" ({self.error})" if self.error else "")
+
+
+class CrawlScheduler:
+    """
+    Crawls several categories concurrently under one global budget.
+
+    Each category runs `crawl(mev_tur, mevzuat, progress)` on its own thread with
+    its own `Mevzuat`. All of them share one HTTP session, antiforgery token,
+    response cache, parse pool, `PolitenessController` and `CrawlBudget`, so the
+    total number of requests in flight and their rate stay within
+    `concurrency`/`rate_limit` however many categories run, and a full refresh
+    takes about as long as the largest category instead of the sum of all of
+    them. A failing category is logged and does not stop the others.
+
+    Progress of every category is logged every `report_interval` seconds and is
+    available from `progress` at any time.
+    """
+
+    def __init__(self, categories: Iterable[str], crawl: Callable, concurrency: int = 16,
+                 rate_limit: Optional[float] = None, cache=None, parse_workers: int = 0,
+                 report_interval: float = 30, **mevzuat_kwargs):
+        self.categories = list(categories)
+        self.crawl = crawl
+        self.budget = CrawlBudget(concurrency, rate_limit)
+        # Adaptive per-endpoint limits, learned once for all categories
+        self.politeness = PolitenessController(max_concurrency=concurrency)
+        self.cache = cache
+        self.parse_workers = parse_workers
+        self.report_interval = report_interval
+        self.mevzuat_kwargs = mevzuat_kwargs
+        self.progress: Dict[str, CategoryProgress] = {c: CategoryProgress(c) for c in self.categories}
+        self._stopped = threading.Event()
+
+    def run(self) -> Dict[str, CategoryProgress]:
+        session = build_session(pool_size=max(self.budget.concurrency, 10), on_retry=self.politeness.on_retry)
+        # Shared by every category, so it must point at the same site the Mevzuat instances post to
+        auth = TokenManager(session, url=urljoin(self.mevzuat_kwargs.get("post_url", POST_URL), "/"),
+                            headers={"User-Agent": USER_AGENT})
+        parse_pool = ParsePool(workers=self.parse_workers) if self.parse_workers else None
+        reporter = threading.Thread(target=self._report, name="crawl-progress", daemon=True)
+        reporter.start()
+        try:
+            with ThreadPoolExecutor(max_workers=len(self.categories) or 1,
+                                    thread_name_prefix="crawl") as executor:
+                for future in [executor.submit(self._run_category, c, session, auth, parse_pool)
+                               for c in self.categories]:
+                    future.result()
+        finally:
+            self._stopped.set()
+            reporter.join()
+            session.close()
+            if parse_pool is not None:
+                parse_pool.close()
+        self.report()
+        return self.progress
+
+    def failed(self) -> List[str]:
+        return [p.name for p in self.progress.values() if p.state == "failed"]
+
+    def report(self):
+        for progress in self.progress.values():
+            logger.info(f"📊 {progress.summary()}")
+        for name, limiter in self.politeness.endpoints.items():
+            rate = f"{limiter.bucket.rate:.1f} req/s" if limiter.bucket.rate else "no rate cap"
+            logger.info(f"📊 {name}: {int(limiter.limit)} in flight allowed, {rate}")
+
+    def _run_category(self, mev_tur, session, auth, parse_pool):
+        progress = self.progress[mev_tur]
+        progress.state, progress.started = "running", time.monotonic()
+        # Each category may use the whole budget while the others are idle
+        mevzuat = Mevzuat(
+            concurrency=self.budget.concurrency, session=session, auth=auth, cache=self.cache,
+            parse_pool=parse_pool, throttle=self.budget.throttle(mev_tur), politeness=self.politeness,
+            **self.mevzuat_kwargs
+        )
+        try:
+            with mevzuat:
+                self.crawl(mev_tur, mevzuat, progress)
+            progress.state = "done"
+        except Exception as e:
+            progress.state, progress.error = "failed", str(e)
+            logger.error(f"🛑 Crawl of {mev_tur} failed: {e}")
+        finally:
+            progress.finished = time.monotonic()
+
+    def _report(self):
+        while not self._stopped.wait(self.report_interval):
+            self.report()
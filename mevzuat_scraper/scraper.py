@@ -1,36 +1,291 @@
 # Send Request
+import json
 import requests
+from contextlib import nullcontext
+from urllib.parse import urljoin
 
 # Parsing
-from bs4 import BeautifulSoup
+from .extract import get_extractor
+from .parallel import ParsePool
 
 # Logging
 from loguru import logger
+from . import metrics
+
+# Antiforgery token
+from .auth import TokenManager, is_auth_failure
+
+# Concurrent text fetching
+from concurrent.futures import ThreadPoolExecutor
+from .fetcher import AsyncTextFetcher
+from .parallel import ordered_map
+from .ratelimit import PolitenessController
+from .session import build_session
+
+USER_AGENT = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+              "AppleWebKit/537.36 (KHTML, like Gecko) "
+              "Chrome/137.0.0.0 Safari/537.36")
+POST_URL = "https://www.mevzuat.gov.tr/Anasayfa/MevzuatDatatable"
+
+
+class MetadataPage(list):
+    """Metadata records of one listing page, remembering the offsets it covers."""
+
+    def __init__(self, records=(), start=0, length=0, total=None):
+        super().__init__(records)
+        self.start = start
+        self.length = length
+        self.total = total  # recordsTotal reported by the server
+
+    @property
+    def end(self):
+        return self.start + self.length
+
 
 class Mevzuat:
-    def __init__(self, post_url="https://www.mevzuat.gov.tr/Anasayfa/MevzuatDatatable"):
+    def __init__(
+            self,
+            post_url=POST_URL,
+            text_url="https://www.mevzuat.gov.tr/anasayfa/MevzuatFihristDetayIframe?",
+            concurrency=8,
+            rate_limit=None,
+            pool_size=None,
+            connect_timeout=10,
+            read_timeout=60,
+            max_retries=3,
+            backoff_factor=0.5,
+            session=None,
+            cache=None,
+            metadata_cache_ttl=3600,
+            extractor="auto",
+            parse_workers=0,
+            max_page_size=1000,
+            metadata_concurrency=4,
+            parse_pool=None,
+            throttle=None,
+            politeness=None,
+            auth=None,
+            blob_store=None
+        ):
         self._init_metadata()
         self.post_url = post_url
-        self.token = "sa"
+        self.text_url = text_url
+        # Text fetching: parallel requests in flight and max requests/second per host
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+        # Adaptive per-endpoint concurrency limits shared by every request
+        # path; None creates one for this instance, False disables them
+        if politeness is None:
+            politeness = PolitenessController(initial_concurrency=min(4, concurrency),
+                                              max_concurrency=concurrency)
+        self.politeness = politeness or None
+        # Pooled keep-alive session, sized so every fetch worker gets a connection
+        self.timeout = (connect_timeout, read_timeout)
+        self._owns_session = session is None
+        self.session = session or build_session(
+            pool_size=pool_size or max(concurrency, 10),
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            on_retry=self.politeness.on_retry if self.politeness else None
+        )
+        # Antiforgery token and cookies for the listing endpoint; pass a TokenManager
+        # to share them with other instances on the same session
+        self.auth = auth or TokenManager(
+            self.session,
+            url=urljoin(post_url, "/"),
+            timeout=self.timeout,
+            headers={"User-Agent": USER_AGENT}
+        )
+        # Optional on-disk ResponseCache; listings go stale sooner than legislation texts
+        self.cache = cache
+        self.metadata_cache_ttl = metadata_cache_ttl
+        # HTML -> text backend, see mevzuat_scraper.extract; with parse_workers > 0
+        # extraction runs in that many worker processes instead of the fetch threads.
+        # A `parse_pool` passed in is shared with other instances and not closed here
+        self.extract_text = get_extractor(extractor)
+        self._owns_parse_pool = parse_pool is None
+        self.parse_pool = parse_pool or (ParsePool(extractor, workers=parse_workers) if parse_workers else None)
+        # Metadata paging: largest page size to try and listing pages fetched in parallel
+        self.max_page_size = max_page_size
+        self.metadata_concurrency = metadata_concurrency
+        # Context manager factory wrapped around every HTTP request, e.g. a CrawlBudget slot
+        self.throttle = throttle or nullcontext
+        # Optional BlobStore: fetched texts are spilled to it and request_text
+        # returns DocumentRecord handles instead of dicts holding the text
+        self.blob_store = blob_store
+
+    def close(self):
+        if self._owns_session:
+            self.session.close()
+        if self.parse_pool is not None and self._owns_parse_pool:
+            self.parse_pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
     
     def request(self, mev_tur="Kanun", start=0, length=100):
-        payload = self._get_payload(mev_tur, start, length)
-
         try:
-            logger.info(f"⌛️ Requesting start: {start}, length: {length}, keyword: {mev_tur} ...")
-            response = requests.post(
-                self.post_url,
-                headers=self.headers,
-                json=payload
-            )
-            response.raise_for_status()  # Raise an error for bad responses
-            logger.info("✅ Request successful")
-            return self._clean_response(response.json())
-        except requests.RequestException as e:
+            return self.request_page(mev_tur, start, length)[0]
+        except (requests.RequestException, ValueError, KeyError) as e:
+            metrics.ERRORS.inc(stage="listing", type=type(e).__name__)
             logger.error(f"🛑 Request failed: {e}")
             return None
 
-    def _get_payload(self, mev_tur="Kanun", start=0, length=100):
+    def iter_metadata(self, mev_tur="Kanun", start=0, length=None):
+        """
+        Yield metadata pages from `start` up to the server's `recordsTotal`.
+
+        With `length=None` the page size is probed with `probe_page_size`. Once the
+        first page reports the total, the remaining offsets are fetched on
+        `metadata_concurrency` threads and yielded in order; closing the generator
+        early cancels pages not fetched yet. A page that fails after the session's
+        retries raises instead of silently ending the listing early.
+        """
+        try:
+            if length is None:
+                length, first, total = self.probe_page_size(mev_tur, start)
+            else:
+                first, total = self.request_page(mev_tur, start, length)
+        except (requests.RequestException, ValueError, KeyError) as e:
+            metrics.ERRORS.inc(stage="listing", type=type(e).__name__)
+            logger.error(f"🛑 Request failed: {e}")
+            return
+        if not first:
+            return
+        yield MetadataPage(first, start=start, length=length, total=total)
+
+        offsets = range(start + length, total, length)
+        logger.info(f"📑 {total} {mev_tur} records, {len(offsets)} more pages of {length}")
+        with ThreadPoolExecutor(max_workers=self.metadata_concurrency,
+                                thread_name_prefix="mevzuat-metadata") as executor:
+            def submit(offset):
+                return executor.submit(self.request_page, mev_tur, offset, length)
+
+            pages = ordered_map(submit, offsets, self.metadata_concurrency)
+            try:
+                for offset, (records, _) in zip(offsets, pages):
+                    if not records:
+                        return  # The listing shrank since the total was read
+                    yield MetadataPage(records, start=offset, length=length, total=total)
+            finally:
+                pages.close()
+
+    def probe_page_size(self, mev_tur="Kanun", start=0):
+        """
+        Find the largest page size the server accepts, halving from `max_page_size`
+        down to 10. A server that silently caps the page returns fewer records than
+        asked while more remain; the cap is then used. Returns
+        `(page_size, first_page_records, records_total)`.
+
+        Rejections are not taken for token failures here, so they step the page size
+        down instead of refreshing the token.
+        """
+        length = self.max_page_size
+        while True:
+            try:
+                records, total = self.request_page(mev_tur, start, length, refresh=False)
+            except (requests.RequestException, ValueError, KeyError) as e:
+                if length <= 10:
+                    raise
+                logger.warning(f"⚠️ Page size {length} rejected ({e}), trying {length // 2}")
+                length //= 2
+                continue
+            if 0 < len(records) < length and start + len(records) < total:
+                length = len(records)
+            logger.info(f"📏 Using page size {length}")
+            return length, records, total
+
+    def request_page(self, mev_tur="Kanun", start=0, length=100, refresh=True):
+        """
+        Fetch one listing page, returning `(records, recordsTotal)`. Unlike `request`,
+        errors are raised, so callers paging a range themselves can retry it. With
+        `refresh`, a response that looks like a rejected token refreshes it and is
+        retried once.
+        """
+        logger.info(f"⌛️ Requesting start: {start}, length: {length}, keyword: {mev_tur} ...")
+        token = self.auth.token()
+        try:
+            body = self._request_listing(mev_tur, start, length, token)
+        except (requests.HTTPError, ValueError) as e:
+            if not refresh or not is_auth_failure(e):
+                raise
+            fresh = self.auth.refresh(token)
+            if fresh == token:
+                raise
+            logger.warning(f"🔑 Listing request rejected ({e}), retrying with a fresh token")
+            body = self._request_listing(mev_tur, start, length, fresh)
+        logger.info("✅ Request successful")
+        return self._clean_response(body), int(body['recordsTotal'])
+
+    def _request_listing(self, mev_tur, start, length, token):
+        payload = self._get_payload(mev_tur, start, length, token)
+        return self._post(self.post_url, payload=payload, cache_ttl=self.metadata_cache_ttl, parse=json.loads)
+
+    def _post(self, url, payload=None, cache_ttl=None, parse=None):
+        """
+        POST to `url` and return the response text, or `parse(text)` if given,
+        going through the cache if one is set. Responses `parse` rejects are not cached.
+        """
+        parse = parse or (lambda text: text)
+        if self.cache is None:
+            return parse(self._send(url, self.headers, payload).text)
+
+        key = self.cache.key(url, self._cache_payload(payload))
+        entry = self.cache.get(key)
+        if entry and entry.is_fresh(cache_ttl if cache_ttl is not None else self.cache.ttl):
+            metrics.CACHE_HITS.inc(endpoint=metrics.endpoint_name(url))
+            return parse(entry.text)
+
+        headers = dict(self.headers, **entry.revalidation_headers) if entry else self.headers
+        response = self._send(url, headers, payload)
+        if entry and response.status_code == 304:
+            self.cache.revalidated(entry)
+            return parse(entry.text)
+
+        result = parse(response.text)
+        self.cache.put(
+            key, url, response.text,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified")
+        )
+        return result
+
+    @staticmethod
+    def _cache_payload(payload):
+        """The payload without the antiforgery token, which changes between sessions."""
+        if not payload or "parameters" not in payload:
+            return payload
+        parameters = {k: v for k, v in payload["parameters"].items() if k != "antiforgerytoken"}
+        return dict(payload, parameters=parameters)
+
+    def _send(self, url, headers, payload=None):
+        if self.politeness is None:
+            with self.throttle():
+                response = self._timed_post(url, headers, payload)
+        else:
+            # Throttle first, so the observed latency covers only the request itself
+            with self.throttle(), self.politeness.request(url) as observe:
+                response = self._timed_post(url, headers, payload)
+                observe(response)
+        response.raise_for_status()  # Raise an error for bad responses
+        return response
+
+    def _timed_post(self, url, headers, payload=None):
+        endpoint = metrics.endpoint_name(url)
+        metrics.REQUESTS_IN_FLIGHT.inc(endpoint=endpoint)
+        try:
+            with metrics.REQUEST_SECONDS.time(endpoint=endpoint):
+                response = self.session.post(url, headers=headers, json=payload, timeout=self.timeout)
+        finally:
+            metrics.REQUESTS_IN_FLIGHT.dec(endpoint=endpoint)
+        metrics.RESPONSES.inc(endpoint=endpoint, status=response.status_code)
+        metrics.RESPONSE_BYTES.inc(len(response.content), endpoint=endpoint)
+        return response
+
+    def _get_payload(self, mev_tur="Kanun", start=0, length=100, token=None):
         return {
             "draw": 1,
             "columns": [
@@ -49,7 +304,7 @@ class Mevzuat:
                 "MevzuatNo": "",
                 "BaslangicTarihi": "",
                 "BitisTarihi": "",
-                "antiforgerytoken": self.token
+                "antiforgerytoken": token if token is not None else self.auth.token()
             }
         }
 
@@ -63,9 +318,7 @@ class Mevzuat:
             "Sec-Fetch-Dest": "empty",
             "Sec-Fetch-Mode": "cors",
             "Sec-Fetch-Site": "same-origin",
-            "User-Agent": ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                        "AppleWebKit/537.36 (KHTML, like Gecko) "
-                        "Chrome/137.0.0.0 Safari/537.36"),
+            "User-Agent": USER_AGENT,
             "sec-ch-ua": "\"Google Chrome\";v=\"137\", \"Chromium\";v=\"137\", \"Not/A)Brand\";v=\"24\"",
             "sec-ch-ua-mobile": "?0",
             "sec-ch-ua-platform": "\"macOS\"",
@@ -86,34 +339,41 @@ class Mevzuat:
     
     def _request_text(
             self,
-            post_url="https://www.mevzuat.gov.tr/anasayfa/MevzuatFihristDetayIframe?", 
+            post_url=None,
+            params="MevzuatNo=6713&MevzuatTur=1&MevzuatTertip=5"
+        ):
+        url, html = self._request_html(post_url, params)
+        with metrics.PARSE_SECONDS.time():
+            text = self.extract_text(html)
+        return url, self._check_text(text)
+
+    def _request_html(
+            self,
+            post_url=None,
             params="MevzuatNo=6713&MevzuatTur=1&MevzuatTertip=5"
         ):
-        url = post_url + params
+        url = (post_url or self.text_url) + params
         # logger.debug(f"Retrieving Text From: {url}")
-        response = requests.post(url, headers=self.headers)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        body = soup.find('body')
-        text = body.get_text(strip=False) if body else None
+        return url, self._post(url)
+
+    @staticmethod
+    def _check_text(text):
         if not text:
             raise Exception("No text retrieved.")
-        return url, text
+        return text
 
     
-    def request_text(self, metadata):
-        data = []
+    def request_text(self, metadata, concurrency=None):
         logger.info("⌛️ Requesting Text ...")
-        for i, m in enumerate(metadata): ### DEBUGGING
-            try:
-                url, text = self._request_text(params=m['url_params'])
-                data.append(
-                    dict(
-                        text=text,
-                        url=url,
-                        **m
-                    )
-                )
-                logger.info(f" - ✅ Retrieved Text @ {i+1}, Text[:5] = {text[:5].strip()} ... ")
-            except Exception as e:
-                logger.error(f"An error occured while requesting text:\n {e}")
-        return data
\ No newline at end of file
+        return self._text_fetcher(concurrency).fetch(metadata)
+
+    async def request_text_async(self, metadata, concurrency=None):
+        logger.info("⌛️ Requesting Text ...")
+        return await self._text_fetcher(concurrency).fetch_all(metadata)
+
+    def _text_fetcher(self, concurrency=None):
+        return AsyncTextFetcher(
+            self,
+            concurrency=concurrency or self.concurrency,
+            rate_limit=self.rate_limit
+        )
@@ -0,0 +1,449 @@
+"""
+Full-text search over scraped legislation.
+
+    python -m mevzuat_scraper.search index out/Kanun_*.jsonl.gz
+    python -m mevzuat_scraper.search query 'vergi "yürürlükten kaldırılmıştır"'
+"""
+# Storage
+import argparse
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from functools import partial, reduce
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Logging
+from loguru import logger
+
+# Identity keys and output files
+from .index import KEY_FIELDS, document_key
+from .sink import read_documents
+
+_TOKEN = re.compile(r"\w+")
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+
+# Documents per postings block: appending rewrites at most a term's last block
+BLOCK_SIZE = 128
+
+
+def fold(text: str) -> str:
+    """
+    Turkish case folding: İ -> i and I -> ı before lowering, so "İDARE" and
+    "idare", "IRMAK" and "ırmak" match while "i" and "ı" stay distinct.
+    """
+    return text.replace("İ", "i").replace("I", "ı").lower().replace("̇", "")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(fold(text or ""))
+
+
+def _encode(numbers: Iterable[int]) -> bytes:
+    """Unsigned LEB128 varints."""
+    out = bytearray()
+    for n in numbers:
+        while n > 0x7F:
+            out.append((n & 0x7F) | 0x80)
+            n >>= 7
+        out.append(n)
+    return bytes(out)
+
+
+def _decode(data: bytes) -> np.ndarray:
+    """Unsigned LEB128 varints, decoded in one vectorized pass."""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if not len(raw):
+        return np.empty(0, dtype=np.int64)
+    ends = np.flatnonzero(raw < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shifts = 7 * (np.arange(len(raw)) - np.repeat(starts, ends - starts + 1))
+    return np.add.reduceat((raw & 0x7F).astype(np.int64) << shifts, starts)
+
+
+def _running(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Running sums of `values`, restarting at every segment of (non-zero) `lengths`."""
+    total = np.cumsum(values)
+    before = np.concatenate(([0], total[np.cumsum(lengths)[:-1] - 1]))
+    return total - np.repeat(before, lengths)
+
+
+@dataclass
+class SearchHit:
+    doc_id: int
+    score: float
+    title: str
+    url: str
+    key: Tuple[str, ...]
+
+    def as_dict(self) -> Dict:
+        return dict(zip(KEY_FIELDS, self.key), doc_id=self.doc_id, score=round(self.score, 4),
+                    title=self.title, url=self.url)
+
+
+class SearchIndex:
+    """
+    Inverted index of scraped documents in SQLite, ranked with BM25.
+
+    The postings of a term are split into blocks of up to `BLOCK_SIZE` documents,
+    one row per `(term, block)`. A block holds varint-encoded doc id deltas, term
+    frequencies and the delta-encoded token positions of each document, so phrase
+    queries read positions only from the blocks of candidate documents. Documents
+    get increasing ids, so adding a batch appends to the term's last block, which
+    is small, and starts new ones; indexing cost does not grow with the corpus.
+    Queries decode all blocks of a term in one numpy pass and score them with
+    vectorized BM25.
+
+    A document whose key is indexed again with a different `content_hash` (or
+    text) replaces the old version, which is only marked deleted and skipped at
+    query time; `optimize` rewrites the postings without deleted documents.
+    Texts are stored zlib-compressed for `text(doc_id)`.
+    """
+
+    def __init__(self, path: str = "search.sqlite", k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS docs (
+                doc_id INTEGER PRIMARY KEY,
+                key TEXT NOT NULL,
+                title TEXT,
+                url TEXT,
+                content_hash TEXT,
+                length INTEGER NOT NULL,
+                live INTEGER NOT NULL DEFAULT 1,
+                text BLOB
+            );
+            CREATE INDEX IF NOT EXISTS docs_key ON docs (key) WHERE live = 1;
+            CREATE TABLE IF NOT EXISTS blocks (
+                term TEXT NOT NULL,
+                block INTEGER NOT NULL,
+                first_doc INTEGER NOT NULL,
+                last_doc INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                docs BLOB NOT NULL,
+                freqs BLOB NOT NULL,
+                positions BLOB NOT NULL,
+                PRIMARY KEY (term, block)
+            ) WITHOUT ROWID;"""
+        )
+        self._migrate()
+        self._conn.commit()
+        self._stats = None  # (live doc lengths, live mask, live count, average length), reloaded after changes
+
+    def __len__(self):
+        with self._lock:
+            return self._doc_stats()[2]
+
+    def add(self, documents: Iterable[Dict]) -> int:
+        """Index new and changed documents; returns how many were (re)indexed."""
+        with self._lock:
+            next_id = (self._conn.execute("SELECT MAX(doc_id) FROM docs").fetchone()[0] or 0) + 1
+            # term -> ([doc ids], [term frequencies], [position deltas of every document])
+            postings: Dict[str, Tuple[List[int], List[int], List[int]]] = {}
+            rows, replaced = [], []
+            for document in documents:
+                text = document.get('text') or ''
+                content_hash = document.get('content_hash') or zlib.crc32(text.encode('utf-8'))
+                key = "\x1f".join(document_key(document))
+                current = self._conn.execute(
+                    "SELECT doc_id, content_hash FROM docs WHERE key=? AND live=1", (key,)
+                ).fetchone()
+                if current is not None and current[1] == str(content_hash):
+                    continue
+                if current is not None:
+                    replaced.append(current[0])
+                tokens = tokenize(" ".join(filter(None, (document.get('title'), text))))
+                positions: Dict[str, List[int]] = {}
+                for position, token in enumerate(tokens):
+                    positions.setdefault(token, []).append(position)
+                for term, term_positions in positions.items():
+                    ids, freqs, deltas = postings.setdefault(term, ([], [], []))
+                    ids.append(next_id)
+                    freqs.append(len(term_positions))
+                    deltas.extend(p - q for p, q in zip(term_positions, [0] + term_positions))
+                rows.append((next_id, key, document.get('title'), document.get('url'), str(content_hash),
+                             len(tokens), zlib.compress(text.encode('utf-8'))))
+                next_id += 1
+
+            if not rows:
+                return 0
+            self._conn.executemany("UPDATE docs SET live=0 WHERE doc_id=?", [(d,) for d in replaced])
+            self._conn.executemany(
+                "INSERT INTO docs (doc_id, key, title, url, content_hash, length, text) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._append_postings(postings)
+            self._conn.commit()
+            self._stats = None
+        logger.info(f"🔎 Indexed {len(rows)} documents ({len(replaced)} replaced) into {self.path}")
+        return len(rows)
+
+    def add_file(self, path: str) -> int:
+        return self.add(read_documents(path))
+
+    def _append_postings(self, postings):
+        updates, rows = [], []
+        for term, (ids, freqs, deltas) in postings.items():
+            last = self._conn.execute(
+                "SELECT block, last_doc, count FROM blocks WHERE term=? ORDER BY block DESC LIMIT 1", (term,)
+            ).fetchone()
+            block = 0
+            if last is not None:
+                block, last_doc, count = last
+                fill = min(BLOCK_SIZE - count, len(ids))
+                if fill > 0:
+                    # Top up the term's last block; it is never longer than BLOCK_SIZE documents
+                    used = sum(freqs[:fill])
+                    updates.append((ids[fill - 1], fill, _encode(p - q for p, q in zip(ids[:fill], [last_doc] + ids)),
+                                    _encode(freqs[:fill]), _encode(deltas[:used]), term, block))
+                    ids, freqs, deltas = ids[fill:], freqs[fill:], deltas[used:]
+                block += 1
+            rows.extend(self._block_rows(term, block, ids, freqs, deltas))
+        self._conn.executemany(
+            "UPDATE blocks SET last_doc=?, count=count+?, docs=CAST(docs || ? AS BLOB), "
+            "freqs=CAST(freqs || ? AS BLOB), positions=CAST(positions || ? AS BLOB) WHERE term=? AND block=?",
+            updates
+        )
+        self._conn.executemany("INSERT INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    @staticmethod
+    def _block_rows(term, block, ids, freqs, deltas) -> List[tuple]:
+        """Rows of `blocks` holding the given postings, numbered from `block`."""
+        rows, used = [], 0
+        for start in range(0, len(ids), BLOCK_SIZE):
+            block_ids, block_freqs = ids[start:start + BLOCK_SIZE], freqs[start:start + BLOCK_SIZE]
+            end = used + sum(block_freqs)
+            rows.append((term, block, block_ids[0], block_ids[-1], len(block_ids),
+                         _encode(p - q for p, q in zip(block_ids, block_ids[:1] + block_ids)),
+                         _encode(block_freqs), _encode(deltas[used:end])))
+            used = end
+            block += 1
+        return rows
+
+    @staticmethod
+    def _decode_blocks(rows) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+        """
+        Doc ids, term frequencies and (if the rows have them) token positions of
+        `(first_doc, count, docs, freqs[, positions])` block rows, in row order.
+        """
+        first_docs, counts = (np.array(column, dtype=np.int64) for column in list(zip(*rows))[:2])
+        ids = np.repeat(first_docs, counts) + _running(_decode(b"".join(row[2] for row in rows)), counts)
+        freqs = _decode(b"".join(row[3] for row in rows))
+        positions = None
+        if len(rows[0]) > 4:
+            positions = _running(_decode(b"".join(row[4] for row in rows)), freqs)
+        return ids, freqs, positions
+
+    def _migrate(self):
+        """Convert an index written with one postings row per term into blocks."""
+        if self._conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='postings'").fetchone() is None:
+            return
+        logger.info(f"🔎 Converting {self.path} to postings blocks")
+        for term, docs, positions in self._conn.execute("SELECT term, docs, positions FROM postings").fetchall():
+            numbers = _decode(docs)  # (doc id delta, tf, positions byte length) triples
+            self._conn.executemany("INSERT INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._block_rows(
+                term, 0, np.cumsum(numbers[0::3]).tolist(), numbers[1::3].tolist(), _decode(positions).tolist()
+            ))
+        self._conn.execute("DROP TABLE postings")
+
+    def _postings(self, term) -> Tuple[np.ndarray, np.ndarray]:
+        """Doc ids and term frequencies of the live documents containing `term`."""
+        rows = self._conn.execute(
+            "SELECT first_doc, count, docs, freqs FROM blocks WHERE term=? ORDER BY block", (term,)
+        ).fetchall()
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        ids, freqs, _ = self._decode_blocks(rows)
+        keep = self._doc_stats()[1][ids]
+        return ids[keep], freqs[keep]
+
+    def _positions(self, term, candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """`(doc id, position)` of every occurrence of `term` in the sorted `candidates`."""
+        ranges = np.array(self._conn.execute(
+            "SELECT block, first_doc, last_doc FROM blocks WHERE term=? ORDER BY block", (term,)
+        ).fetchall(), dtype=np.int64)
+        # Blocks whose doc id range holds at least one candidate
+        at = np.searchsorted(candidates, ranges[:, 1])
+        needed = ranges[(at < len(candidates)) & (candidates[np.minimum(at, len(candidates) - 1)] <= ranges[:, 2]), 0]
+        rows = [self._conn.execute(
+            "SELECT first_doc, count, docs, freqs, positions FROM blocks WHERE term=? AND block=?", (term, block)
+        ).fetchone() for block in needed.tolist()]
+        ids, freqs, positions = self._decode_blocks(rows)
+        docs = np.repeat(ids, freqs)
+        keep = np.isin(docs, candidates)
+        return docs[keep], positions[keep]
+
+    def _doc_stats(self):
+        if self._stats is None:
+            size = (self._conn.execute("SELECT MAX(doc_id) FROM docs").fetchone()[0] or 0) + 1
+            lengths = np.zeros(size, dtype=np.float64)
+            live = np.zeros(size, dtype=bool)
+            rows = np.array(self._conn.execute("SELECT doc_id, length FROM docs WHERE live=1").fetchall(),
+                            dtype=np.int64).reshape(-1, 2)
+            lengths[rows[:, 0]] = rows[:, 1]
+            live[rows[:, 0]] = True
+            count = len(rows)
+            average = float(rows[:, 1].mean()) if count else 0.0
+            self._stats = (lengths, live, count, average)
+        return self._stats
+
+    def search(self, query: str, limit: int = 10) -> List[SearchHit]:
+        """
+        Rank documents for `query` with BM25. Bare words are optional and add to
+        the score; "quoted phrases" must occur verbatim (after folding).
+        """
+        started = time.perf_counter()
+        with self._lock:
+            phrases, words = [], []
+            for phrase, word in _QUERY.findall(query):
+                if phrase:
+                    tokens = tokenize(phrase)
+                    if len(tokens) > 1:
+                        phrases.append(tokens)
+                    words.extend(tokens)
+                else:
+                    words.extend(tokenize(word))
+            if not words:
+                return []
+
+            lengths, live, count, average = self._doc_stats()
+            postings = {term: self._postings(term) for term in set(words)}
+            candidates = None
+            for phrase in phrases:
+                matches = self._phrase_matches(phrase, postings)
+                candidates = matches if candidates is None else np.intersect1d(candidates, matches)
+
+            scores = np.zeros(len(lengths))
+            for term in set(words):
+                ids, freqs = postings[term]
+                if not len(ids):
+                    continue
+                idf = math.log(1 + (count - len(ids) + 0.5) / (len(ids) + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths[ids] / average)
+                scores[ids] += idf * freqs * (self.k1 + 1) / (freqs + norm)
+            if candidates is not None:
+                allowed = np.zeros(len(scores), dtype=bool)
+                allowed[candidates] = True
+                scores[~allowed] = 0.0
+
+            matched = np.flatnonzero(scores)
+            if len(matched) > limit:
+                # Everything above the limit-th best score, plus the documents tied with it
+                kth = np.partition(scores[matched], len(matched) - limit)[len(matched) - limit]
+                matched = matched[scores[matched] >= kth]
+            top = matched[np.lexsort((matched, -scores[matched]))][:limit]
+            hits = []
+            for doc_id in top.tolist():
+                key, title, url = self._conn.execute(
+                    "SELECT key, title, url FROM docs WHERE doc_id=?", (doc_id,)
+                ).fetchone()
+                hits.append(SearchHit(doc_id, float(scores[doc_id]), title, url, tuple(key.split("\x1f"))))
+        logger.debug(f"🔎 {query!r}: {len(np.flatnonzero(scores))} matches "
+                     f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return hits
+
+    def _phrase_matches(self, phrase, postings) -> np.ndarray:
+        """Sorted ids of the documents containing `phrase`."""
+        docs = reduce(partial(np.intersect1d, assume_unique=True), (postings[term][0] for term in phrase))
+        if not len(docs):
+            return docs
+        by_term = {term: self._positions(term, docs) for term in set(phrase)}
+        starts = None
+        # Start from the rarest term; the other terms only filter its occurrences
+        for offset in sorted(range(len(phrase)), key=lambda i: len(by_term[phrase[i]][1])):
+            term_docs, positions = by_term[phrase[offset]]
+            keep = positions >= offset
+            # One sorted key per (document, phrase start) the occurrence is consistent with
+            keys = (term_docs[keep] << 32) | (positions[keep] - offset)
+            if starts is None:
+                starts = keys
+            elif len(keys):
+                starts = starts[keys[np.minimum(np.searchsorted(keys, starts), len(keys) - 1)] == starts]
+            else:
+                starts = keys
+            if not len(starts):
+                break
+        return np.unique(starts >> 32)
+
+    def text(self, doc_id: int) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM docs WHERE doc_id=?", (doc_id,)).fetchone()
+        return zlib.decompress(row[0]).decode('utf-8') if row and row[0] is not None else None
+
+    def optimize(self):
+        """Drop deleted documents from the postings, refill blocks and compact the database file."""
+        with self._lock:
+            live = self._doc_stats()[1]
+            terms = [row[0] for row in self._conn.execute("SELECT DISTINCT term FROM blocks")]
+            for term in terms:
+                ids, freqs, positions = self._decode_blocks(self._conn.execute(
+                    "SELECT first_doc, count, docs, freqs, positions FROM blocks WHERE term=? ORDER BY block", (term,)
+                ).fetchall())
+                keep = live[ids]
+                kept = np.repeat(keep, freqs)
+                # Back to per-document position deltas
+                deltas = np.diff(positions, prepend=0)
+                deltas[np.cumsum(freqs)[:-1]] = positions[np.cumsum(freqs)[:-1]]
+                self._conn.execute("DELETE FROM blocks WHERE term=?", (term,))
+                self._conn.executemany("INSERT INTO blocks VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._block_rows(
+                    term, 0, ids[keep].tolist(), freqs[keep].tolist(), deltas[kept].tolist()
+                ))
+            self._conn.execute("DELETE FROM docs WHERE live=0")
+            self._conn.commit()
+            self._stats = None
+            self._conn.execute("VACUUM")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", default="search.sqlite", help="index database (default: search.sqlite)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    index_command = commands.add_parser("index", help="add output files (JSONL/Parquet) to the index")
+    index_command.add_argument("files", nargs="+")
+    query_command = commands.add_parser("query", help="search the index")
+    query_command.add_argument("query")
+    query_command.add_argument("--limit", type=int, default=10)
+    query_command.add_argument("--json", action="store_true", help="print hits as JSON lines")
+    commands.add_parser("optimize", help="drop replaced documents and compact the index")
+    args = parser.parse_args(argv)
+
+    with SearchIndex(args.index) as index:
+        if args.command == "index":
+            added = sum(index.add_file(path) for path in args.files)
+            print(f"Indexed {added} documents, {len(index)} in total")
+        elif args.command == "query":
+            started = time.perf_counter()
+            hits = index.search(args.query, limit=args.limit)
+            for hit in hits:
+                if args.json:
+                    print(json.dumps(hit.as_dict(), ensure_ascii=False))
+                else:
+                    print(f"{hit.score:8.3f}  {hit.key[1]} {hit.key[0]}  {hit.title}")
+            if not args.json:
+                print(f"{len(hits)} hits in {(time.perf_counter() - started) * 1000:.1f} ms")
+        elif args.command == "optimize":
+            index.optimize()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# Parsing
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Identity keys
+from .dedup import normalize_text
+from .index import KEY_FIELDS
+
+# "MADDE 1 –", "Madde 12/A-", "EK MADDE 3 –", "Geçici Madde 2-", "Mükerrer Madde 5 -"
+_ARTICLE = re.compile(
+    r"^[ \t\xa0]*(?:(EK|Ek|GEÇİCİ|Geçici|MÜKERRER|Mükerrer)[ \t\xa0]+)?(?:MADDE|Madde)[ \t\xa0]+"
+    r"(\d+(?:[ \t\xa0]*/[ \t\xa0]*[A-ZÇĞİÖŞÜa-zçğıöşü])?)[ \t\xa0]*[-–—]",
+    re.MULTILINE
+)
+# "BİRİNCİ BÖLÜM", "İKİNCİ KISIM", "ÜÇÜNCÜ KİTAP"
+_SECTION = re.compile(r"^[ \t\xa0]*([A-ZÇĞİÖŞÜ]+[ \t\xa0]+(?:KİTAP|KISIM|BÖLÜM))[ \t\xa0]*$", re.MULTILINE)
+# "(1)", "(2)" opening a paragraph at a line start; the first one usually shares the header line
+_PARAGRAPH = re.compile(r"^[ \t\xa0]*(\(\d+\))", re.MULTILINE)
+_FIRST_PARAGRAPH = re.compile(r"\(1\)")
+
+_KINDS = {"EK": "ek", "Ek": "ek", "GEÇİCİ": "gecici", "Geçici": "gecici",
+          "MÜKERRER": "mukerrer", "Mükerrer": "mukerrer"}
+_LABELS = {"madde": "", "ek": "Ek ", "gecici": "Geçici ", "mukerrer": "Mükerrer "}
+_BLANK = " \t\xa0\r\n"
+
+
+@dataclass
+class Article:
+    """One article of a legislation text; offsets are character offsets into that text."""
+    article: str                  # "1", "12/A", "Ek 3", "Geçici 2"
+    kind: str                     # madde, ek, gecici or mukerrer
+    heading: Optional[str]        # the short title line above the article, if any
+    section: Optional[str]        # enclosing KİTAP/KISIM/BÖLÜM with its title
+    text: str
+    start: int
+    end: int
+    paragraphs: List[Tuple[int, int]] = field(default_factory=list)
+
+
+def _line_before(text: str, position: int) -> Tuple[Optional[str], int]:
+    """The last non-empty line ending before `position` and its start offset."""
+    end = position
+    while end > 0:
+        line_start = text.rfind("\n", 0, end - 1) + 1
+        line = text[line_start:end].strip(_BLANK)
+        if line:
+            return line, line_start
+        end = line_start
+    return None, 0
+
+
+def _line_after(text: str, position: int) -> Tuple[Optional[str], int]:
+    """The first non-empty line starting after `position` and its end offset."""
+    while position < len(text):
+        line_end = text.find("\n", position)
+        line_end = len(text) if line_end < 0 else line_end
+        line = text[position:line_end].strip(_BLANK)
+        if line:
+            return line, line_end
+        position = line_end + 1
+    return None, len(text)
+
+
+def _is_heading(line: Optional[str]) -> bool:
+    return bool(line) and len(line) <= 150 and not line.endswith((".", ":", ";", ",")) \
+        and not _SECTION.match(line) and not _ARTICLE.match(line) and not _PARAGRAPH.match(line)
+
+
+def _sections(text: str) -> List[Tuple[int, int, str]]:
+    """`(start, body start, name)` of every KİTAP/KISIM/BÖLÜM, the name including its title line."""
+    sections = []
+    for match in _SECTION.finditer(text):
+        title, title_end = _line_after(text, match.end())
+        if _is_heading(title):
+            sections.append((match.start(), title_end, f"{match.group(1)} - {title}"))
+        else:
+            sections.append((match.start(), match.end(), match.group(1)))
+    return sections
+
+
+def segment(text: str) -> List[Article]:
+    """
+    Split a legislation text into articles (MADDE, EK MADDE, GEÇİCİ MADDE, ...).
+
+    An article runs from its header to the next article's heading or header, or
+    the next KİTAP/KISIM/BÖLÜM line. Its heading is the short line right above
+    it, unless that line is the title of the section it opens. Paragraphs are
+    the spans starting at "(n)". Text before the first article (title, preamble)
+    is not part of any article.
+    """
+    sections = _sections(text)
+    headers = []  # (match, heading, offset where the article including its heading starts, section)
+    next_section, section, body_start = 0, None, 0
+    for match in _ARTICLE.finditer(text):
+        while next_section < len(sections) and sections[next_section][0] < match.start():
+            _, body_start, section = sections[next_section]
+            next_section += 1
+        heading, heading_start = _line_before(text, match.start())
+        if not _is_heading(heading) or heading_start < body_start:
+            heading, heading_start = None, match.start()
+        headers.append((match, heading, heading_start, section))
+
+    section_starts = [start for start, _, _ in sections]
+    articles = []
+    for i, (match, heading, _, section) in enumerate(headers):
+        start = match.start()
+        end = headers[i + 1][2] if i + 1 < len(headers) else len(text)
+        later_sections = [s for s in section_starts if start < s < end]
+        if later_sections:
+            end = later_sections[0]
+        while end > start and text[end - 1] in _BLANK:
+            end -= 1
+
+        kind = _KINDS.get(match.group(1), "madde")
+        number = re.sub(r"[ \t\xa0]+", "", match.group(2)).upper()
+        body = text[start:end]
+        starts = [start + m.start(1) for m in _PARAGRAPH.finditer(body)]
+        first_line = body.split("\n", 1)[0]
+        first = _FIRST_PARAGRAPH.search(first_line)
+        if first and (not starts or starts[0] > start + first.start()):
+            starts.insert(0, start + first.start())
+        articles.append(Article(
+            article=_LABELS[kind] + number, kind=kind, heading=heading, section=section,
+            text=body, start=start, end=end, paragraphs=list(zip(starts, starts[1:] + [end]))
+        ))
+    return articles
+
+
+def article_records(document: Dict) -> List[Dict]:
+    """
+    Article-level records of a scraped document: its key fields, title and URL
+    plus every `Article` field, with `paragraphs` as `[start, end]` pairs.
+    Offsets are into the text as published (see `normalize_text`).
+    """
+    base = {name: document.get(name) for name in KEY_FIELDS}
+    base.update(law_title=document.get('title'), url=document.get('url'))
+    records = []
+    for article in segment(normalize_text(document.get('text'))):
+        record = dict(base, **asdict(article))
+        record['paragraphs'] = [list(span) for span in article.paragraphs]
+        records.append(record)
+    return records
+
+
+def iter_article_records(documents: Iterable[Dict]) -> Iterator[Dict]:
+    for document in documents:
+        yield from article_records(document)
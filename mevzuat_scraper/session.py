@@ -0,0 +1,68 @@
+# Send Request
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Logging
+from loguru import logger
+from . import metrics
+
+# Throttling and transient server errors worth retrying
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class LoggingRetry(Retry):
+    """
+    urllib3 Retry that logs every retry it schedules and reports it to
+    `on_retry(url, status, retry_after)`, if set.
+    """
+
+    on_retry = None
+
+    def new(self, **kw):
+        new_retry = super().new(**kw)
+        new_retry.on_retry = self.on_retry
+        return new_retry
+
+    def increment(self, method=None, url=None, response=None, error=None, *args, **kwargs):
+        new_retry = super().increment(method, url, response, error, *args, **kwargs)
+        reason = f"status {response.status}" if response is not None else repr(error)
+        metrics.RETRIES.inc(reason=response.status if response is not None else type(error).__name__)
+        logger.warning(f"🔁 Retrying {method} {url} ({reason}), attempt {len(new_retry.history)}")
+        if self.on_retry is not None:
+            status = response.status if response is not None else None
+            retry_after = self.get_retry_after(response) if response is not None else None
+            self.on_retry(url, status, retry_after)
+        return new_retry
+
+
+def build_session(pool_size=10, max_retries=3, backoff_factor=0.5, backoff_max=60, on_retry=None):
+    """
+    Build a keep-alive `requests.Session` with a connection pool of `pool_size`
+    connections per host and exponential-backoff retries.
+
+    Connection errors and 429/5xx responses are retried up to `max_retries` times.
+    The sleep between attempts is `backoff_factor * 2 ** (attempt - 1)` seconds,
+    capped at `backoff_max`; a `Retry-After` header from the server takes precedence.
+    Each retry is also reported to `on_retry(url, status, retry_after)`, e.g.
+    `PolitenessController.on_retry`.
+    """
+    retry = LoggingRetry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=None,  # every request we send is a read, POST included
+        backoff_factor=backoff_factor,
+        backoff_max=backoff_max,
+        respect_retry_after_header=True,
+        raise_on_status=False,  # hand the last response back to raise_for_status()
+    )
+    retry.on_retry = on_retry
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,262 @@
+# Storage
+import gzip
+import io
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Logging
+from loguru import logger
+from . import metrics
+
+# Optional backends
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+FORMATS = ("jsonl", "jsonl.gz", "jsonl.zst", "parquet")
+
+
+@dataclass
+class SinkFile:
+    """A finished output file: complete, renamed to its final name and safe to read."""
+    number: int
+    path: str
+    documents: int
+    bytes: int
+
+
+class Sink:
+    """
+    Streaming document writer with file rotation.
+
+    Documents are appended to `<directory>/<prefix>-<number>.<extension>` as they
+    arrive, so memory stays flat regardless of how many are written. Once a file
+    holds at least `max_docs` documents or `max_bytes` uncompressed bytes, it is
+    closed and the next write starts a new one. Rotation only happens between
+    `write_many` calls, so the documents of one call never straddle two files.
+
+    Open files carry a `.partial` suffix and are renamed when closed; anything
+    still `.partial` after a crash is incomplete. `write_many` and `close` return
+    the files they finished.
+    """
+
+    extension = None
+
+    def __init__(self, directory: str, prefix: str, max_docs: Optional[int] = None,
+                 max_bytes: Optional[int] = None, first_number: int = 1):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.files: List[SinkFile] = []
+        self._number = first_number
+        self._path = None
+        self._docs = 0
+        self._bytes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def number(self) -> int:
+        """Number of the file being written, or of the next one if none is open."""
+        return self._number
+
+    def write(self, document: Dict) -> List[SinkFile]:
+        return self.write_many([document])
+
+    def write_many(self, documents: Iterable[Dict]) -> List[SinkFile]:
+        written = 0
+        with metrics.WRITE_SECONDS.time(format=self.extension):
+            for document in documents:
+                if not isinstance(document, dict):  # e.g. a DocumentRecord, its text is loaded here
+                    document = dict(document)
+                if self._path is None:
+                    self._path = os.path.join(self.directory, f"{self.prefix}-{self._number:05d}.{self.extension}")
+                    self._open(self._path + ".partial")
+                size = self._write(document)
+                self._bytes += size
+                self._docs += 1
+                written += 1
+                metrics.WRITTEN_BYTES.inc(size, format=self.extension)
+        metrics.DOCUMENTS.inc(written, stage="written")
+        if self._should_rotate():
+            return [self._finish()]
+        return []
+
+    def close(self) -> List[SinkFile]:
+        return [self._finish()] if self._path is not None else []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _should_rotate(self):
+        return self._path is not None and (
+            (self.max_docs is not None and self._docs >= self.max_docs) or
+            (self.max_bytes is not None and self._bytes >= self.max_bytes)
+        )
+
+    def _finish(self):
+        self._close()
+        os.replace(self._path + ".partial", self._path)
+        finished = SinkFile(number=self._number, path=self._path, documents=self._docs, bytes=self._bytes)
+        logger.info(f"💾 Wrote {finished.documents} documents to {finished.path}")
+        self.files.append(finished)
+        self._number += 1
+        self._path = None
+        self._docs = self._bytes = 0
+        return finished
+
+    # Backend hooks
+    def _open(self, path):
+        raise NotImplementedError
+
+    def _write(self, document) -> int:
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class JsonlSink(Sink):
+    """One JSON document per line, optionally gzip- or zstd-compressed."""
+
+    def __init__(self, directory: str, prefix: str, compression: Optional[str] = None, **kwargs):
+        if compression not in (None, "gzip", "zstd"):
+            raise ValueError(f"Unsupported compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("zstd compression requires the 'zstandard' package")
+        self.compression = compression
+        self.extension = {None: "jsonl", "gzip": "jsonl.gz", "zstd": "jsonl.zst"}[compression]
+        self._raw = self._file = None
+        super().__init__(directory, prefix, **kwargs)
+
+    def _open(self, path):
+        self._raw = open(path, "wb")
+        if self.compression == "gzip":
+            self._file = gzip.GzipFile(fileobj=self._raw, mode="wb")
+        elif self.compression == "zstd":
+            self._file = zstandard.ZstdCompressor().stream_writer(self._raw, closefd=False)
+        else:
+            self._file = self._raw
+
+    def _write(self, document):
+        line = (json.dumps(document, ensure_ascii=False) + "\n").encode("utf-8")
+        self._file.write(line)
+        return len(line)
+
+    def _close(self):
+        if self._file is not self._raw:
+            self._file.close()
+        self._raw.close()
+        self._raw = self._file = None
+
+
+class ParquetSink(Sink):
+    """
+    Columnar Parquet output. Documents are buffered and flushed as a row group every
+    `row_group_size` documents or `row_group_bytes` uncompressed bytes, whichever
+    comes first, so long texts do not pile up in memory.
+
+    The schema is inferred from the first row group of each file (all-null columns
+    become strings) and merged with the previous files' schema. A Parquet file has
+    a single schema, so a field first seen in a later row group of the same file
+    raises `ValueError` instead of being dropped.
+    """
+
+    extension = "parquet"
+
+    def __init__(self, directory: str, prefix: str, row_group_size: int = 1000,
+                 row_group_bytes: int = 64 * 1024 * 1024, **kwargs):
+        if pa is None:
+            raise ImportError("Parquet output requires the 'pyarrow' package")
+        self.row_group_size = row_group_size
+        self.row_group_bytes = row_group_bytes
+        self.schema = None
+        self._writer = None
+        self._out_path = None
+        self._rows = []
+        self._buffered = 0
+        super().__init__(directory, prefix, **kwargs)
+
+    def _open(self, path):
+        self._out_path = path
+
+    def _write(self, document):
+        size = sum(len(str(v).encode("utf-8")) for v in document.values())
+        self._rows.append(document)
+        self._buffered += size
+        if len(self._rows) >= self.row_group_size or self._buffered >= self.row_group_bytes:
+            self._write_row_group()
+        return size
+
+    def _write_row_group(self):
+        if not self._rows:
+            return
+        if self._writer is None:
+            table = pa.Table.from_pylist(self._rows)
+            # Columns that are all-null in the first row group are text fields left empty
+            schema = pa.schema([
+                f.with_type(pa.string()) if pa.types.is_null(f.type) else f for f in table.schema
+            ])
+            self.schema = schema if self.schema is None else pa.unify_schemas([self.schema, schema])
+            table = pa.Table.from_pylist(self._rows, schema=self.schema)
+            self._writer = pq.ParquetWriter(self._out_path, self.schema, compression="zstd")
+        else:
+            new = {key for row in self._rows for key in row} - set(self.schema.names)
+            if new:
+                raise ValueError(f"Fields {sorted(new)} first appear after the schema of "
+                                 f"{self._out_path} was written; they would be lost")
+            table = pa.Table.from_pylist(self._rows, schema=self.schema)
+        self._writer.write_table(table, row_group_size=len(self._rows))
+        self._rows = []
+        self._buffered = 0
+
+    def _close(self):
+        self._write_row_group()
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = None
+
+
+def open_sink(format: str, directory: str, prefix: str, **kwargs) -> Sink:
+    """Create a sink for one of `FORMATS`."""
+    if format not in FORMATS:
+        raise ValueError(f"Unsupported output format: {format} (expected one of {', '.join(FORMATS)})")
+    if format == "parquet":
+        return ParquetSink(directory, prefix, **kwargs)
+    compression = {"jsonl": None, "jsonl.gz": "gzip", "jsonl.zst": "zstd"}[format]
+    return JsonlSink(directory, prefix, compression=compression, **kwargs)
+
+
+def read_documents(path: str) -> Iterator[Dict]:
+    """Stream documents back from a file written by any sink."""
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise ImportError("Reading Parquet requires the 'pyarrow' package")
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+        return
+
+    with open(path, "rb") as raw:
+        if path.endswith(".gz"):
+            stream = gzip.GzipFile(fileobj=raw, mode="rb")
+        elif path.endswith(".zst"):
+            if zstandard is None:
+                raise ImportError("Reading zstd files requires the 'zstandard' package")
+            stream = zstandard.ZstdDecompressor().stream_reader(raw)
+        else:
+            stream = raw
+        for line in io.TextIOWrapper(stream, encoding="utf-8"):
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,121 @@
+"""WorkQueue leases, listing steals and Worker commits on a temporary SQLite queue."""
+import time
+
+import pytest
+
+from mevzuat_scraper.distributed import Worker, WorkQueue
+from mevzuat_scraper.sink import read_documents
+
+
+def record(number):
+    return dict(mevzuat_no=str(number), mevzuat_tur="1", mevzuat_tertip="5", title=f"Kanun {number}")
+
+
+class FakeSite:
+    """The `Mevzuat` calls a worker makes, over `total` listed records."""
+
+    def __init__(self, total=0):
+        self.total = total
+        self.pages = []
+
+    def request_page(self, mev_tur, start, length):
+        self.pages.append((start, length))
+        return [record(n) for n in range(start, min(start + length, self.total))], self.total
+
+    def request_text(self, metadata):
+        return [dict(m, text=f"Metin {m['mevzuat_no']}") for m in metadata]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / "crawl.sqlite"))
+    yield queue
+    queue.close()
+
+
+def test_expired_lease_is_reassigned(queue):
+    queue.add_fetches("Kanun", [record(1), record(2)])
+    first = queue.lease("a", "fetch", limit=2, lease_seconds=0.05)
+    assert len(first) == 2
+    assert queue.lease("b", "fetch", limit=2) == []  # still held by a
+
+    time.sleep(0.1)
+    second = queue.lease("b", "fetch", limit=2)
+    assert [t.task_id for t in second] == [t.task_id for t in first]
+    assert [t.attempts for t in second] == [2, 2]
+    assert queue.complete("a", [t.task_id for t in first]) == 0  # a lost them
+    assert queue.complete("b", [t.task_id for t in second]) == 2
+    assert queue.remaining() == 0
+
+
+def test_steal_listing_splits_without_overlap_or_gap(queue):
+    queue.add_listing("Kanun", 0, 1050, page_size=100)
+    owned, = queue.lease("a", "listing")
+    assert queue.progress("a", owned, 200) == 1050
+    assert queue.steal_listing("a") is None  # never from yourself
+
+    stolen = queue.steal_listing("b")
+    end = queue.progress("a", owned, 300)
+    assert owned.payload['cursor'] == 300 and end == stolen.payload['start'] == stolen.payload['cursor']
+    assert stolen.payload['end'] == 1050
+    assert (end - 200) % 100 == 0 and end > 300  # on a page boundary past the page being fetched
+
+    # Stealing again splits the larger remaining range, still leaving no gap
+    again = queue.steal_listing("c")
+    ranges = sorted([(300, queue.progress("a", owned, 300))] +
+                    [(t.payload['start'], queue.progress(w, t, t.payload['cursor'])) for w, t in
+                     (("b", stolen), ("c", again))])
+    assert ranges[0][0] == 300 and ranges[-1][1] == 1050
+    assert all(previous[1] == following[0] for previous, following in zip(ranges, ranges[1:]))
+
+
+def test_fetch_tasks_complete_only_when_their_file_is_finished(queue, tmp_path):
+    queue.add_fetches("Kanun", [record(n) for n in range(5)])
+    worker = Worker(queue, FakeSite(), str(tmp_path / "out"), worker_id="w", output_format="jsonl",
+                    batch_size=2, max_docs_per_file=4)
+
+    assert worker._fetch_batch()
+    assert queue.counts()["fetch"]["leased"] == 2 and not list((tmp_path / "out").glob("*.jsonl"))
+    assert worker._fetch_batch()  # 4 documents: the file is finished
+    assert queue.counts()["fetch"]["done"] == 4
+    assert worker._fetch_batch()
+    assert queue.counts()["fetch"]["leased"] == 1
+
+    worker._flush()
+    assert queue.counts()["fetch"]["done"] == 5
+    files = sorted((tmp_path / "out").glob("*.jsonl"))
+    assert [len(list(read_documents(str(path)))) for path in files] == [4, 1]
+
+
+def test_release_returns_held_tasks(queue, tmp_path):
+    queue.add_listing("Kanun", 0, 500, page_size=100)
+    queue.add_fetches("Kanun", [record(1)])
+    listing, = queue.lease("a", "listing")
+    queue.progress("a", listing, 200)
+    queue.lease("a", "fetch")
+
+    assert queue.release("a") == 2
+    assert queue.workers() == {}
+    assert queue.counts()["fetch"]["pending"] == queue.counts()["listing"]["pending"] == 1
+    resumed, = queue.lease("b", "listing")
+    assert resumed.payload['cursor'] == 200 and resumed.attempts == 1
+
+    # A stopped worker releases what it holds on its way out
+    worker = Worker(queue, FakeSite(), str(tmp_path / "out"), worker_id="b", output_format="jsonl")
+    worker.stop()
+    worker.run()
+    assert queue.workers() == {} and queue.counts()["listing"]["pending"] == 1
+
+
+def test_worker_pages_listings_and_fetches_everything(queue, tmp_path):
+    site = FakeSite(total=250)
+    queue.add_listing("Kanun", 0, 250, page_size=100)
+    worker = Worker(queue, site, str(tmp_path / "out"), worker_id="w", output_format="jsonl",
+                    batch_size=60, max_docs_per_file=100, poll_interval=0.01)
+
+    stats = worker.run()
+    assert site.pages == [(0, 100), (100, 100), (200, 50)]
+    assert stats['fetched'] == 250 and queue.remaining() == 0
+    numbers = [d['mevzuat_no'] for path in sorted((tmp_path / "out").glob("*.jsonl"))
+               for d in read_documents(str(path))]
+    assert sorted(numbers, key=int) == [str(n) for n in range(250)]
@@ -0,0 +1,255 @@
+"""HuggingfacePusher shard uploads against a local fake of the HfApi commit interface."""
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import pyarrow.parquet as pq
+import pytest
+from huggingface_hub import DatasetCard
+from huggingface_hub.utils import EntryNotFoundError
+
+from mevzuat_scraper.pusher import BackgroundUploader, HuggingfacePusher
+
+REPO = "user/legislation"
+
+
+class FakeHubApi:
+    """Keeps committed files in memory; the first `failures` commits raise."""
+
+    def __init__(self, failures=0, downloads=None):
+        self.files = {}
+        self.commits = []
+        self.failures = failures
+        self.created = []
+        self.entered = threading.Event()  # set when a commit starts
+        self.proceed = None               # Event a commit waits for, if set
+        self.downloads = downloads        # directory hf_hub_download writes to
+
+    def create_repo(self, repo_id, repo_type=None, private=False, exist_ok=False):
+        self.created.append(repo_id)
+        self.files.setdefault(repo_id, {})
+
+    def create_commit(self, repo_id, repo_type, operations, commit_message):
+        self.entered.set()
+        if self.proceed is not None:
+            self.proceed.wait(5)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Hub unavailable")
+        for operation in operations:
+            content = operation.path_or_fileobj
+            if isinstance(content, str):
+                with open(content, 'rb') as f:
+                    content = f.read()
+            self.files[repo_id][operation.path_in_repo] = content
+        self.commits.append((commit_message, sorted(o.path_in_repo for o in operations)))
+
+    def list_repo_tree(self, repo_id, path_in_repo=None, repo_type=None, recursive=False):
+        for path, content in self.files.get(repo_id, {}).items():
+            if path.startswith(f"{path_in_repo}/"):
+                yield SimpleNamespace(path=path, lfs=SimpleNamespace(sha256=hashlib.sha256(content).hexdigest()))
+
+    def hf_hub_download(self, repo_id, filename, repo_type=None):
+        if filename not in self.files.get(repo_id, {}):
+            raise EntryNotFoundError(f"{filename} not found in {repo_id}")
+        path = self.downloads / filename
+        path.write_bytes(self.files[repo_id][filename])
+        return str(path)
+
+    def rows(self, path):
+        return pq.read_table(io.BytesIO(self.files[REPO][path])).to_pylist()
+
+
+def documents(*numbers, text="MADDE 1 - Metin"):
+    return [dict(mevzuat_no=str(n), title=f"Kanun {n}", text=text, url=f"u{n}") for n in numbers]
+
+
+@pytest.fixture
+def api(tmp_path):
+    return FakeHubApi(downloads=tmp_path)
+
+
+def make_pusher(api, tmp_path):
+    return HuggingfacePusher(api=api, manifest=str(tmp_path / "manifest.json"), cache_dir=str(tmp_path / "cache"))
+
+
+def test_push_shards_appends(api, tmp_path):
+    pusher = make_pusher(api, tmp_path)
+    pusher.push_shards({"a": documents(2, 1)}, REPO)
+    pusher.push_shards({"b": documents(3)}, REPO)
+
+    assert api.created == [REPO]
+    assert [paths for _, paths in api.commits] == [["data/train-a.parquet"], ["data/train-b.parquet"]]
+    assert [r["mevzuat_no"] for r in api.rows("data/train-a.parquet")] == ["1", "2"]
+    assert [r["mevzuat_no"] for r in api.rows("data/train-b.parquet")] == ["3"]
+
+
+def test_unchanged_shards_are_skipped(api, tmp_path):
+    pusher = make_pusher(api, tmp_path)
+    pusher.push_shards({"a": documents(1)}, REPO)
+    pusher.push_shards({"a": documents(1)}, REPO)
+    assert len(api.commits) == 1
+
+    pusher.push_shards({"a": documents(1), "b": documents(2)}, REPO)
+    assert api.commits[-1][1] == ["data/train-b.parquet"]
+
+    pusher.push_shards({"a": documents(1, text="MADDE 1 - Değişti")}, REPO)
+    assert api.commits[-1][1] == ["data/train-a.parquet"]
+    assert api.rows("data/train-a.parquet")[0]["text"] == "MADDE 1 - Değişti"
+
+
+def test_manifest_persists(api, tmp_path):
+    make_pusher(api, tmp_path).push_shards({"a": documents(1)}, REPO)
+
+    with open(tmp_path / "manifest.json", encoding="utf-8") as f:
+        recorded = json.load(f)["repos"][REPO]
+    assert recorded == {"data/train-a.parquet": hashlib.sha256(api.files[REPO]["data/train-a.parquet"]).hexdigest()}
+
+    make_pusher(api, tmp_path).push_shards({"a": documents(1)}, REPO)
+    assert len(api.commits) == 1
+
+
+def test_sync_manifest(api, tmp_path):
+    make_pusher(api, tmp_path).push_shards({"a": documents(1), "b": documents(2)}, REPO)
+    (tmp_path / "manifest.json").unlink()
+
+    pusher = make_pusher(api, tmp_path)
+    assert pusher.sync_manifest(REPO) == 2
+    pusher.push_shards({"a": documents(1), "b": documents(2)}, REPO)
+    assert len(api.commits) == 1
+
+
+def test_other_splits_are_declared_in_the_card(api, tmp_path):
+    pusher = make_pusher(api, tmp_path)
+    pusher.push_shards({"a": documents(1)}, REPO)
+    pusher.push_shards({"b": documents(2)}, REPO, split_name="test")
+    assert "README.md" not in api.files[REPO]  # the Hub infers both from the shard names
+
+    api.files[REPO]["README.md"] = b"---\nlicense: mit\n---\n# Legislation\n"
+    pusher.push_shards({"a": documents(1)}, REPO, split_name="chunks")
+    assert api.commits[-1][1] == ["README.md", "data/chunks-a.parquet"]
+    card = DatasetCard(api.files[REPO]["README.md"].decode("utf-8"))
+    assert card.data.license == "mit" and card.text.strip() == "# Legislation"
+    assert card.data.configs == [{"config_name": "default", "data_files": [
+        {"split": "test", "path": "data/test-*.parquet"},
+        {"split": "train", "path": "data/train-*.parquet"},
+        {"split": "chunks", "path": "data/chunks-*.parquet"},
+    ]}]
+
+    pusher.push_shards({"b": documents(2)}, REPO, split_name="chunks")
+    assert api.commits[-1][1] == ["data/chunks-b.parquet"]
+
+
+def test_prepared_files_are_deleted_after_push(api, tmp_path):
+    source = tmp_path / "batch.jsonl"
+    source.write_text("".join(json.dumps(d) + "\n" for d in documents(1, 2)), encoding="utf-8")
+    pusher = make_pusher(api, tmp_path)
+
+    pusher.push_shards({"a": str(source)}, REPO)
+    assert len(api.rows("data/train-a.parquet")) == 2
+    assert list((tmp_path / "cache").glob("*.arrow")) == []
+
+    pusher.push_shards({"a": str(source)}, REPO)  # unchanged, but still cleaned up
+    assert len(api.commits) == 1
+    assert list((tmp_path / "cache").glob("*.arrow")) == []
+
+
+def test_background_uploader_retries(tmp_path):
+    api = FakeHubApi(failures=2)
+    with BackgroundUploader(make_pusher(api, tmp_path), REPO, backoff_factor=0) as uploader:
+        future = uploader.submit({"a": documents(1)})
+    assert future.result() == f"https://huggingface.co/datasets/{REPO}"
+    assert len(api.commits) == 1
+
+
+def test_background_uploader_gives_up(tmp_path):
+    api = FakeHubApi(failures=3)
+    with BackgroundUploader(make_pusher(api, tmp_path), REPO, max_retries=1, backoff_factor=0) as uploader:
+        future = uploader.submit({"a": documents(1)})
+    with pytest.raises(ConnectionError):
+        future.result()
+    assert api.commits == []
+
+
+def test_background_uploader_merges_waiting_batches(api, tmp_path):
+    api.proceed = threading.Event()
+    with BackgroundUploader(make_pusher(api, tmp_path), REPO, max_merge_rows=2) as uploader:
+        first = uploader.submit({"a": documents(1)}, commit_message="Batch 1")
+        assert api.entered.wait(5)  # the worker is committing the first batch
+        waiting = [uploader.submit({name: documents(n)}) for n, name in enumerate("bcd", 2)]
+        api.proceed.set()
+    assert all(f.result() for f in [first] + waiting)
+
+    # b and c fit into one commit (2 rows), d goes on its own
+    assert [paths for _, paths in api.commits] == [
+        ["data/train-a.parquet"], ["data/train-b.parquet", "data/train-c.parquet"], ["data/train-d.parquet"]
+    ]
+    assert api.commits[1][0] == "Add 2 batches (2 shards)"
+
+
+def test_background_uploader_merges_files_by_row_count(api, tmp_path):
+    from mevzuat_scraper.sink import open_sink
+
+    files = []
+    for name, fmt in (("b", "jsonl.gz"), ("c", "parquet"), ("d", "jsonl")):
+        sink = open_sink(fmt, str(tmp_path / "out"), name)
+        sink.write_many(documents(ord(name)))
+        files.append(sink.close()[0])
+
+    api.proceed = threading.Event()
+    with BackgroundUploader(make_pusher(api, tmp_path), REPO, max_merge_rows=10) as uploader:
+        uploader.submit({"a": documents(1)})
+        assert api.entered.wait(5)
+        uploader.submit({"b": files[0].path}, rows=files[0].documents)
+        uploader.submit({"c": files[1].path})  # counted from the Parquet footer
+        uploader.submit({"d": files[2].path})  # unknown size: committed alone
+        api.proceed.set()
+
+    assert [paths for _, paths in api.commits] == [
+        ["data/train-a.parquet"], ["data/train-b.parquet", "data/train-c.parquet"], ["data/train-d.parquet"]
+    ]
+    assert api.rows("data/train-c.parquet")[0]["mevzuat_no"] == str(ord("c"))
+
+
+def _anonymous_rss():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1]) * 1024
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="needs Linux /proc")
+def test_prepare_file_memory_is_bounded_by_chunk_size(api, tmp_path):
+    source = tmp_path / "large.jsonl"
+    numbers = random.Random(0).sample(range(100000), 4000)
+    with open(source, "w", encoding="utf-8") as f:
+        for n in numbers:
+            f.write(json.dumps(dict(mevzuat_no=str(n), title=f"Kanun {n}", text="MADDE 1 - " + "metin " * 3000)) + "\n")
+    size = os.path.getsize(source)
+
+    pusher = HuggingfacePusher(api=api, manifest=str(tmp_path / "manifest.json"),
+                               cache_dir=str(tmp_path / "cache"), chunk_size=50)
+    base = peak = _anonymous_rss()
+    stop = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not stop.is_set():
+            peak = max(peak, _anonymous_rss())
+            time.sleep(0.002)
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    try:
+        dataset = pusher.prepare_file(str(source))
+    finally:
+        stop.set()
+        sampler.join()
+
+    assert dataset["mevzuat_no"] == sorted(str(n) for n in numbers)
+    assert peak - base < size / 2, f"peak grew by {(peak - base) >> 20} MB for a {size >> 20} MB file"
@@ -0,0 +1,120 @@
+"""SearchIndex: Turkish folding, BM25 ranking, phrases and incremental updates."""
+import sqlite3
+
+import pytest
+
+from mevzuat_scraper.search import BLOCK_SIZE, SearchIndex, fold, tokenize
+
+
+def law(number, text, title=None, **fields):
+    return dict(mevzuat_no=str(number), mevzuat_tur="1", mevzuat_tertip="5",
+                title=title or f"Kanun {number}", url=f"u{number}", text=text, **fields)
+
+
+@pytest.fixture
+def index(tmp_path):
+    with SearchIndex(str(tmp_path / "search.sqlite")) as index:
+        yield index
+
+
+def numbers(hits):
+    return [hit.key[0] for hit in hits]
+
+
+def test_turkish_folding():
+    assert fold("İDARE") == "idare"
+    assert fold("IRMAK") == "ırmak"
+    assert tokenize("İşçi ve IŞIK; Iğdır'da") == ["işçi", "ve", "ışık", "ığdır", "da"]
+
+
+def test_folded_terms_match(index):
+    index.add([law(1, "İDARE MAHKEMESİ"), law(2, "Irmak kenarı"), law(3, "idari işlem")])
+    assert numbers(index.search("idare")) == ["1"]
+    assert numbers(index.search("mahkemesi")) == ["1"]
+    assert numbers(index.search("ırmak")) == ["2"]
+    assert index.search("irmak") == []  # dotted and dotless i stay distinct
+
+
+def test_bm25_ranking(index):
+    index.add([
+        law(1, "vergi usul hükümleri ve diğer hükümler " * 3),
+        law(2, "vergi vergi vergi cezası"),
+        law(3, "gümrük vergi"),
+        law(4, "gümrük tarifesi"),
+    ])
+    # More occurrences in a shorter document rank higher
+    assert numbers(index.search("vergi")) == ["2", "3", "1"]
+    # The rarer term weighs more than the common one
+    assert numbers(index.search("gümrük cezası"))[0] == "2"
+    assert numbers(index.search("vergi", limit=2)) == ["2", "3"]
+
+
+def test_phrase_matching(index):
+    index.add([
+        law(1, "Bu Kanun yayımı tarihinde yürürlüğe girer."),
+        law(2, "Yürürlüğe girer bu hüküm yayımı tarihinde değil."),
+        law(3, "MADDE 5 - Yürürlükten kaldırılmıştır."),
+    ])
+    assert numbers(index.search('"yayımı tarihinde yürürlüğe girer"')) == ["1"]
+    assert numbers(index.search('"girer yayımı"')) == []
+    assert numbers(index.search('"YÜRÜRLÜKTEN KALDIRILMIŞTIR"')) == ["3"]
+    assert numbers(index.search('"madde 5" kanun')) == ["3"]
+
+
+def test_reindexed_document_replaces_old_version(index):
+    assert index.add([law(1, "eski metin"), law(2, "başka metin")]) == 2
+    assert index.add([law(1, "eski metin")]) == 0  # unchanged
+
+    assert index.add([law(1, "yeni metin")]) == 1
+    assert len(index) == 2
+    assert index.search("eski") == []
+    hit, = index.search("yeni")
+    assert hit.key[0] == "1" and index.text(hit.doc_id) == "yeni metin"
+
+    index.optimize()
+    assert len(index) == 2
+    assert sorted(numbers(index.search("metin"))) == ["1", "2"]
+
+
+def test_postings_span_blocks(index):
+    documents = [law(n, f"ortak madde {n} ortak") for n in range(BLOCK_SIZE * 3 + 7)]
+    for start in range(0, len(documents), 50):  # batches refill the last block of each term
+        index.add(documents[start:start + 50])
+    index.add([law(5, "değişti")])
+
+    assert len(index.search("ortak", limit=1000)) == len(documents) - 1
+    assert numbers(index.search(f'"madde {BLOCK_SIZE * 2 + 1} ortak"')) == [str(BLOCK_SIZE * 2 + 1)]
+    index.optimize()
+    assert len(index.search("ortak", limit=1000)) == len(documents) - 1
+    assert numbers(index.search('"madde 300"')) == ["300"]
+
+
+def test_converts_single_row_postings(tmp_path):
+    def varints(values):
+        out = bytearray()
+        for n in values:
+            while n > 0x7F:
+                out.append((n & 0x7F) | 0x80)
+                n >>= 7
+            out.append(n)
+        return bytes(out)
+
+    path = str(tmp_path / "legacy.sqlite")
+    with SearchIndex(path) as index:
+        index.add([law(1, "a b a"), law(2, "b")])
+    conn = sqlite3.connect(path)
+    conn.executescript("DROP TABLE blocks; CREATE TABLE postings (term TEXT PRIMARY KEY, last_doc INTEGER, "
+                       "docs BLOB, positions BLOB) WITHOUT ROWID;")
+    # (doc id delta, tf, positions bytes) per document, positions delta-encoded per document
+    # ("kanun" comes from the titles, which are indexed ahead of the text)
+    legacy = {"kanun": ([1, 1, 1, 1, 1, 1], [0, 0]), "1": ([1, 1, 1], [1]), "2": ([2, 1, 1], [1]),
+              "a": ([1, 2, 2], [2, 2]), "b": ([1, 1, 1, 1, 1, 1], [3, 2])}
+    conn.executemany("INSERT INTO postings VALUES (?, 0, ?, ?)",
+                     [(term, varints(docs), varints(positions)) for term, (docs, positions) in legacy.items()])
+    conn.commit()
+    conn.close()
+
+    with SearchIndex(path) as index:
+        assert numbers(index.search("b")) == ["2", "1"]
+        assert numbers(index.search('"a b a"')) == ["1"]
+        assert numbers(index.search('"kanun 2 b"')) == ["2"]
@@ -0,0 +1,92 @@
+"""Article segmentation of legislation texts and the article files written next to document files."""
+import os
+
+from main import BatchWriter
+from mevzuat_scraper.checkpoint import CheckpointStore
+from mevzuat_scraper.dedup import normalize_text
+from mevzuat_scraper.pipeline import Batch
+from mevzuat_scraper.segment import article_records, segment
+from mevzuat_scraper.sink import open_sink, read_documents
+
+KANUN = (
+    "\r\nVERGİ USUL KANUNU\r\n\r\n"
+    "BİRİNCİ KISIM\r\nGenel Hükümler\r\n\r\n"
+    "Amaç\r\n"
+    "MADDE 1 – (1) Bu Kanunun amacı vergilendirmedir.\r\n"
+    "(2) Vergi ödevleri bu Kanuna göre yerine getirilir.\r\n\r\n"
+    "Tanımlar\r\n"
+    "Madde 2/A- Bu Kanunda geçen terimler aşağıdadır.\r\n\r\n"
+    "İKİNCİ KISIM\r\nSon Hükümler\r\n\r\n"
+    "EK MADDE 3 – (Ek: 1/1/2020-7000/1 md.) Eklenen hüküm.\r\n\r\n"
+    "Geçiş hükmü\r\n"
+    "GEÇİCİ MADDE 1 – (1) Geçiş dönemi.\r\n\r\n"
+    "Mükerrer Madde 5 - Mükerrer hüküm.\r\n"
+)
+
+
+def law(number, text):
+    return dict(mevzuat_no=str(number), mevzuat_tur="1", mevzuat_tertip="5",
+                title=f"Kanun {number}", url=f"u{number}", text=text)
+
+
+def test_segments_articles_sections_and_headings():
+    articles = segment(normalize_text(KANUN))
+    assert [(a.article, a.kind) for a in articles] == [
+        ("1", "madde"), ("2/A", "madde"), ("Ek 3", "ek"), ("Geçici 1", "gecici"), ("Mükerrer 5", "mukerrer")
+    ]
+    assert [a.heading for a in articles] == ["Amaç", "Tanımlar", None, "Geçiş hükmü", None]
+    assert [a.section for a in articles] == ["BİRİNCİ KISIM - Genel Hükümler"] * 2 + \
+        ["İKİNCİ KISIM - Son Hükümler"] * 3
+    # An article stops before the next heading or section, not at the next header
+    assert articles[0].text.endswith("yerine getirilir.")
+    assert articles[1].text == "Madde 2/A- Bu Kanunda geçen terimler aşağıdadır."
+
+
+def test_paragraphs():
+    first, second, _, transitional, _ = segment(normalize_text(KANUN))
+    assert [first.text[s - first.start:e - first.start].strip() for s, e in first.paragraphs] == [
+        "(1) Bu Kanunun amacı vergilendirmedir.", "(2) Vergi ödevleri bu Kanuna göre yerine getirilir."
+    ]
+    assert second.paragraphs == []
+    assert len(transitional.paragraphs) == 1
+
+
+def test_record_offsets_point_into_the_published_text():
+    document = law(1, KANUN)
+    published = normalize_text(KANUN)
+    records = article_records(document)
+
+    assert len(records) == 5
+    for record in records:
+        assert published[record['start']:record['end']] == record['text']
+        for start, end in record['paragraphs']:
+            assert published[start:end].startswith("(")
+    assert records[0]['law_title'] == "Kanun 1" and records[0]['mevzuat_no'] == "1"
+
+
+def test_text_without_articles():
+    assert segment("Bu Kararname yayımı tarihinde yürürlüğe girer.") == []
+    assert article_records(law(1, None)) == []
+
+
+def test_article_files_are_numbered_after_document_files(tmp_path):
+    out_dir = str(tmp_path)
+    sink = open_sink("jsonl", out_dir, "Kanun", max_docs=2, first_number=7)
+    writer = BatchWriter(
+        "Kanun", sink, CheckpointStore(str(tmp_path / "checkpoint.json")),
+        open_articles=lambda number: open_sink("jsonl", os.path.join(out_dir, "articles"), "Kanun",
+                                               first_number=number)
+    )
+    batches = [
+        [law(1, "Genelge metni."), law(2, "Tebliğ metni.")],   # file 7: no articles
+        [law(3, KANUN), law(4, "MADDE 1 – Tek madde.")],        # file 8
+        [law(5, "MADDE 1 – Son madde.")],                       # file 9, finished on close
+    ]
+    for number, documents in enumerate(batches, 1):
+        writer(Batch(number, "Kanun", records=[], documents=documents, end_offset=number))
+    writer.finish()
+
+    assert sorted(os.listdir(os.path.join(out_dir, "articles"))) == ["Kanun-00008.jsonl", "Kanun-00009.jsonl"]
+    for number, documents in ((8, ["3", "4"]), (9, ["5"])):
+        path = os.path.join(out_dir, "articles", f"Kanun-{number:05d}.jsonl")
+        assert sorted({record['mevzuat_no'] for record in read_documents(path)}) == documents